@@ -32,6 +32,7 @@ from UI_lib.HOSTUI import TestApplication
 from UI_lib.test_controller import TestControllerUI
 from UI_lib.agent_runner import AgentRunner
 from Backend_lib.Linux.daemons import BluezServices
+from Backend_lib.Linux.bluez_session import BluezSession
 
 
 
@@ -273,6 +274,8 @@ class BluetoothUIApp(QMainWindow):
             self.controller.interface=self.controller.controllers_list[controller]
 
         run(self.log, f"hciconfig -a {self.controller.interface} up")
+        # Seed the shared session once; every screen opened for this controller reuses it
+        BluezSession.get(self.controller.interface)
 
 
         if self.previous_row_selected:
@@ -0,0 +1,443 @@
+import os
+import subprocess
+import threading
+import time
+
+import dbus
+
+from Backend_lib.Linux.latency import MEDIA_TRANSPORT_IFACE
+from Backend_lib.Linux.pulse_monitor import PulseAudioMonitor
+
+MEDIA_ENDPOINT_IFACE = "org.bluez.MediaEndpoint1"
+
+A2DP_SOURCE_UUID = "0000110a-0000-1000-8000-00805f9b34fb"
+A2DP_SINK_UUID = "0000110b-0000-1000-8000-00805f9b34fb"
+
+CODEC_SBC = 0x00
+CODEC_MPEG12 = 0x01
+CODEC_MPEG24 = 0x02
+CODEC_VENDOR = 0xFF
+
+CODEC_NAMES = {CODEC_SBC: "sbc", CODEC_MPEG12: "mpeg12", CODEC_MPEG24: "aac"}
+
+# (vendor id, vendor codec id) of the vendor codecs PulseAudio and PipeWire know.
+VENDOR_CODECS = {
+    (0x0000004F, 0x0001): "aptx",
+    (0x000000D7, 0x0024): "aptx_hd",
+    (0x0000000A, 0x0002): "aptx_ll",
+    (0x0000000A, 0x0001): "faststream",
+    (0x0000012D, 0x00AA): "ldac",
+}
+
+# Capability bit of each value, per field (A2DP specification, codec specific information elements).
+SBC_FREQUENCIES = {16000: 0x80, 32000: 0x40, 44100: 0x20, 48000: 0x10}
+SBC_CHANNEL_MODES = {"mono": 0x08, "dual_channel": 0x04, "stereo": 0x02, "joint_stereo": 0x01}
+SBC_BLOCK_LENGTHS = {4: 0x80, 8: 0x40, 12: 0x20, 16: 0x10}
+SBC_SUBBANDS = {4: 0x08, 8: 0x04}
+SBC_ALLOCATIONS = {"snr": 0x02, "loudness": 0x01}
+
+AAC_OBJECT_TYPES = {"mpeg2_aac_lc": 0x80, "mpeg4_aac_lc": 0x40, "mpeg4_aac_ltp": 0x20, "mpeg4_aac_scalable": 0x10,
+                    "mpeg4_he_aac": 0x08, "mpeg4_he_aac_v2": 0x04}
+AAC_FREQUENCIES = {8000: 0x800, 11025: 0x400, 12000: 0x200, 16000: 0x100, 22050: 0x080, 24000: 0x040,
+                   32000: 0x020, 44100: 0x010, 48000: 0x008, 64000: 0x004, 88200: 0x002, 96000: 0x001}
+AAC_CHANNELS = {1: 0x08, 2: 0x04}
+
+APTX_FREQUENCIES = {16000: 0x80, 32000: 0x40, 44100: 0x20, 48000: 0x10}
+APTX_CHANNEL_MODES = {"mono": 0x01, "stereo": 0x02}
+LDAC_FREQUENCIES = {44100: 0x20, 48000: 0x10, 88200: 0x08, 96000: 0x04, 176400: 0x02, 192000: 0x01}
+LDAC_CHANNEL_MODES = {"mono": 0x04, "dual_channel": 0x02, "stereo": 0x01}
+
+
+def _flags(table, bits):
+    return [value for value, bit in table.items() if bits & bit]
+
+
+def _pick(table, bits, value, field):
+    if value not in table:
+        raise ValueError(f"Unknown {field}: {value}")
+    if bits is not None and not bits & table[value]:
+        raise ValueError(f"{field} {value} not supported by the endpoint, supported: {_flags(table, bits)}")
+    return table[value]
+
+
+def codec_name(codec, data=b""):
+    """
+    Returns the name of an A2DP codec.
+
+    Args:
+        codec (int): A2DP codec id (MediaEndpoint1/MediaTransport1 Codec).
+        data (bytes): Capabilities or configuration, needed to tell vendor codecs apart.
+
+    Returns:
+        str: 'sbc', 'aac', 'aptx', 'ldac'... or 'vendor:<vendor id>:<codec id>' if unknown.
+    """
+    codec = int(codec)
+    if codec != CODEC_VENDOR:
+        return CODEC_NAMES.get(codec, f"codec:{codec:#04x}")
+    data = bytes(bytearray(data))
+    if len(data) < 6:
+        return "vendor"
+    vendor_id = int.from_bytes(data[0:4], "little")
+    vendor_codec = int.from_bytes(data[4:6], "little")
+    return VENDOR_CODECS.get((vendor_id, vendor_codec), f"vendor:{vendor_id:#010x}:{vendor_codec:#06x}")
+
+
+def decode_capabilities(codec, data):
+    """
+    Decodes the capabilities of an endpoint or the configuration of a transport.
+
+    A configuration uses the same layout with a single bit set per field, so both
+    decode to lists of supported values.
+
+    Args:
+        codec (int): A2DP codec id.
+        data (bytes): Codec specific information element.
+
+    Returns:
+        dict: codec name, raw hex and the decoded fields of known codecs.
+    """
+    data = bytes(bytearray(data))
+    info = {"codec": codec_name(codec, data), "raw": data.hex()}
+    codec = int(codec)
+    if codec == CODEC_SBC and len(data) >= 4:
+        info.update({
+            "frequencies": _flags(SBC_FREQUENCIES, data[0] & 0xF0),
+            "channel_modes": _flags(SBC_CHANNEL_MODES, data[0] & 0x0F),
+            "block_lengths": _flags(SBC_BLOCK_LENGTHS, data[1] & 0xF0),
+            "subbands": _flags(SBC_SUBBANDS, data[1] & 0x0C),
+            "allocations": _flags(SBC_ALLOCATIONS, data[1] & 0x03),
+            "min_bitpool": data[2],
+            "max_bitpool": data[3],
+        })
+    elif codec == CODEC_MPEG24 and len(data) >= 6:
+        info.update({
+            "object_types": _flags(AAC_OBJECT_TYPES, data[0]),
+            "frequencies": _flags(AAC_FREQUENCIES, data[1] << 4 | data[2] >> 4),
+            "channels": _flags(AAC_CHANNELS, data[2] & 0x0C),
+            "vbr": bool(data[3] & 0x80),
+            "bitrate": (data[3] & 0x7F) << 16 | data[4] << 8 | data[5],
+        })
+    elif info["codec"] in ("aptx", "aptx_hd", "aptx_ll", "faststream") and len(data) >= 7:
+        info.update({
+            "frequencies": _flags(APTX_FREQUENCIES, data[6] & 0xF0),
+            "channel_modes": _flags(APTX_CHANNEL_MODES, data[6] & 0x0F),
+        })
+    elif info["codec"] == "ldac" and len(data) >= 8:
+        info.update({
+            "frequencies": _flags(LDAC_FREQUENCIES, data[6]),
+            "channel_modes": _flags(LDAC_CHANNEL_MODES, data[7]),
+        })
+    return info
+
+
+def sbc_configuration(capabilities=None, frequency=44100, channel_mode="joint_stereo", block_length=16, subbands=8,
+                      allocation="loudness", min_bitpool=2, max_bitpool=53):
+    """
+    Builds an SBC configuration, checked against the endpoint capabilities.
+
+    Args:
+        capabilities (bytes): Remote endpoint capabilities, None to skip the checks.
+        frequency (int): Sampling frequency in Hz.
+        channel_mode (str): 'mono', 'dual_channel', 'stereo' or 'joint_stereo'.
+        block_length (int): 4, 8, 12 or 16.
+        subbands (int): 4 or 8.
+        allocation (str): 'snr' or 'loudness'.
+        min_bitpool (int): Lowest bitpool, raised to the endpoint minimum.
+        max_bitpool (int): Highest bitpool, lowered to the endpoint maximum.
+
+    Returns:
+        bytes: Configuration to pass to SetConfiguration.
+    """
+    caps = bytes(bytearray(capabilities)) if capabilities is not None else None
+    first = _pick(SBC_FREQUENCIES, caps[0] & 0xF0 if caps else None, frequency, "frequency") | \
+        _pick(SBC_CHANNEL_MODES, caps[0] & 0x0F if caps else None, channel_mode, "channel mode")
+    second = _pick(SBC_BLOCK_LENGTHS, caps[1] & 0xF0 if caps else None, block_length, "block length") | \
+        _pick(SBC_SUBBANDS, caps[1] & 0x0C if caps else None, subbands, "subbands") | \
+        _pick(SBC_ALLOCATIONS, caps[1] & 0x03 if caps else None, allocation, "allocation")
+    if caps:
+        min_bitpool = max(min_bitpool, caps[2])
+        max_bitpool = min(max_bitpool, caps[3])
+    if not 2 <= min_bitpool <= max_bitpool <= 250:
+        raise ValueError(f"Invalid bitpool range {min_bitpool}-{max_bitpool}")
+    return bytes([first, second, min_bitpool, max_bitpool])
+
+
+def aac_configuration(capabilities=None, object_type="mpeg2_aac_lc", frequency=44100, channels=2, vbr=False,
+                      bitrate=None):
+    """
+    Builds an MPEG-2/4 AAC configuration, checked against the endpoint capabilities.
+
+    Args:
+        capabilities (bytes): Remote endpoint capabilities, None to skip the checks.
+        object_type (str): Key of AAC_OBJECT_TYPES.
+        frequency (int): Sampling frequency in Hz.
+        channels (int): 1 or 2.
+        vbr (bool): Request variable bit rate; only if the endpoint supports it.
+        bitrate (int): Peak bit rate in bit/s, lowered to the endpoint maximum; the maximum if None.
+
+    Returns:
+        bytes: Configuration to pass to SetConfiguration.
+    """
+    caps = bytes(bytearray(capabilities)) if capabilities is not None else None
+    object_bits = _pick(AAC_OBJECT_TYPES, caps[0] if caps else None, object_type, "object type")
+    frequency_bits = _pick(AAC_FREQUENCIES, (caps[1] << 4 | caps[2] >> 4) if caps else None, frequency, "frequency")
+    channel_bits = _pick(AAC_CHANNELS, caps[2] & 0x0C if caps else None, channels, "channels")
+    if vbr and caps and not caps[3] & 0x80:
+        raise ValueError("VBR not supported by the endpoint")
+    max_bitrate = (caps[3] & 0x7F) << 16 | caps[4] << 8 | caps[5] if caps else 0
+    if not bitrate:
+        bitrate = max_bitrate or 320000
+    elif max_bitrate:
+        bitrate = min(bitrate, max_bitrate)
+    return bytes([object_bits, frequency_bits >> 4, (frequency_bits & 0x0F) << 4 | channel_bits,
+                  (0x80 if vbr else 0) | bitrate >> 16 & 0x7F, bitrate >> 8 & 0xFF, bitrate & 0xFF])
+
+
+def sbc_bitrate(configuration, bitpool=None):
+    """
+    Computes the bit rate of an SBC configuration.
+
+    Args:
+        configuration (bytes): SBC configuration (one bit per field).
+        bitpool (int): Bitpool in use, the configured maximum if None.
+
+    Returns:
+        int: Bit rate in bit/s.
+    """
+    info = decode_capabilities(CODEC_SBC, configuration)
+    frequency = info["frequencies"][0]
+    mode = info["channel_modes"][0]
+    blocks = info["block_lengths"][0]
+    subbands = info["subbands"][0]
+    bitpool = bitpool or info["max_bitpool"]
+    channels = 1 if mode == "mono" else 2
+    if mode in ("mono", "dual_channel"):
+        frame = 4 + 4 * subbands * channels // 8 + -(-blocks * channels * bitpool // 8)
+    else:
+        join = subbands if mode == "joint_stereo" else 0
+        frame = 4 + 4 * subbands * channels // 8 + -(-(join + blocks * bitpool) // 8)
+    return 8 * frame * frequency // (subbands * blocks)
+
+
+class A2DPCodecControl:
+    """
+    Lists the remote stream endpoints (SEPs) of a device and forces the codec in use.
+
+    Remote endpoints are read from the object cache (BlueZ exports them as
+    MediaEndpoint1 objects below the device). A codec is selected by calling
+    SetConfiguration on the matching remote endpoint with the local endpoint of the
+    sound server, or, when that is not possible, by switching the PulseAudio/PipeWire
+    card profile. Either way the outcome is read back from MediaTransport1.Codec and
+    Configuration.
+    """
+
+    def __init__(self, session):
+        """
+        Initializes the control.
+
+        Args:
+            session (BluezSession): Session providing the object cache and proxies.
+        returns:
+            None
+        """
+        self.session = session
+        self.object_cache = session.object_cache
+        self.proxies = session.proxies
+
+    def _device_path(self, address):
+        device_path = self.object_cache.find_device_path(address, self.session.interface)
+        if not device_path:
+            raise ValueError(f"Device {address} not found")
+        return device_path
+
+    def list_endpoints(self, address):
+        """
+        Lists the remote endpoints of a device with their decoded capabilities.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            list: Dicts with path, uuid, role ('sink' or 'source'), codec_id, codec,
+                capabilities (see decode_capabilities) and delay_reporting.
+        """
+        endpoints = []
+        for path, props in self.object_cache.get_objects_with_interface(MEDIA_ENDPOINT_IFACE,
+                                                                         self._device_path(address) + "/"):
+            uuid = str(props.get("UUID", "")).lower()
+            capabilities = decode_capabilities(props.get("Codec", 0), props.get("Capabilities", []))
+            endpoints.append({
+                "path": path,
+                "uuid": uuid,
+                "role": "sink" if uuid == A2DP_SINK_UUID else "source" if uuid == A2DP_SOURCE_UUID else None,
+                "codec_id": int(props.get("Codec", 0)),
+                "codec": capabilities["codec"],
+                "capabilities": capabilities,
+                "delay_reporting": bool(props.get("DelayReporting", False)),
+            })
+        return sorted(endpoints, key=lambda endpoint: endpoint["path"])
+
+    def get_transport(self, address):
+        """
+        Returns the A2DP transport of a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            tuple | None: (path, properties), None if the device has no transport.
+        """
+        transports = self.object_cache.get_objects_with_interface(MEDIA_TRANSPORT_IFACE,
+                                                                   self._device_path(address) + "/")
+        return transports[0] if transports else None
+
+    def get_configuration(self, address):
+        """
+        Returns the codec configuration negotiated for a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            dict | None: Decoded MediaTransport1 Configuration with the transport path,
+                plus the bitrate for SBC; None without transport.
+        """
+        transport = self.get_transport(address)
+        if transport is None:
+            return None
+        path, props = transport
+        info = decode_capabilities(props.get("Codec", 0), props.get("Configuration", []))
+        info["transport"] = path
+        if info["codec"] == "sbc" and info.get("frequencies"):
+            info["bitrate"] = sbc_bitrate(bytes.fromhex(info["raw"]))
+        return info
+
+    def select_codec(self, address, codec, configuration=None, role="sink", local_endpoint=None,
+                     use_card_profile=True, timeout=5.0):
+        """
+        Forces the codec (and optionally its exact configuration) used with a device.
+
+        SetConfiguration is tried first on the device's endpoint of that codec, with
+        local_endpoint or the sound server's endpoint path derived from the current
+        transport. If BlueZ rejects the call, the card profile of the codec is selected
+        instead; that path cannot honour a specific configuration such as a bitpool
+        range, which the verification then reports.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            codec (str): Codec name, e.g. 'sbc', 'aac', 'aptx', 'ldac'.
+            configuration (bytes): Codec configuration, e.g. from sbc_configuration(), vendor
+                codecs including their vendor and codec id; SBC defaults within the
+                endpoint's capabilities are used if None.
+            role (str): Role of the remote endpoint, 'sink' when streaming to the device.
+            local_endpoint (str): Object path of the local endpoint of the sound server.
+            use_card_profile (bool): Fall back to the card profile.
+            timeout (float): Seconds to wait for the transport to reflect the selection.
+
+        Returns:
+            dict: method ('endpoint', 'card_profile' or None), verified (bool), error
+                and the resulting configuration (see get_configuration()).
+        """
+        result = {"codec": codec, "method": None, "verified": False, "error": None, "configuration": None}
+        endpoint = next((endpoint for endpoint in self.list_endpoints(address)
+                         if endpoint["codec"] == codec and endpoint["role"] == role), None)
+        if endpoint is None and not use_card_profile:
+            result["error"] = f"No remote {role} endpoint for {codec}"
+            return result
+        if endpoint is not None:
+            if configuration is None and codec == "sbc":
+                configuration = sbc_configuration(bytes.fromhex(endpoint["capabilities"]["raw"]))
+            try:
+                self._set_endpoint_configuration(address, endpoint, codec, configuration, local_endpoint)
+                result["method"] = "endpoint"
+            except (dbus.exceptions.DBusException, ValueError) as e:
+                result["error"] = str(e)
+                print(f"[A2DPCodecControl] SetConfiguration on {endpoint['path']} failed: {e}")
+        if result["method"] is None and use_card_profile:
+            profile = self._set_card_profile(address, codec)
+            if profile:
+                result["method"] = "card_profile"
+                result["profile"] = profile
+                result["error"] = None
+            elif result["error"] is None:
+                result["error"] = f"No card profile for {codec}"
+        if result["method"] is None:
+            return result
+        result["verified"] = self._wait_for_configuration(address, codec, configuration, timeout)
+        result["configuration"] = self.get_configuration(address)
+        if not result["verified"]:
+            result["error"] = "Transport does not reflect the requested codec configuration"
+        return result
+
+    def _set_endpoint_configuration(self, address, endpoint, codec, configuration, local_endpoint):
+        if configuration is None:
+            raise ValueError(f"A configuration is needed to configure {codec} through its endpoint")
+        if local_endpoint is None:
+            transport = self.get_transport(address)
+            current = str(transport[1].get("Endpoint", "")) if transport else ""
+            # Sound servers export one endpoint per codec next to each other, e.g. /MediaEndpoint/A2DPSource/sbc
+            base = os.path.dirname(current) if current else "/MediaEndpoint/A2DPSource"
+            local_endpoint = f"{base}/{codec}"
+        remote = self.proxies.get_interface(endpoint["path"], MEDIA_ENDPOINT_IFACE)
+        remote.SetConfiguration(dbus.ObjectPath(local_endpoint), dbus.Dictionary({
+            "Capabilities": dbus.Array([dbus.Byte(b) for b in bytes(configuration)], signature="y"),
+        }, signature="sv"))
+
+    def _set_card_profile(self, address, codec):
+        monitor = PulseAudioMonitor.get()
+        card = monitor.get_card_for_device(address) if monitor.is_ready() else None
+        card_name = card["name"] if card else f"bluez_card.{address.replace(':', '_')}"
+        if card:
+            profiles = [profile for profile in card["profiles"] if _profile_codec(profile) == codec]
+        else:
+            profiles = [f"a2dp-sink-{codec}", f"a2dp_sink_{codec}"] + (["a2dp_sink"] if codec == "sbc" else [])
+        for profile in profiles:
+            try:
+                subprocess.run(["pactl", "set-card-profile", card_name, profile], check=True,
+                               capture_output=True, text=True)
+                return profile
+            except (OSError, subprocess.CalledProcessError):
+                continue
+        return None
+
+    def _matches(self, props, codec, configuration):
+        current = bytes(bytearray(props.get("Configuration", [])))
+        if codec_name(props.get("Codec", 0), current) != codec:
+            return False
+        return configuration is None or current == bytes(configuration)
+
+    def _wait_for_configuration(self, address, codec, configuration, timeout):
+        device_prefix = self._device_path(address) + "/"
+        matched = threading.Event()
+
+        def listener(event, path, data):
+            if not path.startswith(device_prefix):
+                return
+            if event == "added" and MEDIA_TRANSPORT_IFACE in data:
+                props = data[MEDIA_TRANSPORT_IFACE]
+            elif event == "changed" and data[0] == MEDIA_TRANSPORT_IFACE:
+                props = self.object_cache.get_properties(path, MEDIA_TRANSPORT_IFACE) or {}
+            else:
+                return
+            if self._matches(props, codec, configuration):
+                matched.set()
+
+        # Reconfiguration may replace the transport object, so watch every transport of the device
+        self.object_cache.add_listener(listener)
+        try:
+            deadline = time.monotonic() + timeout
+            transport = self.get_transport(address)
+            if transport and self._matches(transport[1], codec, configuration):
+                return True
+            return matched.wait(max(0.0, deadline - time.monotonic()))
+        finally:
+            self.object_cache.remove_listener(listener)
+
+
+def _profile_codec(profile):
+    # a2dp-sink-aac (PipeWire), a2dp_sink_aac (PulseAudio >= 15); plain a2dp_sink is SBC
+    name = profile.replace("-", "_")
+    if not name.startswith("a2dp_sink"):
+        return None
+    codec = name[len("a2dp_sink"):].lstrip("_")
+    return codec or "sbc"
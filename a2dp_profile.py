@@ -8,6 +8,15 @@ from gi.repository import GObject
 import mimetypes
 from dbus.mainloop.glib import DBusGMainLoop
 
+from Backend_lib.Linux.a2dp_codec import A2DP_SINK_UUID, A2DP_SOURCE_UUID, A2DPCodecControl, sbc_configuration
+from Backend_lib.Linux.a2dp_recorder import A2DPRecorder
+from Backend_lib.Linux.audio_stream import ERROR, AudioStream
+from Backend_lib.Linux.bluez_session import BluezSession
+from Backend_lib.Linux.fanout_stream import FanoutStream
+from Backend_lib.Linux.playlist_stream import Playlist, PlaylistStream
+from Backend_lib.Linux.pulse_monitor import PulseAudioMonitor
+from Backend_lib.Linux.retry_policy import NOT_CONNECTED
+
 # Set the D-Bus main loop
 dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
 
@@ -20,17 +29,24 @@ class BluetoothDeviceManager:
     streaming audio (A2DP), media control (AVRCP), and removing Bluetooth devices.
     """
 
-    def __init__(self,interface=None):
+    def __init__(self,interface=None, session=None):
         """
-        Initialize the BluetoothDeviceManager by setting up the system bus and adapter.
+        Initialize the BluetoothDeviceManager by borrowing the bus, object cache and
+        proxies of the adapter's shared BluezSession (or of the given session).
         """
         self.interface = interface
-        self.bus = dbus.SystemBus()
+        self.session = session or BluezSession.get(interface)
+        self.bus = self.session.bus
+        self.object_cache = self.session.object_cache
+        self.proxies = self.session.proxies
+        self.retry_policy = self.session.retry_policy
         self.adapter_path = f'/org/bluez/{self.interface}'
-        self.adapter_proxy = self.bus.get_object('org.bluez', self.adapter_path)
-        self.adapter = dbus.Interface(self.adapter_proxy, 'org.bluez.Adapter1')
+        self.adapter_proxy = self.proxies.get_object(self.adapter_path)
+        self.adapter = self.proxies.get_interface(self.adapter_path, 'org.bluez.Adapter1')
         self.device_address=None
-        self.stream_process = None
+        self.audio_stream = None
+        self.stream_addresses = []
+        self.recorder = None
         self.device_path = None
         self.device_address = None
         self.device_sink = None
@@ -54,10 +70,7 @@ class BluetoothDeviceManager:
         """
         Power on the local Bluetooth adapter.
         """
-        adapter = dbus.Interface(
-            self.bus.get_object("org.bluez", self.adapter_path),
-            "org.freedesktop.DBus.Properties"
-        )
+        adapter = self.proxies.get_properties(self.adapter_path)
         adapter.Set("org.bluez.Adapter1", "Powered", dbus.Boolean(True))
 
     def inquiry(self, timeout):
@@ -72,18 +85,10 @@ class BluetoothDeviceManager:
         self.stop_discovery()
 
         discovered = []
-        om = dbus.Interface(self.bus.get_object("org.bluez", "/"), "org.freedesktop.DBus.ObjectManager")
-        objects = om.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                device_props = dbus.Interface(self.bus.get_object("org.bluez", path),
-                                              dbus_interface="org.freedesktop.DBus.Properties")
-                try:
-                    address = device_props.Get("org.bluez.Device1", "Address")
-                    alias = device_props.Get("org.bluez.Device1", "Alias")
-                    discovered.append(f"{alias} ({address})")
-                except:
-                    continue
+        for path, props in self.object_cache.get_objects_with_interface("org.bluez.Device1"):
+            address = props.get("Address")
+            if address:
+                discovered.append(f"{props.get('Alias', address)} ({address})")
         return discovered
 
     def _get_device_path(self, address):
@@ -117,30 +122,19 @@ class BluetoothDeviceManager:
     '''
 
     def find_device_path(self, address, interface):
-        adapter_path = f"/org/bluez/{interface}"
-        om = dbus.Interface(self.bus.get_object("org.bluez", "/"), "org.freedesktop.DBus.ObjectManager")
-        objects = om.GetManagedObjects()
-        formatted_address = address.replace(":", "_").upper()
-
-        for path, interfaces in objects.items():
-            if f"/{interface}/dev_{formatted_address}" in path:
-                if "org.bluez.Device1" in interfaces:
-                    return path
-
-        return None
+        return self.object_cache.find_device_path(address, interface)
 
     def br_edr_connect(self, address, interface):
         device_path = self.find_device_path(address, interface)
         if device_path:
             try:
-                device = dbus.Interface(self.bus.get_object("org.bluez", device_path),
-                                        dbus_interface="org.bluez.Device1")
-                device.Connect()
+                device = self.proxies.get_interface(device_path, "org.bluez.Device1")
+                self.retry_policy.run(lambda timeout: device.Connect(timeout=timeout), f"Connect {address}",
+                                      check=lambda: self.object_cache.get_property(device_path, "org.bluez.Device1",
+                                                                                   "Connected", False))
 
-                props = dbus.Interface(self.bus.get_object("org.bluez", device_path),
-                                       "org.freedesktop.DBus.Properties")
-                connected = props.Get("org.bluez.Device1", "Connected")
-                return connected
+                return self.object_cache.wait_for_property(device_path, "org.bluez.Device1", "Connected",
+                                                           bool, timeout=2)
             except Exception as e:
                 print(f"Connection failed: {e}")
         else:
@@ -151,13 +145,16 @@ class BluetoothDeviceManager:
         device_path = self.find_device_path(address, interface)
         if device_path:
             try:
-                device = dbus.Interface(self.bus.get_object("org.bluez", device_path), "org.bluez.Device1")
-                props = dbus.Interface(self.bus.get_object("org.bluez", device_path), "org.freedesktop.DBus.Properties")
+                device = self.proxies.get_interface(device_path, "org.bluez.Device1")
+                props = self.proxies.get_properties(device_path)
                 connected = props.Get("org.bluez.Device1", "Connected")
                 if not connected:
                     print(f"Device {address} is already disconnected.")
                     return True
-                device.Disconnect()
+                self.retry_policy.run(lambda timeout: device.Disconnect(timeout=timeout), f"Disconnect {address}",
+                                      check=lambda: not self.object_cache.get_property(device_path, "org.bluez.Device1",
+                                                                                       "Connected", False),
+                                      already_done=(NOT_CONNECTED,))
                 return True
             except dbus.exceptions.DBusException as e:
                 print(f"Error disconnecting device {address}: {e}")
@@ -165,21 +162,15 @@ class BluetoothDeviceManager:
 
     def remove_device(self, address, interface):
         adapter_path = f"/org/bluez/{interface}"
-        objects = self.object_manager.GetManagedObjects()
-
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                if interfaces["org.bluez.Device1"].get("Address") == address and path.startswith(adapter_path):
-                    try:
-                        adapter = dbus.Interface(
-                            self.bus.get_object("org.bluez", adapter_path),
-                            "org.bluez.Adapter1"
-                        )
-                        adapter.RemoveDevice(path)
-                        return True
-                    except dbus.exceptions.DBusException as e:
-                        print(f"Error removing device {address}: {e}")
-                        return False
+        path = self.object_cache.find_device_path(address, adapter_path)
+        if path:
+            try:
+                adapter = self.proxies.get_interface(adapter_path, "org.bluez.Adapter1")
+                adapter.RemoveDevice(path)
+                return True
+            except dbus.exceptions.DBusException as e:
+                print(f"Error removing device {address}: {e}")
+                return False
         print(f"Device with address {address} not found on {interface}")
         return True  # already removed
 
@@ -187,10 +178,7 @@ class BluetoothDeviceManager:
         device_path = self.find_device_path(address, interface)
         if device_path:
             try:
-                device = dbus.Interface(
-                    self.bus.get_object("org.bluez", device_path),
-                    dbus_interface="org.bluez.Device1"
-                )
+                device = self.proxies.get_interface(device_path, "org.bluez.Device1")
                 device.ConnectProfile('0000110e-0000-1000-8000-00805f9b34fb')  # A2DP
             except Exception as e:
                 print("LE Connection failed:", e)
@@ -201,10 +189,7 @@ class BluetoothDeviceManager:
         :param device_path: D-Bus object path of the device.
         :return: DBus Interface for the device.
         """
-        return dbus.Interface(
-            self.bus.get_object("org.bluez", device_path),
-            "org.bluez.Device1"
-        )
+        return self.proxies.get_interface(device_path, "org.bluez.Device1")
 
     def pair(self, address, interface=None):
         """
@@ -217,14 +202,15 @@ class BluetoothDeviceManager:
         device_path = self.find_device_path(address, interface)
         if device_path:
             try:
-                device = dbus.Interface(self.bus.get_object("org.bluez", device_path),
-                                        dbus_interface="org.bluez.Device1")
-                device.Pair()
+                device = self.proxies.get_interface(device_path, "org.bluez.Device1")
+                self.retry_policy.run(lambda timeout: device.Pair(timeout=timeout), f"Pair {address}",
+                                      check=lambda: self.object_cache.get_property(device_path, "org.bluez.Device1",
+                                                                                   "Paired", False),
+                                      deadline=45, call_timeout=20)
 
                 # Wait until pairing is confirmed (optional)
-                props = dbus.Interface(self.bus.get_object("org.bluez", device_path),
-                                       "org.freedesktop.DBus.Properties")
-                paired = props.Get("org.bluez.Device1", "Paired")
+                paired = self.object_cache.wait_for_property(device_path, "org.bluez.Device1", "Paired",
+                                                             bool, timeout=2)
                 if paired:
                     print(f"[Bluetooth] Successfully paired with {address} on {interface}")
                     return True
@@ -395,14 +381,7 @@ class BluetoothDeviceManager:
         if not device_path:
             return False
 
-        props = dbus.Interface(
-            self.bus.get_object("org.bluez", device_path),
-            "org.freedesktop.DBus.Properties"
-        )
-        try:
-            return props.Get("org.bluez.Device1", "Paired")
-        except dbus.exceptions.DBusException:
-            return False
+        return bool(self.object_cache.get_property(device_path, "org.bluez.Device1", "Paired", False))
 
     def is_device_connected(self, device_address):
         """
@@ -418,14 +397,7 @@ class BluetoothDeviceManager:
         if not device_path:
             return False
 
-        props = dbus.Interface(
-            self.bus.get_object("org.bluez", device_path),
-            "org.freedesktop.DBus.Properties"
-        )
-        try:
-            return props.Get("org.bluez.Device1", "Connected")
-        except dbus.exceptions.DBusException:
-            return False
+        return bool(self.object_cache.get_property(device_path, "org.bluez.Device1", "Connected", False))
 
     def refresh_device_list(self):
         """
@@ -435,48 +407,32 @@ class BluetoothDeviceManager:
         returns: None
         """
         self.devices.clear()
-        om = dbus.Interface(self.bus.get_object("org.bluez", "/"), "org.freedesktop.DBus.ObjectManager")
-        objects = om.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                props = interfaces["org.bluez.Device1"]
-                address = props.get("Address")
-                name = props.get("Name", "Unknown")
-                uuids = props.get("UUIDs", [])
-                connected = props.get("Connected", False)
-                if address:
-                    self.devices[address] = {
-                        "Name": name,
-                        "UUIDs": uuids,
-                        "Connected": connected,
-                    }
+        for path, props in self.object_cache.get_objects_with_interface("org.bluez.Device1"):
+            address = props.get("Address")
+            name = props.get("Name", "Unknown")
+            uuids = props.get("UUIDs", [])
+            connected = props.get("Connected", False)
+            if address:
+                self.devices[address] = {
+                    "Name": name,
+                    "UUIDs": uuids,
+                    "Connected": connected,
+                }
 
     def get_paired_devices(self, interface=None):
         paired = {}
-        adapter_path = f"/org/bluez/{interface}"
-        om = dbus.Interface(self.bus.get_object("org.bluez", "/"), "org.freedesktop.DBus.ObjectManager")
-        objects = om.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                props = interfaces["org.bluez.Device1"]
-                if props.get("Paired", False) and props.get("Adapter") == adapter_path:
-                    address = props.get("Address")
-                    name = props.get("Name", "Unknown")
-                    paired[address] = name
+        for path, props in self.object_cache.get_devices("Paired", interface):
+            address = props.get("Address")
+            name = props.get("Name", "Unknown")
+            paired[address] = name
         return paired
 
     def get_connected_devices(self, interface=None):
         connected = {}
-        adapter_path = f"/org/bluez/{interface}"
-        om = dbus.Interface(self.bus.get_object("org.bluez", "/"), "org.freedesktop.DBus.ObjectManager")
-        objects = om.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                props = interfaces["org.bluez.Device1"]
-                if props.get("Connected", False) and props.get("Adapter") == adapter_path:
-                    address = props.get("Address")
-                    name = props.get("Name", "Unknown")
-                    connected[address] = name
+        for path, props in self.object_cache.get_devices("Connected", interface):
+            address = props.get("Address")
+            name = props.get("Name", "Unknown")
+            connected[address] = name
         return connected
 
     '''
@@ -563,7 +519,8 @@ class BluetoothDeviceManager:
             # Push the file
             opp_obj = session_bus.get_object(obex_service, session_path)
             opp = dbus.Interface(opp_obj, "org.bluez.obex.ObjectPush1")
-            transfer_path = opp.SendFile(file_path)
+            # SendFile returns the transfer object and its initial properties
+            transfer_path, _ = opp.SendFile(file_path)
             transfer_path = str(transfer_path)
             print(f"Transfer started: {transfer_path}")
 
@@ -652,24 +609,82 @@ class BluetoothDeviceManager:
         self.device_path = self.find_device_path(address,interface=self.interface)
         self.device_sink = self.get_sink_for_device(address)
 
-    def get_sink_for_device(self, address):
+    def get_sink_for_device(self, address, timeout=0):
         """
         Finds the PulseAudio sink associated with a Bluetooth device.
 
         Args:
             address (str): Bluetooth MAC address.
+            timeout (float): Time to wait for the sink to appear, e.g. right after connecting.
 
         Returns:
             str | None: Sink name if found, else None.
         """
+        monitor = PulseAudioMonitor.get()
+        if monitor.is_ready():
+            return monitor.wait_for_sink(address, timeout) if timeout else monitor.get_sink_for_device(address)
+        address_formatted = address.replace(":", "_").lower()
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                sinks_output = subprocess.check_output(["pactl", "list", "short", "sinks"], text=True)
+                for line in sinks_output.splitlines():
+                    if address_formatted in line.lower():
+                        return line.split()[1]
+            except Exception as e:
+                print(f"Error getting sink for device: {e}")
+                return None
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.2)
+
+    def connect_for_streaming(self, address, sink_timeout=5.0):
+        """
+        Connects an A2DP sink if needed and waits for its PulseAudio sink.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            sink_timeout (float): Time to wait for the PulseAudio sink after connecting.
+
+        Returns:
+            tuple: (device path, sink name); the path is None if the device is unknown,
+                the sink None if none appeared in time.
+        Raises:
+            dbus.exceptions.DBusException: If connecting failed after the retry policy gave up.
+        """
+        device_path = self.find_device_path(address, self.interface)
+        if not device_path:
+            return None, None
+        if not self.object_cache.get_property(device_path, "org.bluez.Device1", "Connected", False):
+            device = self.proxies.get_interface(device_path, "org.bluez.Device1")
+            self.retry_policy.run(lambda timeout: device.Connect(timeout=timeout), f"Connect {address}",
+                                  check=lambda: self.object_cache.get_property(device_path, "org.bluez.Device1",
+                                                                               "Connected", False))
+            self.object_cache.wait_for_property(device_path, "org.bluez.Device1", "Connected", bool, timeout=5)
+        return device_path, self.get_sink_for_device(address, timeout=sink_timeout)
+
+    def get_source_for_device(self, address):
+        """
+        Finds the PulseAudio source carrying the audio a Bluetooth A2DP source streams to us.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            str | None: Source name if found, else None.
+        """
+        monitor = PulseAudioMonitor.get()
+        if monitor.is_ready():
+            return monitor.get_source_for_device(address)
         try:
-            sinks_output = subprocess.check_output(["pactl", "list", "short", "sinks"], text=True)
+            sources_output = subprocess.check_output(["pactl", "list", "short", "sources"], text=True)
             address_formatted = address.replace(":", "_").lower()
-            for line in sinks_output.splitlines():
-                if address_formatted in line.lower():
-                    return line.split()[1]
+            for line in sources_output.splitlines():
+                name = line.split()[1]
+                if address_formatted in name.lower() and not name.endswith(".monitor"):
+                    return name
         except Exception as e:
-            print(f"Error getting sink for device: {e}")
+            print(f"Error getting source for device: {e}")
         return None
 
     def is_a2dp_streaming(self) -> bool:
@@ -679,10 +694,13 @@ class BluetoothDeviceManager:
         Returns:
             bool: True if audio is streaming to a Bluetooth A2DP sink, False otherwise.
         """
+        monitor = PulseAudioMonitor.get()
+        if monitor.is_ready():
+            return monitor.is_streaming()
 
         try:
             # Get all active sink inputs (audio streams)
-            output = subprocess.check_output("pactl list sink-inputs", shell=True, text=True)
+            output = subprocess.check_output(["pactl", "list", "sink-inputs"], text=True)
 
             # Check if any sink input is directed to a Bluetooth A2DP sink
             if "bluez_sink" in output:
@@ -695,28 +713,39 @@ class BluetoothDeviceManager:
             return False
 
 
-    def start_a2dp_stream(self, address, filepath=None):
-        device_path = self.find_device_path(address,interface=self.interface)
-        print(device_path)
-        if not device_path:
-            return "Device not found"
+    def start_a2dp_stream(self, address, filepath=None, buffer_ms=500, latency_ms=100):
+        """
+        Connect to an A2DP sink and play an audio file to its PulseAudio sink.
+
+        :param address: Bluetooth MAC address of the sink.
+        :param filepath: Audio file; WAV is memory-mapped, other formats are decoded with ffmpeg.
+        :param buffer_ms: Decoded audio kept ahead of the sink, in milliseconds.
+        :param latency_ms: Latency target of the playback stream, in milliseconds.
+        :return: Status message.
+        """
         try:
+            device_path, sink = self.connect_for_streaming(address, sink_timeout=5.0 if filepath else 0)
+            print(device_path)
+            if not device_path:
+                return "Device not found"
             # Ensure device_address is stored for stop_a2dp_stream
             self.device_address = address # Store the address of the device being streamed to
-            device = dbus.Interface(self.bus.get_object("org.bluez", device_path), "org.bluez.Device1")
-            props = dbus.Interface(self.bus.get_object("org.bluez", device_path), "org.freedesktop.DBus.Properties")
-            connected = props.Get("org.bluez.Device1", "Connected")
-            if not connected:
-                device.Connect()
-                time.sleep(1.5)
             print(f"[A2DP] Connected to {address}")
             if not filepath:
                 return "No audio file specified for streaming"
-            self.stream_process = subprocess.Popen(
-                ["aplay", filepath],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
+            self.stop_a2dp_stream()
+            if not sink:
+                print(f"[A2DP] No sink found for {address}, playing to the default sink")
+            self.audio_stream = AudioStream(filepath, sink=sink, buffer_ms=buffer_ms, latency_ms=latency_ms)
+            self.stream_addresses = [address]
+            telemetry = self.session.get_a2dp_telemetry()
+            telemetry.attach_stream(address, self.audio_stream)
+            telemetry.mark_stream_start(device_path)
+            try:
+                self.audio_stream.start()
+            except Exception:
+                telemetry.cancel_stream_start(device_path)
+                raise
             return f"Streaming started with {filepath}"
         except Exception as e:
             return f"A2DP stream error: {str(e)}"
@@ -727,13 +756,29 @@ class BluetoothDeviceManager:
 
         :return: Status message.
         """
-        if self.stream_process:
-            self.stream_process.terminate()
-            self.stream_process = None
+        if self.audio_stream:
+            self.audio_stream.stop()
+            self.audio_stream = None
+            telemetry = self.session.get_a2dp_telemetry()
+            for address in self.stream_addresses:
+                telemetry.attach_stream(address, None)
+                # A transport that never turned active must not count towards the next stream
+                device_path = self.find_device_path(address, self.interface)
+                if device_path:
+                    telemetry.cancel_stream_start(device_path)
+            self.stream_addresses = []
             return "A2DP stream stopped"
         return "No active A2DP stream"
 
 
+    def _get_connected_devices_with_uuid(self, uuid):
+        # The cache's Connected index replaces a scan of every Device1 on every adapter
+        return {
+            props.get("Address"): props.get("Name", "Unknown")
+            for path, props in self.object_cache.get_devices("Connected", self.interface)
+            if uuid in (str(value).lower() for value in props.get("UUIDs", []))
+        }
+
     def get_connected_a2dp_sink_devices(self):
         """
         Get a list of currently connected A2DP sink devices.
@@ -742,12 +787,7 @@ class BluetoothDeviceManager:
         Returns:
             dict: Dictionary of connected device MAC addresses and their names.
         """
-        self.refresh_device_list()
-        return {
-            addr: dev["Name"]
-            for addr, dev in self.devices.items()
-            if dev["Connected"] and any("110b" in uuid.lower() for uuid in dev["UUIDs"])
-        }
+        return self._get_connected_devices_with_uuid(A2DP_SINK_UUID)
 
     def get_connected_a2dp_source_devices(self):
         """
@@ -757,21 +797,17 @@ class BluetoothDeviceManager:
         Returns:
             dict: Dictionary of connected device MAC addresses and their names.
         """
-        self.refresh_device_list()
-        return {
-            addr: dev["Name"]
-            for addr, dev in self.devices.items()
-            if dev["Connected"] and any("110a" in uuid.lower() for uuid in dev["UUIDs"])
-        }
+        return self._get_connected_devices_with_uuid(A2DP_SOURCE_UUID)
 
 
-    def media_control(self, command):
+    def media_control(self, command, address=None):
         """
         Send an AVRCP media control command to a connected A2DP device.
 
         Supported commands: play, pause, next, previous, rewind.
 
         :param command: The command to send as a string.
+        :param address: Only control this device; the first MediaControl1 found is used if None.
         :return: Result message.
         """
         valid = {
@@ -779,21 +815,513 @@ class BluetoothDeviceManager:
             "pause": "Pause",
             "next": "Next",
             "previous": "Previous",
-            "rewind": "FastRewind"
+            "rewind": "Rewind"
         }
 
         if command not in valid:
             return f"Invalid command: {command}"
 
-        om = dbus.Interface(self.bus.get_object("org.bluez", "/"), "org.freedesktop.DBus.ObjectManager")
-        objects = om.GetManagedObjects()
-
-        for path, interfaces in objects.items():
-            if "org.bluez.MediaControl1" in interfaces:
-                try:
-                    control_iface = dbus.Interface(self.bus.get_object("org.bluez", path), "org.bluez.MediaControl1")
-                    getattr(control_iface, valid[command])()
-                    return f"AVRCP {command} sent to {path}"
-                except Exception as e:
-                    return f"Error sending AVRCP {command}: {str(e)}"
+        device_path = self.find_device_path(address, self.interface) if address else None
+        if address and not device_path:
+            return f"Device {address} not found"
+        for path, props in self.object_cache.get_objects_with_interface("org.bluez.MediaControl1", device_path):
+            try:
+                control_iface = self.proxies.get_interface(path, "org.bluez.MediaControl1")
+                getattr(control_iface, valid[command])()
+                return f"AVRCP {command} sent to {path}"
+            except Exception as e:
+                return f"Error sending AVRCP {command}: {str(e)}"
         return "No MediaControl1 interface found (is device connected as A2DP Source with AVRCP?)"
+
+
+class A2DPManager(BluetoothDeviceManager):
+    """
+    A2DP streaming and AVRCP media control front-end used by the test host UI.
+
+    Shares the adapter's BluezSession with BluezServices, so the UI screens reuse a
+    single object cache and proxy pool.
+    """
+
+    def start_streaming(self, address, filepath, buffer_ms=500, latency_ms=100):
+        """
+        Start streaming an audio file to an A2DP sink.
+
+        Args:
+            address (str): Bluetooth MAC address of the sink.
+            filepath (str): Path of the audio file to stream.
+            buffer_ms (int): Decoded audio kept ahead of the sink, in milliseconds.
+            latency_ms (int): Latency target of the playback stream, in milliseconds.
+
+        Returns:
+            bool: True if streaming started, False otherwise.
+        """
+        result = self.start_a2dp_stream(address, filepath, buffer_ms, latency_ms)
+        print(f"[A2DP] {result}")
+        return result.startswith("Streaming started")
+
+    def stop_streaming(self):
+        """
+        Stop the current A2DP stream.
+
+        args: None
+        Returns:
+            bool: True if a stream was stopped, False if none was active.
+        """
+        result = self.stop_a2dp_stream()
+        print(f"[A2DP] {result}")
+        return result == "A2DP stream stopped"
+
+    def get_stream_status(self):
+        """
+        Returns the state of the current stream.
+
+        args: None
+        Returns:
+            dict | None: Playback state, position, duration, underruns and throughput
+                (see AudioStream.status), None if nothing was streamed.
+        """
+        return self.audio_stream.status() if self.audio_stream else None
+
+    def start_playlist(self, address, items, loop=False, shuffle=False, crossfade_ms=0, buffer_ms=1000,
+                       latency_ms=100):
+        """
+        Stream a playlist to an A2DP sink through a single playback stream.
+
+        Args:
+            address (str): Bluetooth MAC address of the sink.
+            items (str | list): Audio files or directories.
+            loop (bool): Start over once every item was played.
+            shuffle (bool): Play the items in random order.
+            crossfade_ms (int): Overlap between tracks, 0 for gapless transitions.
+            buffer_ms (int): Decoded audio kept ahead of the sink, in milliseconds.
+            latency_ms (int): Latency target of the playback stream, in milliseconds.
+
+        Returns:
+            bool: True if streaming started, False otherwise.
+        """
+        playlist = Playlist(items, loop=loop, shuffle=shuffle)
+        if not len(playlist):
+            print("[A2DP] Playlist is empty")
+            return False
+        try:
+            device_path, sink = self.connect_for_streaming(address)
+            if not device_path:
+                print(f"[A2DP] Device {address} not found")
+                return False
+            self.device_address = address
+            self.stop_a2dp_stream()
+            self.audio_stream = PlaylistStream(playlist, sink=sink, crossfade_ms=crossfade_ms,
+                                               buffer_ms=buffer_ms, latency_ms=latency_ms)
+            self.stream_addresses = [address]
+            telemetry = self.session.get_a2dp_telemetry()
+            telemetry.attach_stream(address, self.audio_stream)
+            telemetry.mark_stream_start(device_path)
+            try:
+                self.audio_stream.start()
+            except Exception:
+                telemetry.cancel_stream_start(device_path)
+                raise
+        except Exception as e:
+            print(f"[A2DP] Playlist stream error: {e}")
+            return False
+        print(f"[A2DP] Playlist of {len(playlist)} tracks started")
+        return True
+
+    def start_fanout(self, addresses, filepath, buffer_ms=500, latency_ms=100, max_lag_ms=500):
+        """
+        Stream one audio file to several A2DP sinks from a single decode.
+
+        Devices without a PulseAudio sink are skipped rather than sent to the default sink;
+        an address listed twice is streamed to once.
+
+        Args:
+            addresses (list): Bluetooth MAC addresses of the sinks.
+            filepath (str): Path of the audio file to stream.
+            buffer_ms (int): Decoded audio kept ahead of the leading sink, in milliseconds.
+            latency_ms (int): Latency target of each playback stream, in milliseconds.
+            max_lag_ms (int): Lag behind the leading sink at which a sink skips audio.
+
+        Returns:
+            list: Addresses streaming, without those whose playback stream could not be
+                opened; empty if streaming could not start.
+        """
+        sinks = {}
+        device_paths = {}
+        for address in addresses:
+            address = address.upper()
+            if address in sinks:
+                continue
+            try:
+                device_path, sink = self.connect_for_streaming(address)
+            except dbus.exceptions.DBusException as e:
+                print(f"[A2DP] Connecting {address} failed, skipped: {e}")
+                continue
+            if not device_path:
+                print(f"[A2DP] Device {address} not found, skipped")
+                continue
+            if not sink:
+                print(f"[A2DP] No sink found for {address}, skipped")
+                continue
+            if sink in sinks.values():
+                print(f"[A2DP] {address} shares its sink {sink}, skipped")
+                continue
+            sinks[address] = sink
+            device_paths[address] = device_path
+        if not sinks:
+            print("[A2DP] No sink to stream to")
+            return []
+        self.stop_a2dp_stream()
+        telemetry = self.session.get_a2dp_telemetry()
+        try:
+            self.audio_stream = FanoutStream(filepath, list(sinks.values()), buffer_ms=buffer_ms,
+                                             latency_ms=latency_ms, max_lag_ms=max_lag_ms)
+            self.stream_addresses = list(sinks)
+            feeds = {feed.sink: feed for feed in self.audio_stream.feeds}
+            for address, sink in sinks.items():
+                # Each device's samples count the underruns of its own feed
+                telemetry.attach_stream(address, feeds[sink])
+                telemetry.mark_stream_start(device_paths[address])
+            self.audio_stream.start()
+        except Exception as e:
+            print(f"[A2DP] Fan-out stream error: {e}")
+            for device_path in device_paths.values():
+                telemetry.cancel_stream_start(device_path)
+            self.stop_a2dp_stream()
+            return []
+        streaming = []
+        for address, sink in sinks.items():
+            if feeds[sink].state == ERROR:
+                # Its playback stream could not be opened, no transport activation will follow
+                telemetry.cancel_stream_start(device_paths[address])
+                telemetry.attach_stream(address, None)
+            else:
+                streaming.append(address)
+        self.stream_addresses = streaming
+        print(f"[A2DP] Streaming {filepath} to {len(streaming)} of {len(sinks)} sinks")
+        return streaming
+
+    def enqueue(self, items):
+        """
+        Add files or directories to the playing playlist.
+
+        Args:
+            items (str | list): Audio files or directories.
+
+        Returns:
+            int: Number of files added, 0 if no playlist is playing.
+        """
+        if not isinstance(self.audio_stream, PlaylistStream):
+            print("[A2DP] No playlist is playing")
+            return 0
+        return self.audio_stream.playlist.enqueue(items)
+
+    def skip_track(self):
+        """
+        Move the playing playlist to its next track.
+
+        args: None
+        Returns:
+            bool: True if a playlist is playing.
+        """
+        if not isinstance(self.audio_stream, PlaylistStream):
+            return False
+        self.audio_stream.skip()
+        return True
+
+    def start_recording(self, address, directory, chunk_seconds=60, max_chunks=None):
+        """
+        Record the audio a connected A2DP source streams to us into rotating WAV files.
+
+        Args:
+            address (str): Bluetooth MAC address of the source device.
+            directory (str): Directory receiving the chunks.
+            chunk_seconds (float): Audio per file, in seconds.
+            max_chunks (int): Files kept on disk including the one being written, every file if None.
+
+        Returns:
+            bool: True if recording started, False otherwise.
+        """
+        source = self.get_source_for_device(address)
+        if not source:
+            print(f"[A2DP] No PulseAudio source for {address}, is it streaming to us?")
+            return False
+        self.stop_recording()
+        prefix = f"a2dp_{address.replace(':', '')}_{time.strftime('%Y%m%d-%H%M%S')}"
+        try:
+            self.recorder = A2DPRecorder(source, directory, chunk_seconds=chunk_seconds, max_chunks=max_chunks,
+                                         prefix=prefix)
+            self.recorder.start()
+        except (RuntimeError, OSError) as e:
+            print(f"[A2DP] Recording error: {e}")
+            self.recorder = None
+            return False
+        print(f"[A2DP] Recording {source} to {directory}")
+        return True
+
+    def stop_recording(self):
+        """
+        Stop the current recording and finalize its last chunk.
+
+        args: None
+        Returns:
+            list: Paths of the recorded chunks, empty if nothing was recording.
+        """
+        if not self.recorder:
+            return []
+        chunks = self.recorder.stop()
+        print(f"[A2DP] Recording stopped, {len(chunks)} chunks")
+        return chunks
+
+    def get_recording_status(self):
+        """
+        Returns the state of the current recording.
+
+        args: None
+        Returns:
+            dict | None: State, current file, chunks, duration and peak level
+                (see A2DPRecorder.status), None if nothing was recorded.
+        """
+        return self.recorder.status() if self.recorder else None
+
+    def start_telemetry(self, interval=1.0):
+        """
+        Samples every A2DP transport of the adapter at a fixed interval.
+
+        Transport changes are recorded even without it; the interval adds samples of
+        the sink latency and of stable links.
+
+        Args:
+            interval (float): Seconds between samples.
+        returns:
+            None
+        """
+        self.session.get_a2dp_telemetry().start(interval)
+
+    def stop_telemetry(self):
+        """
+        Stops the interval sampling started with start_telemetry().
+
+        args: None
+        returns: None
+        """
+        self.session.get_a2dp_telemetry().stop()
+
+    def get_transport_telemetry(self, address, since=None):
+        """
+        Returns the transport time series of a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            since (float): Only return samples taken after this time.time() value.
+
+        Returns:
+            list: Samples with state, codec, delay_ms, volume, sink_latency_ms and underruns.
+        """
+        return self.session.get_a2dp_telemetry().get_samples(address, since)
+
+    def get_transport_events(self, address):
+        """
+        Returns the State, Codec and Configuration changes and stream starts of a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            list: (timestamp, kind, previous, value) tuples.
+        """
+        return self.session.get_a2dp_telemetry().get_events(address)
+
+    def get_telemetry_summary(self, address=None):
+        """
+        Returns the latest sample and stream-start latency statistics per device.
+
+        Args:
+            address (str): Only include this device.
+
+        Returns:
+            dict: Summary per device address, see A2DPTelemetry.summary().
+        """
+        return self.session.get_a2dp_telemetry().summary(address)
+
+    def export_telemetry(self, file_path, address=None):
+        """
+        Writes the transport samples to a CSV file.
+
+        Args:
+            file_path (str): Destination file.
+            address (str): Only export this device.
+        returns:
+            None
+        """
+        self.session.get_a2dp_telemetry().export_csv(file_path, address)
+
+    def list_codec_endpoints(self, address):
+        """
+        Lists the remote stream endpoints of a device and their codec capabilities.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            list: Endpoints with path, role, codec and decoded capabilities, empty if unknown.
+        """
+        try:
+            return A2DPCodecControl(self.session).list_endpoints(address)
+        except ValueError as e:
+            print(f"[A2DP] {e}")
+            return []
+
+    def get_codec_configuration(self, address):
+        """
+        Returns the codec configuration of a device's transport.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            dict | None: Decoded MediaTransport1 Configuration, None without transport.
+        """
+        try:
+            return A2DPCodecControl(self.session).get_configuration(address)
+        except ValueError as e:
+            print(f"[A2DP] {e}")
+            return None
+
+    def select_codec(self, address, codec, configuration=None, timeout=5.0):
+        """
+        Forces the codec used with an A2DP sink and verifies it on the transport.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            codec (str): Codec name, e.g. 'sbc', 'aac', 'aptx', 'ldac'.
+            configuration (bytes): Exact codec configuration, see a2dp_codec.
+            timeout (float): Seconds to wait for the transport to reflect the selection.
+
+        Returns:
+            dict: method, verified flag, error and resulting configuration.
+        """
+        try:
+            result = A2DPCodecControl(self.session).select_codec(address, codec, configuration, timeout=timeout)
+        except ValueError as e:
+            return {"codec": codec, "method": None, "verified": False, "error": str(e), "configuration": None}
+        print(f"[A2DP] Codec {codec} via {result['method']}: "
+              f"{'verified' if result['verified'] else result['error']}")
+        return result
+
+    def set_sbc_bitpool(self, address, min_bitpool, max_bitpool, **options):
+        """
+        Reconfigures SBC with a bitpool range, for bitrate sweeps.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            min_bitpool (int): Lowest bitpool.
+            max_bitpool (int): Highest bitpool.
+            **options: Other sbc_configuration() fields (frequency, channel_mode...).
+
+        Returns:
+            dict: See select_codec(); configuration includes the resulting bitrate.
+        """
+        control = A2DPCodecControl(self.session)
+        try:
+            endpoint = next((endpoint for endpoint in control.list_endpoints(address)
+                             if endpoint["codec"] == "sbc" and endpoint["role"] == "sink"), None)
+            if endpoint is None:
+                raise ValueError(f"No SBC sink endpoint on {address}")
+            configuration = sbc_configuration(bytes.fromhex(endpoint["capabilities"]["raw"]),
+                                              min_bitpool=min_bitpool, max_bitpool=max_bitpool, **options)
+        except ValueError as e:
+            return {"codec": "sbc", "method": None, "verified": False, "error": str(e), "configuration": None}
+        return self.select_codec(address, "sbc", configuration)
+
+    def _send_media_command(self, command, address):
+        result = self.media_control(command, address)
+        print(f"[AVRCP] {result}")
+        return result.startswith("AVRCP")
+
+    def play(self, address):
+        """
+        Send AVRCP Play to a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            bool: True if the command was sent.
+        """
+        return self._send_media_command("play", address)
+
+    def pause(self, address):
+        """
+        Send AVRCP Pause to a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            bool: True if the command was sent.
+        """
+        return self._send_media_command("pause", address)
+
+    def next(self, address):
+        """
+        Send AVRCP Next to a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            bool: True if the command was sent.
+        """
+        return self._send_media_command("next", address)
+
+    def previous(self, address):
+        """
+        Send AVRCP Previous to a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            bool: True if the command was sent.
+        """
+        return self._send_media_command("previous", address)
+
+    def rewind(self, address):
+        """
+        Send AVRCP Rewind to a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            bool: True if the command was sent.
+        """
+        return self._send_media_command("rewind", address)
+
+    def get_a2dp_role(self, address):
+        """
+        Tells whether a connected device acts as an A2DP sink, source or both.
+
+        Only the device's own cached properties are read, instead of listing every
+        connected sink and source.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            str | None: 'sink', 'source' or 'both'; None if not connected or not A2DP.
+        """
+        device_path = self.find_device_path(address, self.interface)
+        if not device_path or not self.object_cache.get_property(device_path, "org.bluez.Device1", "Connected", False):
+            return None
+        uuids = [str(uuid).lower() for uuid in self.object_cache.get_property(device_path, "org.bluez.Device1",
+                                                                              "UUIDs", [])]
+        sink = A2DP_SINK_UUID in uuids
+        source = A2DP_SOURCE_UUID in uuids
+        if sink and source:
+            return "both"
+        elif sink:
+            return "sink"
+        elif source:
+            return "source"
+        return None
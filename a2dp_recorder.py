@@ -0,0 +1,277 @@
+import os
+import shutil
+import struct
+import subprocess
+import threading
+import time
+
+from Backend_lib.Linux.audio_stream import ERROR, FINISHED, STARTING, STOPPED, PcmSpec, audioop
+
+RECORDING = "recording"
+
+# WAV format tag of each PulseAudio sample format parec may produce.
+WAV_FORMAT_TAGS = {"u8": 0x0001, "s16le": 0x0001, "s24le": 0x0001, "s32le": 0x0001, "float32le": 0x0003}
+
+
+class WavChunkWriter:
+    """
+    Writes PCM to a sequence of WAV files of a fixed maximum size.
+
+    Each file's header is written with empty sizes and patched when the file is
+    closed, so nothing but the current block is held in memory. With max_chunks
+    set, the oldest files are deleted to keep at most that many on disk, the file
+    being written included.
+    """
+
+    def __init__(self, directory, prefix, spec, chunk_seconds=60, max_chunks=None):
+        """
+        Initializes the writer; the first file is created on the first write.
+
+        Args:
+            directory (str): Directory receiving the files, created if missing.
+            prefix (str): File name prefix; files are named <prefix>_<index>.wav.
+            spec (PcmSpec): Format of the PCM data.
+            chunk_seconds (float): Audio per file, in seconds.
+            max_chunks (int): Files kept on disk including the one being written, every file if None.
+        returns:
+            None
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.spec = spec
+        self.chunk_bytes = max(spec.frame_size, int(spec.bytes_per_second * chunk_seconds)
+                               // spec.frame_size * spec.frame_size)
+        self.max_chunks = max_chunks
+        self.file = None
+        self.path = None
+        self.index = 0
+        self.file_bytes = 0
+        self.total_bytes = 0
+        self.chunks = []
+        self.deleted = 0
+
+    def _header(self, data_bytes):
+        spec = self.spec
+        return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_bytes, b"WAVE", b"fmt ", 16,
+                           WAV_FORMAT_TAGS[spec.sample_format], spec.channels, spec.rate, spec.bytes_per_second,
+                           spec.frame_size, spec.sample_width * 8, b"data", data_bytes)
+
+    def _open_next(self):
+        # The file about to be opened counts toward max_chunks
+        while self.max_chunks and len(self.chunks) >= self.max_chunks:
+            oldest = self.chunks.pop(0)
+            try:
+                os.remove(oldest)
+                self.deleted += 1
+            except OSError as e:
+                print(f"[A2DPRecorder] Cannot delete {oldest}: {e}")
+        self.index += 1
+        self.path = os.path.join(self.directory, f"{self.prefix}_{self.index:04d}.wav")
+        self.file = open(self.path, "wb")
+        self.file.write(self._header(0))
+        self.file_bytes = 0
+
+    def _close_current(self):
+        if self.file is None:
+            return
+        self.file.seek(0)
+        self.file.write(self._header(self.file_bytes))
+        self.file.close()
+        self.file = None
+        self.chunks.append(self.path)
+
+    def write(self, data):
+        """
+        Appends PCM, switching to a new file whenever the current one is full.
+
+        Args:
+            data (bytes | memoryview): Frame-aligned PCM.
+        returns:
+            None
+        """
+        view = memoryview(data)
+        while view:
+            if self.file is None:
+                self._open_next()
+            room = self.chunk_bytes - self.file_bytes
+            part = view[:room]
+            self.file.write(part)
+            self.file_bytes += len(part)
+            self.total_bytes += len(part)
+            view = view[len(part):]
+            if self.file_bytes >= self.chunk_bytes:
+                self._close_current()
+
+    def close(self):
+        """
+        Finalizes the current file.
+
+        args: None
+        returns: None
+        """
+        self._close_current()
+
+
+class A2DPRecorder:
+    """
+    Records the audio a Bluetooth A2DP source streams to us into rotating WAV files.
+
+    A parec capture of the device's PulseAudio source is read into one preallocated
+    block by a reader thread and appended to fixed-size WAV chunks, so memory use
+    stays constant however long the capture runs.
+    """
+
+    def __init__(self, source, directory, spec=None, chunk_seconds=60, max_chunks=None, prefix="a2dp_capture",
+                 block_ms=100):
+        """
+        Initializes the recorder; start() begins capturing.
+
+        Args:
+            source (str): PulseAudio source name, the default source if None.
+            directory (str): Directory receiving the chunks.
+            spec (PcmSpec): Capture format, 44.1 kHz stereo s16le if None.
+            chunk_seconds (float): Audio per file, in seconds.
+            max_chunks (int): Files kept on disk including the one being written (oldest
+                deleted first), every file if None.
+            prefix (str): File name prefix.
+            block_ms (int): Audio read from parec at a time, in milliseconds.
+        returns:
+            None
+        """
+        self.source = source
+        self.spec = spec or PcmSpec()
+        self.block_ms = block_ms
+        self.writer = WavChunkWriter(directory, prefix, self.spec, chunk_seconds, max_chunks)
+        self.process = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.state = STARTING
+        self.error = None
+        self.peak = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        """
+        Starts parec and the reader thread.
+
+        args: None
+        returns: None
+        Raises:
+            RuntimeError | OSError: If parec is missing or cannot run.
+        """
+        parec = shutil.which("parec")
+        if not parec:
+            raise RuntimeError("parec is required for recording")
+        command = [parec, "--raw", f"--format={self.spec.sample_format}", f"--rate={self.spec.rate}",
+                   f"--channels={self.spec.channels}", f"--latency-msec={self.block_ms}",
+                   "--client-name=bluez-test-host", "--stream-name=a2dp capture"]
+        if self.source:
+            command.append(f"--device={self.source}")
+        self.process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, bufsize=0)
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self._read, name="A2DPRecorder", daemon=True)
+        self.thread.start()
+
+    def _read(self):
+        frames = max(1, self.spec.rate * self.block_ms // 1000)
+        block = bytearray(frames * self.spec.frame_size)
+        view = memoryview(block)
+        pending = 0
+        stdout = self.process.stdout
+        try:
+            with self.lock:
+                # stop() may already have run; never overwrite STOPPED
+                if self.state == STARTING:
+                    self.state = RECORDING
+            while not self.stop_event.is_set():
+                count = stdout.readinto(view[pending:])
+                if not count:
+                    break
+                pending += count
+                # Only write whole frames; the remainder is kept at the start of the block
+                whole = pending - pending % self.spec.frame_size
+                if not whole:
+                    continue
+                data = view[:whole]
+                self.writer.write(data)
+                if audioop is not None and self.spec.sample_format == "s16le":
+                    self.peak = audioop.max(data, 2)
+                view[:pending - whole] = view[whole:pending]
+                pending -= whole
+            self.process.wait()
+            with self.lock:
+                if self.state == RECORDING:
+                    self.state = FINISHED if self.process.returncode == 0 else ERROR
+                    if self.state == ERROR:
+                        self.error = f"parec exited with code {self.process.returncode}"
+        except (OSError, ValueError) as e:
+            if not self.stop_event.is_set():
+                print(f"[A2DPRecorder] Capture failed: {e}")
+                with self.lock:
+                    self.state = ERROR
+                    self.error = str(e)
+        finally:
+            try:
+                self.writer.close()
+            except OSError as e:
+                print(f"[A2DPRecorder] Cannot finalize {self.writer.path}: {e}")
+            self.finished_at = time.monotonic()
+
+    def stop(self):
+        """
+        Stops the capture and finalizes the current chunk.
+
+        args: None
+        Returns:
+            list: Paths of the chunks on disk.
+        """
+        with self.lock:
+            if self.state in (STARTING, RECORDING):
+                self.state = STOPPED
+        self.stop_event.set()
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.thread:
+            self.thread.join(timeout=5)
+        return list(self.writer.chunks)
+
+    def is_active(self):
+        """
+        Tells whether the recorder is capturing.
+
+        args: None
+        Returns:
+            bool: True until the capture is stopped or fails.
+        """
+        return self.state in (STARTING, RECORDING)
+
+    def status(self):
+        """
+        Returns the capture state and counters.
+
+        args: None
+        Returns:
+            dict: state, error, source, current file, finished chunks, chunks deleted
+                by rotation, seconds recorded, bytes recorded and the last peak level
+                (0-32767 for s16le).
+        """
+        total_bytes = self.writer.total_bytes
+        return {
+            "state": self.state,
+            "error": self.error,
+            "source": self.source,
+            "file": self.writer.path if self.writer.file else None,
+            "chunks": list(self.writer.chunks),
+            "deleted": self.writer.deleted,
+            "duration": total_bytes / self.spec.bytes_per_second,
+            "bytes_recorded": total_bytes,
+            "peak": self.peak,
+        }
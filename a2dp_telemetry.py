@@ -0,0 +1,473 @@
+import array
+import collections
+import csv
+import threading
+import time
+
+from Backend_lib.Linux.latency import MEDIA_TRANSPORT_IFACE, LatencyHistogram
+from Backend_lib.Linux.pulse_monitor import PulseAudioMonitor, pulsectl
+
+# MediaTransport1.State values, stored as their index; -1 means no transport.
+TRANSPORT_STATES = ("idle", "pending", "broadcasting", "active")
+
+# Properties whose changes are also logged as events.
+EVENT_PROPERTIES = ("State", "Codec", "Configuration")
+
+UNKNOWN = -1
+
+
+class TransportSeries:
+    """
+    Preallocated ring of telemetry samples of one device.
+
+    Every column is an array, so a sample costs a few bytes instead of a dict; the
+    oldest samples are overwritten once the ring is full. Missing values are stored
+    as -1.
+    """
+
+    COLUMNS = (
+        ("timestamp", 'd'),
+        ("state", 'b'),
+        ("codec", 'h'),
+        ("delay", 'l'),
+        ("volume", 'l'),
+        ("sink_latency_us", 'q'),
+        ("underruns", 'q'),
+    )
+
+    def __init__(self, capacity=3600):
+        """
+        Allocates the ring.
+
+        Args:
+            capacity (int): Number of samples kept.
+        returns:
+            None
+        """
+        self.capacity = capacity
+        self.columns = {name: array.array(code, [0]) * capacity for name, code in self.COLUMNS}
+        self.write_index = 0
+        self.count = 0
+        self.total = 0
+
+    def append(self, timestamp, state, codec, delay, volume, sink_latency_us, underruns):
+        """
+        Records one sample; the caller serializes access.
+
+        Args:
+            timestamp (float): time.time() of the sample.
+            state (int): Index in TRANSPORT_STATES, -1 without transport.
+            codec (int): A2DP codec id.
+            delay (int): Transport delay in 1/10 ms.
+            volume (int): Transport volume, 0-127.
+            sink_latency_us (int): PulseAudio sink latency in microseconds.
+            underruns (int): Underruns counted by the streaming engine so far.
+        returns:
+            None
+        """
+        index = self.write_index
+        values = (timestamp, state, codec, delay, volume, sink_latency_us, underruns)
+        for (name, _), value in zip(self.COLUMNS, values):
+            self.columns[name][index] = value
+        self.write_index = index + 1 if index + 1 < self.capacity else 0
+        self.count = min(self.count + 1, self.capacity)
+        self.total += 1
+
+    def samples(self, since=None):
+        """
+        Returns the kept samples in chronological order.
+
+        Args:
+            since (float): Only return samples taken after this time.time() value.
+
+        Returns:
+            list: Dicts with timestamp, state (name or None), codec, delay_ms, volume,
+                sink_latency_ms and underruns; unknown values are None.
+        """
+        start = (self.write_index - self.count) % self.capacity
+        result = []
+        for offset in range(self.count):
+            index = (start + offset) % self.capacity
+            timestamp = self.columns["timestamp"][index]
+            if since is not None and timestamp <= since:
+                continue
+            state = self.columns["state"][index]
+            codec, delay, volume, sink_latency, underruns = (
+                self.columns[name][index] for name in ("codec", "delay", "volume", "sink_latency_us", "underruns"))
+            result.append({
+                "timestamp": timestamp,
+                "state": TRANSPORT_STATES[state] if state != UNKNOWN else None,
+                "codec": codec if codec != UNKNOWN else None,
+                "delay_ms": delay / 10.0 if delay != UNKNOWN else None,
+                "volume": volume if volume != UNKNOWN else None,
+                "sink_latency_ms": sink_latency / 1000.0 if sink_latency != UNKNOWN else None,
+                "underruns": underruns if underruns != UNKNOWN else None,
+            })
+        return result
+
+    def __len__(self):
+        return self.count
+
+
+class A2DPTelemetry:
+    """
+    Samples the A2DP link of every device into per-device time series.
+
+    A sample combines the device's MediaTransport1 properties (State, Codec, Delay,
+    Volume) from the object cache, the latency of its PulseAudio sink and the underrun
+    count of the stream attached with attach_stream(). Samples are taken whenever a
+    transport property changes and, once start() was called, every interval seconds
+    for each transport. State, Codec and Configuration changes are also kept as
+    events, so glitches can be matched with codec renegotiation or link drops.
+
+    The time from mark_stream_start() to the transport turning active is recorded
+    as the stream-start latency of the device.
+    """
+
+    def __init__(self, object_cache, adapter=None, capacity=3600, max_events=1024):
+        """
+        Initializes the telemetry and subscribes to the cache.
+
+        Args:
+            object_cache (BluezObjectCache): Cache delivering transport changes.
+            adapter (str): Only sample transports of this interface (e.g., 'hci0'), every adapter if None.
+            capacity (int): Samples kept per device.
+            max_events (int): Events kept per device.
+        returns:
+            None
+        """
+        self.object_cache = object_cache
+        self.path_prefix = f"/org/bluez/{adapter}/" if adapter else None
+        self.capacity = capacity
+        self.max_events = max_events
+        self.series = {}
+        self.events = {}
+        self.streams = {}
+        self.pending_starts = {}
+        self.stream_start = {}
+        self.last_values = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.interval = None
+        self.pulse = None
+        object_cache.add_listener(self._on_cache_event)
+
+    def close(self):
+        """
+        Stops sampling and listening to the object cache.
+
+        args: None
+        returns: None
+        """
+        self.stop()
+        self.object_cache.remove_listener(self._on_cache_event)
+
+    def start(self, interval=1.0):
+        """
+        Starts sampling every transport at a fixed interval, on top of on-change samples.
+
+        Args:
+            interval (float): Seconds between samples.
+        returns:
+            None
+        """
+        self.interval = interval
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="A2DPTelemetry", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the interval sampling; on-change samples continue.
+
+        args: None
+        returns: None
+        """
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def is_running(self):
+        """
+        Tells whether interval sampling is active.
+
+        args: None
+        Returns:
+            bool: True if the sampler thread runs.
+        """
+        return bool(self.thread and self.thread.is_alive())
+
+    def attach_stream(self, address, stream):
+        """
+        Includes the underrun count of a stream in the device's samples.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            stream (AudioStream | SinkFeed): Stream, or fan-out feed, playing to the device;
+                its underruns attribute is sampled. None to detach.
+        returns:
+            None
+        """
+        with self.lock:
+            if stream is None:
+                self.streams.pop(address.upper(), None)
+            else:
+                self.streams[address.upper()] = stream
+
+    def mark_stream_start(self, device_path):
+        """
+        Marks the start of a stream, call right before playback starts.
+
+        Nothing is recorded if the transport is already active, as no transition
+        will follow.
+
+        Args:
+            device_path (str): Device object path.
+        returns:
+            None
+        """
+        device_path = str(device_path)
+        for path, props in self.object_cache.get_objects_with_interface(MEDIA_TRANSPORT_IFACE, device_path + "/"):
+            if str(props.get("State", "")) == "active":
+                return
+        with self.lock:
+            self.pending_starts[device_path] = time.monotonic()
+
+    def cancel_stream_start(self, device_path):
+        """
+        Forgets a mark_stream_start() whose stream failed to start.
+
+        Otherwise the next, unrelated transport activation would be recorded as
+        the start latency of that stream.
+
+        Args:
+            device_path (str): Device object path.
+        returns:
+            None
+        """
+        with self.lock:
+            self.pending_starts.pop(str(device_path), None)
+
+    def _device_path_of(self, path):
+        # MediaTransport1 objects live below the device, e.g. .../dev_XX/sep1/fd0
+        return "/".join(path.split("/")[:5])
+
+    def _address_of(self, device_path):
+        key = self.object_cache.get_device_key(device_path)
+        if key is not None:
+            return key[1]
+        parts = device_path.split("/")
+        return parts[4][4:].replace("_", ":") if len(parts) > 4 else device_path
+
+    def _on_cache_event(self, event, path, data):
+        if self.path_prefix and not path.startswith(self.path_prefix):
+            return
+        if event == "added" and MEDIA_TRANSPORT_IFACE in data:
+            self._sample(path, data[MEDIA_TRANSPORT_IFACE], changed=data[MEDIA_TRANSPORT_IFACE])
+        elif event == "changed" and data[0] == MEDIA_TRANSPORT_IFACE:
+            props = self.object_cache.get_properties(path, MEDIA_TRANSPORT_IFACE)
+            if props is not None:
+                self._sample(path, props, changed=data[1])
+        elif event == "removed" and MEDIA_TRANSPORT_IFACE in data:
+            device_path = self._device_path_of(path)
+            address = self._address_of(device_path)
+            with self.lock:
+                self.pending_starts.pop(device_path, None)
+                self.last_values.pop(address, None)
+                self._series(address).append(time.time(), UNKNOWN, UNKNOWN, UNKNOWN, UNKNOWN, UNKNOWN,
+                                             self._underruns(address))
+                self._event(address, "transport", path, None)
+
+    def _series(self, address):
+        # Caller holds the lock
+        series = self.series.get(address)
+        if series is None:
+            series = self.series[address] = TransportSeries(self.capacity)
+            self.events[address] = collections.deque(maxlen=self.max_events)
+        return series
+
+    def _event(self, address, kind, previous, value):
+        # Caller holds the lock
+        self._series(address)
+        self.events[address].append((time.time(), kind, previous, value))
+
+    def _underruns(self, address):
+        # Caller holds the lock
+        stream = self.streams.get(address)
+        return stream.underruns if stream is not None else UNKNOWN
+
+    def _sample(self, path, props, changed=None, sink_latency_us=UNKNOWN):
+        device_path = self._device_path_of(path)
+        address = self._address_of(device_path)
+        state = str(props.get("State", ""))
+        now = time.time()
+        start_latency_ms = None
+        with self.lock:
+            if changed:
+                last = self.last_values.setdefault(address, {})
+                for name in EVENT_PROPERTIES:
+                    if name in changed:
+                        value = _event_value(name, changed[name])
+                        if value != last.get(name):
+                            self._event(address, name.lower(), last.get(name), value)
+                            last[name] = value
+            if state == "active" and device_path in self.pending_starts:
+                start_latency_ms = (time.monotonic() - self.pending_starts.pop(device_path)) * 1000.0
+                self.stream_start.setdefault(address, LatencyHistogram()).add(start_latency_ms)
+                self._event(address, "stream_start_ms", None, round(start_latency_ms, 3))
+            self._series(address).append(
+                now,
+                TRANSPORT_STATES.index(state) if state in TRANSPORT_STATES else UNKNOWN,
+                int(props["Codec"]) if "Codec" in props else UNKNOWN,
+                int(props["Delay"]) if "Delay" in props else UNKNOWN,
+                int(props["Volume"]) if "Volume" in props else UNKNOWN,
+                sink_latency_us,
+                self._underruns(address),
+            )
+        if start_latency_ms is not None:
+            print(f"[A2DPTelemetry] {address} transport active {start_latency_ms:.1f} ms after stream start")
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.sample_all()
+            except Exception as e:
+                print(f"[A2DPTelemetry] Sampling failed: {e}")
+        if self.pulse is not None:
+            self.pulse.close()
+            self.pulse = None
+
+    def sample_all(self):
+        """
+        Takes one sample of every transport.
+
+        Transport properties come from the object cache, so no D-Bus call is made;
+        sink latencies are queried from PulseAudio over one native connection.
+
+        args: None
+        returns: None
+        """
+        for path, props in self.object_cache.get_objects_with_interface(MEDIA_TRANSPORT_IFACE, self.path_prefix):
+            address = self._address_of(self._device_path_of(path))
+            self._sample(path, props, sink_latency_us=self._sink_latency(address))
+
+    def _sink_latency(self, address):
+        # Sink entries of the monitor are only refreshed on events, query the live value.
+        if pulsectl is None:
+            return UNKNOWN
+        monitor = PulseAudioMonitor.get()
+        if not monitor.is_ready():
+            return UNKNOWN
+        sink = monitor.get_sink_for_device(address)
+        if sink is None:
+            return UNKNOWN
+        try:
+            if self.pulse is None:
+                self.pulse = pulsectl.Pulse("bluez-test-host-telemetry")
+            return int(self.pulse.get_sink_by_name(sink).latency)
+        except pulsectl.PulseError:
+            if self.pulse is not None:
+                self.pulse.close()
+                self.pulse = None
+            return UNKNOWN
+
+    def get_samples(self, address, since=None):
+        """
+        Returns the time series of a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            since (float): Only return samples taken after this time.time() value.
+
+        Returns:
+            list: Samples, see TransportSeries.samples().
+        """
+        with self.lock:
+            series = self.series.get(address.upper())
+            return series.samples(since) if series else []
+
+    def get_events(self, address):
+        """
+        Returns the logged transport events of a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            list: (timestamp, kind, previous, value) tuples, kind being 'state', 'codec',
+                'configuration', 'transport' (removal) or 'stream_start_ms'.
+        """
+        with self.lock:
+            return list(self.events.get(address.upper(), ()))
+
+    def get_stream_start_latency(self, address=None):
+        """
+        Returns the stream-start latencies of a device, or of every device merged.
+
+        Args:
+            address (str): Bluetooth MAC address, None for every device.
+
+        Returns:
+            LatencyHistogram: Milliseconds from mark_stream_start() to State 'active'.
+        """
+        merged = LatencyHistogram()
+        with self.lock:
+            for key, histogram in self.stream_start.items():
+                if address is None or key == address.upper():
+                    merged.merge(histogram)
+        return merged
+
+    def summary(self, address=None):
+        """
+        Returns the latest sample, event count and stream-start statistics per device.
+
+        Args:
+            address (str): Only include this device.
+
+        Returns:
+            dict: {address: {"last": sample, "samples": n, "events": n, "stream_start": statistics}}.
+        """
+        with self.lock:
+            addresses = [key for key in self.series if address is None or key == address.upper()]
+        report = {}
+        for key in addresses:
+            samples = self.get_samples(key)
+            report[key] = {
+                "last": samples[-1] if samples else None,
+                "samples": len(samples),
+                "events": len(self.get_events(key)),
+                "stream_start": self.get_stream_start_latency(key).summary(),
+            }
+        return report
+
+    def export_csv(self, file_path, address=None):
+        """
+        Writes the samples of one or every device to a CSV file.
+
+        Args:
+            file_path (str): Destination file.
+            address (str): Only export this device.
+        returns:
+            None
+        """
+        with self.lock:
+            addresses = [key for key in self.series if address is None or key == address.upper()]
+        fields = ["timestamp", "state", "codec", "delay_ms", "volume", "sink_latency_ms", "underruns"]
+        with open(file_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["address"] + fields)
+            for key in addresses:
+                for sample in self.get_samples(key):
+                    writer.writerow([key] + ["" if sample[name] is None else sample[name] for name in fields])
+
+
+def _event_value(name, value):
+    if name == "Configuration":
+        return bytes(bytearray(value)).hex()
+    if name == "Codec":
+        return int(value)
+    return str(value)
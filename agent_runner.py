@@ -3,6 +3,7 @@ import dbus.mainloop.glib
 from gi.repository import GLib
 from threading import Thread
 from Backend_lib.Linux.agent import Agent
+from Backend_lib.Linux.async_bluez import register_main_loop
 
 
 class AgentRunner:
@@ -57,7 +58,8 @@ class AgentRunner:
         manager.RequestDefaultAgent(self.agent_path)
         print(f"[Agent] Registered with capability: {self.capability}")
 
-        # Run the GLib main loop in a background thread
+        # Run the GLib main loop in a background thread; async clients reuse it
+        register_main_loop(self.mainloop)
         thread = Thread(target=self.mainloop.run, daemon=True)
         thread.start()
 
@@ -72,3 +74,4 @@ class AgentRunner:
         """
         if self.mainloop and self.mainloop.is_running():
             self.mainloop.quit()
+            register_main_loop(None)
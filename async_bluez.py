@@ -0,0 +1,332 @@
+import asyncio
+import threading
+import time
+
+import dbus
+import dbus.mainloop.glib
+from gi.repository import GLib
+
+from Backend_lib.Linux.object_cache import BluezObjectCache
+from Backend_lib.Linux.proxy_pool import ProxyPool
+
+# Set the D-Bus main loop
+dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+
+DEFAULT_TIMEOUT = 25.0
+
+_main_loop = None
+_main_loop_lock = threading.Lock()
+
+
+def ensure_main_loop():
+    """
+    Runs a GLib main loop in a daemon thread unless one already iterates the default context.
+
+    Asynchronous D-Bus replies and signals are only dispatched while a GLib main loop
+    iterates the default context. The UI already runs one through AgentRunner, which
+    registers it with register_main_loop(); a loop started by other code is detected
+    because its thread owns the default context. Two loops would compete for the
+    same dispatch, so a loop is only started here when none runs.
+
+    args: None
+    Returns:
+        GLib.MainLoop | None: The running main loop, None if an unregistered loop of
+            other code iterates the default context.
+    """
+    global _main_loop
+    with _main_loop_lock:
+        if _main_loop is not None:
+            return _main_loop
+        context = GLib.MainContext.default()
+        if not context.acquire():
+            return None  # owned by a loop running in another thread
+        context.release()
+        _main_loop = GLib.MainLoop()
+        threading.Thread(target=_main_loop.run, daemon=True).start()
+    return _main_loop
+
+
+def register_main_loop(loop):
+    """
+    Records a GLib main loop that iterates the default context, started outside this module.
+
+    Args:
+        loop (GLib.MainLoop): The loop, None to forget a loop that was quit.
+    returns:
+        None
+    """
+    global _main_loop
+    with _main_loop_lock:
+        _main_loop = loop
+
+
+class AsyncBluezServices:
+    """
+    Asyncio counterpart of BluezServices for driving many devices from one event loop.
+
+    Every BlueZ method is issued as a non-blocking D-Bus call (reply_handler /
+    error_handler) whose reply is handed back to the asyncio loop, so awaiting
+    Pair() on one device never blocks calls to the others. Each call takes its own
+    timeout and can be cancelled; cancelling Pair/Connect/ConnectProfile also asks
+    BlueZ to abort the pending operation.
+    """
+
+    def __init__(self, interface=None, bus=None, object_cache=None, proxies=None,
+                 default_timeout=DEFAULT_TIMEOUT, run_main_loop=True, latency_tracker=None):
+        """
+        Initializes the asynchronous client.
+
+        Args:
+            interface (str): Name of the Bluetooth interface (e.g., 'hci0').
+            bus (dbus.Bus): Bus to use, defaults to the system bus.
+            object_cache (BluezObjectCache): Cache used to resolve device paths.
+            proxies (ProxyPool): Pool providing the interface wrappers.
+            default_timeout (float): Timeout in seconds when a call does not give one.
+            run_main_loop (bool): Start a GLib main loop thread if none was started here.
+            latency_tracker (ConnectionLatencyTracker): Optional tracker told about
+                Connect()/ConnectProfile() calls.
+        returns:
+            None
+        """
+        self.interface = interface
+        self.adapter_path = f'/org/bluez/{self.interface}'
+        self.bus = bus or dbus.SystemBus()
+        self.object_cache = object_cache or BluezObjectCache(self.bus)
+        self.proxies = proxies or ProxyPool(self.bus, object_cache=self.object_cache)
+        self.default_timeout = default_timeout
+        self.latency_tracker = latency_tracker
+        if run_main_loop:
+            ensure_main_loop()
+
+    def find_device_path(self, address):
+        """
+        Finds the object path of a device on this adapter.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            str | None: Object path if found, else None.
+        """
+        return self.object_cache.find_device_path(address, self.interface)
+
+    def _require_device_path(self, address):
+        device_path = self.find_device_path(address)
+        if not device_path:
+            raise LookupError(f"Device {address} not found on {self.interface}")
+        return device_path
+
+    async def call(self, path, interface, method, *args, timeout=None, on_cancel=None):
+        """
+        Issues one non-blocking D-Bus method call and awaits its reply.
+
+        Args:
+            path (str): Object path.
+            interface (str): D-Bus interface name.
+            method (str): Method name.
+            *args: Method arguments.
+            timeout (float): Seconds to wait for the reply, default_timeout if None.
+            on_cancel (callable): Invoked when the call times out or is cancelled.
+
+        Returns:
+            The method's return value, None for methods without one.
+
+        Raises:
+            asyncio.TimeoutError: If no reply arrived in time.
+            dbus.exceptions.DBusException: If BlueZ returned an error.
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(*result):
+            if not future.done():
+                future.set_result(result[0] if len(result) == 1 else (result or None))
+
+        def reject(error):
+            if not future.done():
+                future.set_exception(error)
+
+        def reply_handler(*result):
+            loop.call_soon_threadsafe(resolve, *result)
+
+        def error_handler(error):
+            if isinstance(error, dbus.exceptions.DBusException) and \
+                    error.get_dbus_name() == "org.freedesktop.DBus.Error.NoReply":
+                error = asyncio.TimeoutError(f"{method} on {path} timed out")
+            loop.call_soon_threadsafe(reject, error)
+
+        proxy = self.proxies.get_interface(path, interface)
+        # The D-Bus timeout is a backstop slightly past the asyncio deadline so that the
+        # reply slot is always released even if nobody awaits the future any more.
+        getattr(proxy, method)(*args, reply_handler=reply_handler, error_handler=error_handler,
+                               timeout=timeout + 1.0)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if on_cancel:
+                on_cancel()
+            raise
+
+    async def wait_for_property(self, path, interface, name, predicate=bool, timeout=None):
+        """
+        Awaits until a cached property satisfies predicate, woken by cache events.
+
+        Args:
+            path (str): D-Bus object path.
+            interface (str): D-Bus interface name.
+            name (str): Property name.
+            predicate (callable): Test applied to the property value.
+            timeout (float): Seconds to wait, default_timeout if None.
+
+        Returns:
+            bool: True if the predicate was met in time, False otherwise.
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def check():
+            if future.done():
+                return
+            props = self.object_cache.get_properties(path, interface)
+            if props is not None and name in props and predicate(props[name]):
+                future.set_result(True)
+
+        def listener(event, event_path, data):
+            if event_path == path:
+                loop.call_soon_threadsafe(check)
+
+        self.object_cache.add_listener(listener)
+        try:
+            check()
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.object_cache.remove_listener(listener)
+
+    def _fire_and_forget(self, path, interface, method, *args):
+        """
+        Sends a best-effort D-Bus call whose reply and errors are ignored.
+
+        Args:
+            path (str): Object path.
+            interface (str): D-Bus interface name.
+            method (str): Method name.
+            *args: Method arguments.
+        returns:
+            None
+        """
+        proxy = self.proxies.get_interface(path, interface)
+        getattr(proxy, method)(*args, reply_handler=lambda *result: None,
+                               error_handler=lambda error: None)
+
+    async def pair(self, address, timeout=None):
+        """
+        Pairs with a device; cancellation issues CancelPairing().
+
+        Args:
+            address (str): Bluetooth MAC address.
+            timeout (float): Seconds to wait for the reply.
+
+        Returns:
+            bool: True once BlueZ acknowledged the pairing.
+        """
+        device_path = self._require_device_path(address)
+        await self.call(device_path, "org.bluez.Device1", "Pair", timeout=timeout,
+                        on_cancel=lambda: self._fire_and_forget(device_path, "org.bluez.Device1",
+                                                                "CancelPairing"))
+        return True
+
+    async def trust(self, address, trusted=True, timeout=None):
+        """
+        Sets the Trusted property of a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            trusted (bool): Value to set.
+            timeout (float): Seconds to wait for the reply.
+
+        Returns:
+            bool: True once the property was set.
+        """
+        device_path = self._require_device_path(address)
+        await self.call(device_path, "org.freedesktop.DBus.Properties", "Set",
+                        "org.bluez.Device1", "Trusted", dbus.Boolean(trusted), timeout=timeout)
+        return True
+
+    async def connect(self, address, timeout=None):
+        """
+        Connects all auto-connectable profiles; cancellation issues Disconnect(),
+        which BlueZ documents as the way to abort a pending Connect().
+
+        Args:
+            address (str): Bluetooth MAC address.
+            timeout (float): Seconds to wait for the reply.
+
+        Returns:
+            bool: True once BlueZ acknowledged the connection.
+        """
+        device_path = self._require_device_path(address)
+        if self.latency_tracker:
+            self.latency_tracker.mark_connect_start(device_path)
+        await self.call(device_path, "org.bluez.Device1", "Connect", timeout=timeout,
+                        on_cancel=lambda: self._fire_and_forget(device_path, "org.bluez.Device1",
+                                                                "Disconnect"))
+        return True
+
+    async def connect_profile(self, address, uuid, timeout=None):
+        """
+        Connects a single profile; cancellation issues DisconnectProfile().
+
+        Args:
+            address (str): Bluetooth MAC address.
+            uuid (str): Profile UUID.
+            timeout (float): Seconds to wait for the reply.
+
+        Returns:
+            bool: True once BlueZ acknowledged the connection.
+        """
+        device_path = self._require_device_path(address)
+        start = time.monotonic()
+        await self.call(device_path, "org.bluez.Device1", "ConnectProfile", uuid, timeout=timeout,
+                        on_cancel=lambda: self._fire_and_forget(device_path, "org.bluez.Device1",
+                                                                "DisconnectProfile", uuid))
+        if self.latency_tracker:
+            self.latency_tracker.record_profile(device_path, uuid, time.monotonic() - start)
+        return True
+
+    async def disconnect(self, address, timeout=None):
+        """
+        Disconnects a device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            timeout (float): Seconds to wait for the reply.
+
+        Returns:
+            bool: True once BlueZ acknowledged the disconnection.
+        """
+        device_path = self._require_device_path(address)
+        await self.call(device_path, "org.bluez.Device1", "Disconnect", timeout=timeout)
+        return True
+
+    async def remove_device(self, address, timeout=None):
+        """
+        Removes a device (and its bonding) from the adapter.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            timeout (float): Seconds to wait for the reply.
+
+        Returns:
+            bool: True if removed, or if the device was already gone.
+        """
+        device_path = self.find_device_path(address)
+        if not device_path:
+            return True
+        await self.call(self.adapter_path, "org.bluez.Adapter1", "RemoveDevice",
+                        dbus.ObjectPath(device_path), timeout=timeout)
+        return True
@@ -0,0 +1,609 @@
+import mmap
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+import time
+import warnings
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
+except ImportError:
+    audioop = None
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (WAV format tag, bits per sample) -> PulseAudio sample format.
+WAV_SAMPLE_FORMATS = {
+    (WAVE_FORMAT_PCM, 8): "u8",
+    (WAVE_FORMAT_PCM, 16): "s16le",
+    (WAVE_FORMAT_PCM, 24): "s24le",
+    (WAVE_FORMAT_PCM, 32): "s32le",
+    (WAVE_FORMAT_IEEE_FLOAT, 32): "float32le",
+}
+
+SAMPLE_WIDTHS = {"u8": 1, "s16le": 2, "s24le": 3, "s32le": 4, "float32le": 4}
+
+# Stream states reported by AudioStream.status().
+STARTING = "starting"
+PLAYING = "playing"
+FINISHED = "finished"
+STOPPED = "stopped"
+ERROR = "error"
+
+
+class PcmSpec:
+    """
+    Sample format, rate and channel count of a PCM stream.
+    """
+
+    def __init__(self, rate=44100, channels=2, sample_format="s16le"):
+        """
+        Initializes the spec.
+
+        Args:
+            rate (int): Frames per second.
+            channels (int): Interleaved channels per frame.
+            sample_format (str): PulseAudio sample format name (see SAMPLE_WIDTHS).
+        returns:
+            None
+        """
+        if sample_format not in SAMPLE_WIDTHS:
+            raise ValueError(f"Unsupported sample format: {sample_format}")
+        self.rate = rate
+        self.channels = channels
+        self.sample_format = sample_format
+
+    @property
+    def sample_width(self):
+        return SAMPLE_WIDTHS[self.sample_format]
+
+    @property
+    def frame_size(self):
+        return self.sample_width * self.channels
+
+    @property
+    def bytes_per_second(self):
+        return self.frame_size * self.rate
+
+    def __eq__(self, other):
+        return (isinstance(other, PcmSpec) and (self.rate, self.channels, self.sample_format)
+                == (other.rate, other.channels, other.sample_format))
+
+    def __repr__(self):
+        return f"PcmSpec({self.sample_format}, {self.rate} Hz, {self.channels} ch)"
+
+
+class WavSource:
+    """
+    Memory-mapped WAV reader.
+
+    Chunks are memoryview slices of the mapping, so PCM data is never copied on the
+    way to the sink and only the pages being played are resident.
+    """
+
+    def __init__(self, path):
+        """
+        Maps the file and parses its fmt and data chunks.
+
+        Args:
+            path (str): Path of the WAV file.
+        Raises:
+            ValueError: If the file is not a supported PCM WAV file.
+        """
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"Empty audio file: {path}")
+        self.spec = None
+        self.data_offset = None
+        self.data_size = 0
+        try:
+            self._parse(path)
+        except Exception:
+            self.close()
+            raise
+        self.duration = self.data_size / self.spec.bytes_per_second
+
+    def _parse(self, path):
+        data = self.map
+        if len(data) < 12 or data[0:4] != b"RIFF" or data[8:12] != b"WAVE":
+            raise ValueError(f"Not a WAV file: {path}")
+        offset = 12
+        while offset + 8 <= len(data):
+            chunk_id = data[offset:offset + 4]
+            size = struct.unpack_from("<I", data, offset + 4)[0]
+            body = offset + 8
+            if chunk_id == b"fmt ":
+                tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+                if tag == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                    tag = struct.unpack_from("<H", data, body + 24)[0]
+                sample_format = WAV_SAMPLE_FORMATS.get((tag, bits))
+                if sample_format is None:
+                    raise ValueError(f"Unsupported WAV encoding (format {tag:#x}, {bits} bits): {path}")
+                self.spec = PcmSpec(rate, channels, sample_format)
+            elif chunk_id == b"data":
+                self.data_offset = body
+                # Streamed WAVs may carry a placeholder size; clamp to the file.
+                self.data_size = min(size, len(data) - body)
+                break
+            offset = body + size + (size & 1)
+        if self.spec is None or self.data_offset is None:
+            raise ValueError(f"WAV file without fmt/data chunk: {path}")
+        self.data_size -= self.data_size % self.spec.frame_size
+
+    def prefetch(self, seconds=1.0):
+        """
+        Asks the kernel to read the start of the PCM data ahead of playback.
+
+        Args:
+            seconds (float): Amount of audio to read ahead.
+        returns:
+            None
+        """
+        if hasattr(mmap, "MADV_WILLNEED"):
+            start = self.data_offset - self.data_offset % mmap.PAGESIZE
+            length = self.data_offset - start + min(self.data_size, int(self.spec.bytes_per_second * seconds))
+            self.map.madvise(mmap.MADV_WILLNEED, start, max(1, length))
+
+    def chunks(self, chunk_bytes):
+        """
+        Yields frame-aligned slices of the PCM data.
+
+        Args:
+            chunk_bytes (int): Preferred chunk size in bytes.
+        """
+        chunk_bytes = max(self.spec.frame_size, chunk_bytes - chunk_bytes % self.spec.frame_size)
+        view = memoryview(self.map)
+        end = self.data_offset + self.data_size
+        for offset in range(self.data_offset, end, chunk_bytes):
+            yield view[offset:min(offset + chunk_bytes, end)]
+
+    def close(self):
+        """
+        Unmaps and closes the file.
+
+        args: None
+        returns: None
+        """
+        try:
+            self.map.close()
+        except (AttributeError, BufferError):
+            pass  # chunks still queued keep the mapping alive until they are dropped
+        self.file.close()
+
+
+class FfmpegSource:
+    """
+    Decodes compressed formats (mp3, ogg, flac...) to PCM with an ffmpeg subprocess.
+
+    ffmpeg resamples and remaps channels to the requested spec while decoding, so its
+    output goes to the sink unchanged.
+    """
+
+    def __init__(self, path, spec=None):
+        """
+        Initializes the decoder; decoding starts with chunks().
+
+        Args:
+            path (str): Audio file path.
+            spec (PcmSpec): Output spec, 44.1 kHz stereo s16le if None.
+        Raises:
+            RuntimeError: If ffmpeg is not installed.
+        """
+        self.ffmpeg = shutil.which("ffmpeg")
+        if not self.ffmpeg:
+            raise RuntimeError(f"ffmpeg is required to decode {os.path.basename(path)}")
+        self.path = path
+        self.spec = spec or PcmSpec()
+        if self.spec.sample_format != "s16le":
+            self.spec = PcmSpec(self.spec.rate, self.spec.channels, "s16le")
+        self.duration = None
+        self.process = None
+
+    def prefetch(self, seconds=1.0):
+        """
+        Starts ffmpeg so that decoding runs ahead into its pipe before chunks() is read.
+
+        Args:
+            seconds (float): Unused; the pipe buffer bounds the read-ahead.
+        returns:
+            None
+        """
+        if self.process is None:
+            self.process = subprocess.Popen(
+                [self.ffmpeg, "-nostdin", "-v", "error", "-i", self.path, "-f", "s16le",
+                 "-ac", str(self.spec.channels), "-ar", str(self.spec.rate), "-"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def chunks(self, chunk_bytes):
+        """
+        Yields decoded PCM chunks.
+
+        Args:
+            chunk_bytes (int): Preferred chunk size in bytes.
+        """
+        self.prefetch()
+        frame_size = self.spec.frame_size
+        pending = b""
+        while True:
+            data = self.process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % frame_size
+            pending = data[usable:]
+            if usable:
+                yield data[:usable]
+        self.process.wait()
+        if self.process.returncode:
+            raise RuntimeError(f"ffmpeg failed to decode {os.path.basename(self.path)} "
+                               f"(exit code {self.process.returncode})")
+
+    def close(self):
+        """
+        Stops the decoder.
+
+        args: None
+        returns: None
+        """
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+
+
+def open_source(path, spec=None):
+    """
+    Opens an audio file with the cheapest available reader.
+
+    Args:
+        path (str): Audio file path.
+        spec (PcmSpec): Output spec requested for compressed formats.
+
+    Returns:
+        WavSource | FfmpegSource: Reader exposing spec, duration, chunks() and close().
+    """
+    with open(path, "rb") as f:
+        header = f.read(12)
+    if header[0:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return WavSource(path)
+    return FfmpegSource(path, spec)
+
+
+def open_track(path, spec):
+    """
+    Opens an audio file so that it produces exactly the given spec.
+
+    WAV files are memory-mapped and converted with audioop when needed; anything
+    audioop cannot convert is decoded by ffmpeg instead.
+
+    Args:
+        path (str): Audio file path.
+        spec (PcmSpec): Wanted output spec, s16le.
+
+    Returns:
+        tuple: (source, converter), converter being None when no conversion is needed.
+    """
+    source = open_source(path, spec)
+    if source.spec == spec:
+        return source, None
+    try:
+        return source, PcmConverter(source.spec, spec)
+    except ValueError:
+        source.close()
+        return FfmpegSource(path, spec), None
+
+
+class PcmConverter:
+    """
+    Converts integer PCM chunks to s16le with another rate and channel layout.
+
+    Uses audioop; the rate converter keeps its state across chunks so that chunk
+    boundaries are inaudible.
+    """
+
+    def __init__(self, source, target):
+        """
+        Initializes the converter.
+
+        Args:
+            source (PcmSpec): Spec of the input chunks.
+            target (PcmSpec): Wanted spec, s16le only.
+        Raises:
+            ValueError: If the conversion is not supported.
+        """
+        if audioop is None:
+            raise ValueError("audioop is not available for PCM conversion")
+        if source.sample_format == "float32le" or target.sample_format != "s16le":
+            raise ValueError(f"Cannot convert {source} to {target}")
+        if source.channels != target.channels and not (source.channels, target.channels) in ((1, 2), (2, 1)):
+            raise ValueError(f"Cannot map {source.channels} channels to {target.channels}")
+        self.source = source
+        self.target = target
+        self.rate_state = None
+
+    def convert(self, data):
+        """
+        Converts one chunk.
+
+        Args:
+            data (bytes | memoryview): Frame-aligned input PCM.
+
+        Returns:
+            bytes: Output PCM.
+        """
+        width = self.source.sample_width
+        if self.source.sample_format == "u8":
+            data = audioop.bias(data, 1, -128)
+        if width != 2:
+            data = audioop.lin2lin(data, width, 2)
+        channels = self.source.channels
+        if channels == 1 and self.target.channels == 2:
+            data = audioop.tostereo(data, 2, 1.0, 1.0)
+        elif channels == 2 and self.target.channels == 1:
+            data = audioop.tomono(data, 2, 0.5, 0.5)
+        if self.source.rate != self.target.rate:
+            data, self.rate_state = audioop.ratecv(data, 2, self.target.channels, self.source.rate,
+                                                   self.target.rate, self.rate_state)
+        return data
+
+
+class AudioStream:
+    """
+    Plays an audio file to a PulseAudio sink.
+
+    A decoder thread fills a bounded queue of PCM chunks (the playback buffer) and a
+    writer thread feeds them to a pacat playback stream opened with the latency
+    target; pacat's blocking writes pace the writer to real time. Decoder stalls
+    that empty the queue while the file is not finished are counted as underruns.
+    """
+
+    def __init__(self, path, sink=None, spec=None, buffer_ms=500, latency_ms=100, chunk_ms=20):
+        """
+        Initializes the stream; start() begins playback.
+
+        Args:
+            path (str): Audio file (WAV is memory-mapped, other formats go through ffmpeg).
+            sink (str): PulseAudio sink name, the default sink if None.
+            spec (PcmSpec): Output spec; None plays WAV files in their own format and
+                leaves resampling to the sound server.
+            buffer_ms (int): Decoded audio kept ahead of the sink, in milliseconds.
+            latency_ms (int): Latency target of the playback stream, in milliseconds.
+            chunk_ms (int): Duration of one chunk, in milliseconds.
+        returns:
+            None
+        """
+        self.path = path
+        self.sink = sink
+        self.requested_spec = spec
+        self.buffer_ms = buffer_ms
+        self.latency_ms = latency_ms
+        self.chunk_ms = chunk_ms
+        self.source = None
+        self.converter = None
+        self.spec = None
+        self.process = None
+        self.queue = queue.Queue(maxsize=max(2, buffer_ms // chunk_ms))
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.lock = threading.Lock()
+        self.state = STARTING
+        self.error = None
+        self.bytes_written = 0
+        self.underruns = 0
+        self.started_at = None
+        self.finished_at = None
+        self.decode_done = False
+
+    def start(self):
+        """
+        Opens the file and the playback stream and starts the decoder and writer threads.
+
+        args: None
+        returns: None
+        Raises:
+            ValueError | RuntimeError | OSError: If the file cannot be decoded or pacat cannot run.
+        """
+        self._open()
+        try:
+            self.process = self._open_playback(self.sink)
+        except (RuntimeError, OSError):
+            self._close_source()
+            raise
+        self.threads = [threading.Thread(target=self._decode, name="AudioStreamDecoder", daemon=True),
+                        threading.Thread(target=self._write, name="AudioStreamWriter", daemon=True)]
+        for thread in self.threads:
+            thread.start()
+
+    def _open_playback(self, sink):
+        # pacat's stdin is the playback stream; unbuffered so writes block at the sink's pace
+        pacat = shutil.which("pacat")
+        if not pacat:
+            raise RuntimeError("pacat is required for playback")
+        command = [pacat, "--playback", "--raw", f"--format={self.spec.sample_format}",
+                   f"--rate={self.spec.rate}", f"--channels={self.spec.channels}",
+                   f"--latency-msec={self.latency_ms}", "--client-name=bluez-test-host",
+                   f"--stream-name={self.stream_name()}"]
+        if sink:
+            command.append(f"--device={sink}")
+        return subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, bufsize=0)
+
+    def _open(self):
+        self.source = open_source(self.path, self.requested_spec)
+        self.spec = self.source.spec
+        if self.requested_spec and self.requested_spec != self.spec:
+            try:
+                self.converter = PcmConverter(self.spec, self.requested_spec)
+                self.spec = self.requested_spec
+            except ValueError as e:
+                print(f"[AudioStream] {e}; the sound server will convert {self.spec} instead")
+
+    def _close_source(self):
+        if self.source:
+            self.source.close()
+
+    def stream_name(self):
+        """
+        Returns the name of the playback stream shown by the sound server.
+
+        args: None
+        Returns:
+            str: Stream name.
+        """
+        return os.path.basename(self.path)
+
+    def _on_marker(self, marker):
+        # Called by the writer thread for non-audio queue items, when the audio
+        # queued before them has been written.
+        pass
+
+    def _put(self, item):
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _decode(self):
+        chunk_bytes = self.spec.bytes_per_second * self.chunk_ms // 1000
+        if self.converter:
+            chunk_bytes = self.source.spec.bytes_per_second * self.chunk_ms // 1000
+        try:
+            for chunk in self.source.chunks(chunk_bytes):
+                if self.converter:
+                    chunk = self.converter.convert(chunk)
+                if not self._put(chunk):
+                    break
+        except Exception as e:
+            if not self.stop_event.is_set():
+                self._fail(f"Decoding failed: {e}")
+        finally:
+            self.source.close()
+            self.decode_done = True
+            self._put(None)
+
+    def _write(self):
+        stdin = self.process.stdin
+        starving = False
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    chunk = self.queue.get_nowait()
+                except queue.Empty:
+                    if not self.decode_done and not starving and self.started_at is not None:
+                        self.underruns += 1
+                        starving = True
+                    try:
+                        chunk = self.queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                starving = False
+                if chunk is None:
+                    break
+                if not isinstance(chunk, (bytes, bytearray, memoryview)):
+                    self._on_marker(chunk)
+                    continue
+                view = memoryview(chunk)
+                while view:
+                    written = stdin.write(view)
+                    view = view[written:]
+                with self.lock:
+                    if self.started_at is None:
+                        self.started_at = time.monotonic()
+                        self.state = PLAYING
+                    self.bytes_written += len(chunk)
+            stdin.close()
+            if not self.stop_event.is_set():
+                self.process.wait()
+                with self.lock:
+                    if self.state in (STARTING, PLAYING):
+                        self.state = FINISHED if self.process.returncode == 0 else ERROR
+                        if self.state == ERROR:
+                            self.error = f"pacat exited with code {self.process.returncode}"
+        except (BrokenPipeError, ValueError, OSError) as e:
+            if not self.stop_event.is_set():
+                self._fail(f"Playback stream closed: {e}")
+        finally:
+            self.finished_at = time.monotonic()
+
+    def _fail(self, message):
+        print(f"[AudioStream] {message}")
+        with self.lock:
+            self.state = ERROR
+            self.error = message
+        self.stop_event.set()
+
+    def stop(self):
+        """
+        Stops playback and releases the file and the playback stream.
+
+        args: None
+        returns: None
+        """
+        with self.lock:
+            if self.state in (STARTING, PLAYING):
+                self.state = STOPPED
+        self.stop_event.set()
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        for thread in self.threads:
+            thread.join(timeout=2)
+
+    def is_active(self):
+        """
+        Tells whether the stream is starting or playing.
+
+        args: None
+        Returns:
+            bool: True until the stream finished, failed or was stopped.
+        """
+        return self.state in (STARTING, PLAYING)
+
+    def status(self):
+        """
+        Returns the playback state and counters.
+
+        args: None
+        Returns:
+            dict: state, error, position and duration in seconds, underruns, bytes
+                written, throughput in bytes per second, buffered seconds and the output spec.
+        """
+        with self.lock:
+            bytes_written = self.bytes_written
+            started_at = self.started_at
+            state = self.state
+            error = self.error
+        bytes_per_second = self.spec.bytes_per_second if self.spec else 0
+        end = self.finished_at or time.monotonic()
+        elapsed = end - started_at if started_at else 0.0
+        written_seconds = bytes_written / bytes_per_second if bytes_per_second else 0.0
+        # Audio written but still queued in the playback stream is not played yet.
+        position = written_seconds if state == FINISHED else max(0.0, written_seconds - self.latency_ms / 1000.0)
+        return {
+            "state": state,
+            "error": error,
+            "file": self.path,
+            "sink": self.sink,
+            "position": position,
+            "duration": self.source.duration if self.source else None,
+            "underruns": self.underruns,
+            "bytes_written": bytes_written,
+            "throughput": bytes_written / elapsed if elapsed else 0.0,
+            "buffered": self.queue.qsize() * self.chunk_ms / 1000.0,
+            "spec": repr(self.spec),
+        }
@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from Backend_lib.Linux.mock_bluez import MockBluezProcess
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+# Fraction of the mock population that is paired, and of paired devices that are connected.
+PAIRED_RATIO = 0.1
+CONNECTED_RATIO = 0.5
+
+_qt_app = None
+
+
+def time_call(func, min_time=0.2, max_repeats=1000):
+    """
+    Runs a callable repeatedly and returns per-call timings.
+
+    Args:
+        func (callable): Entry point under test.
+        min_time (float): Keep repeating until this many seconds were spent.
+        max_repeats (int): Upper bound of repetitions.
+
+    Returns:
+        list: Wall time of each call in seconds.
+    """
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < max_repeats and (len(timings) < 3 or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return timings
+
+
+def measure_allocations(func):
+    """
+    Runs a callable once under tracemalloc.
+
+    Args:
+        func (callable): Entry point under test.
+
+    Returns:
+        dict: Peak traced memory and the number of blocks still allocated afterwards.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return {"peak_bytes": peak, "retained_blocks": retained}
+
+
+def run_case(mock, func):
+    """
+    Measures one entry point: wall time, D-Bus calls served by the mock and allocations.
+
+    Args:
+        mock (MockBluezProcess): Running mock service.
+        func (callable): Entry point under test.
+
+    Returns:
+        dict: Measurements of the case.
+    """
+    func()  # warm-up: pooled proxies, first introspection
+    mock.reset_call_counts()
+    timings = time_call(func)
+    calls = mock.get_call_counts()
+    result = {
+        "repeats": len(timings),
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "dbus_calls_per_run": sum(calls.values()) / len(timings),
+        "dbus_calls": {key: count / len(timings) for key, count in sorted(calls.items())},
+    }
+    result.update(measure_allocations(func))
+    return result
+
+
+def discovery_table_case(session):
+    """
+    Builds the discovery table model the way show_discovery_table does, without a window.
+
+    Args:
+        session (BluezSession): Session whose object cache feeds the model.
+
+    Returns:
+        callable | None: Case function, None if PyQt6 is not installed.
+    """
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtCore import QCoreApplication
+        from UI_lib.discovery_model import DiscoveryFilterProxyModel, DiscoveryTableModel
+    except ImportError:
+        return None
+    global _qt_app
+    _qt_app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+
+    def build():
+        model = DiscoveryTableModel(session.object_cache, session.interface)
+        proxy = DiscoveryFilterProxyModel()
+        proxy.setSourceModel(model)
+        proxy.sort(0)
+        model.detach()
+
+    return build
+
+
+def run_size(mock, size):
+    """
+    Repopulates the mock with size devices and measures every entry point against it.
+
+    Args:
+        mock (MockBluezProcess): Running mock service.
+        size (int): Number of devices known to hci0.
+
+    Returns:
+        dict: Case name to measurements.
+    """
+    from Backend_lib.Linux.a2dp_profile import A2DPManager
+    from Backend_lib.Linux.bluez_session import BluezSession
+    from Backend_lib.Linux.daemons import BluezServices
+
+    control = mock.control()
+    control.RemoveAllDevices("hci0")
+    control.AddDevices("hci0", size, {"paired": PAIRED_RATIO, "connected": CONNECTED_RATIO, "seed": 0})
+    BluezSession.close_all()
+
+    results = {}
+    mock.reset_call_counts()
+    start = time.perf_counter()
+    session = BluezSession.get("hci0")
+    results["session_start"] = {
+        "repeats": 1,
+        "median_s": time.perf_counter() - start,
+        "dbus_calls": mock.get_call_counts(),
+    }
+
+    services = BluezServices("hci0", session=session)
+    a2dp = A2DPManager("hci0", session=session)
+    devices = session.object_cache.get_devices(adapter="hci0")
+    last_address = str(devices[-1][1]["Address"]) if devices else "00:00:00:00:00:00"
+    connected = session.object_cache.get_devices("Connected", "hci0")
+    connected_address = str(connected[0][1]["Address"]) if connected else last_address
+
+    cases = {
+        "find_device_path": lambda: services.find_device_path(last_address),
+        "find_device_path_missing": lambda: services.find_device_path("FF:FF:FF:FF:FF:FF"),
+        "get_paired_devices": services.get_paired_devices,
+        "get_connected_a2dp_sink_devices": a2dp.get_connected_a2dp_sink_devices,
+        "get_a2dp_role": lambda: a2dp.get_a2dp_role(connected_address),
+    }
+    table = discovery_table_case(session)
+    if table is not None:
+        cases["show_discovery_table"] = table
+    for name, func in cases.items():
+        results[name] = run_case(mock, func)
+        print(f"[Benchmark] {size:>6} devices  {name:<34} {results[name]['median_s'] * 1e3:9.3f} ms  "
+              f"{results[name]['dbus_calls_per_run']:6.1f} D-Bus calls")
+    if table is None:
+        print("[Benchmark] PyQt6 not installed, show_discovery_table skipped")
+    BluezSession.close_all()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Lists the measurements that regressed against a baseline.
+
+    Wall time and peak memory may grow by tolerance (a fraction); D-Bus call counts
+    are deterministic against the mock, so any increase is a regression.
+
+    Args:
+        results (dict): Current results, size to case to measurements.
+        baseline (dict): Stored results in the same layout.
+        tolerance (float): Allowed relative growth of time and memory.
+
+    Returns:
+        list: Human readable regression messages.
+    """
+    regressions = []
+    for size, cases in results.items():
+        for name, current in cases.items():
+            previous = baseline.get(size, {}).get(name)
+            if not previous or name == "session_start":
+                continue
+            if current["median_s"] > previous["median_s"] * (1 + tolerance):
+                regressions.append(f"{size} devices, {name}: median {current['median_s'] * 1e3:.3f} ms "
+                                   f"vs {previous['median_s'] * 1e3:.3f} ms")
+            if current["dbus_calls_per_run"] > previous["dbus_calls_per_run"]:
+                regressions.append(f"{size} devices, {name}: {current['dbus_calls_per_run']:.1f} D-Bus calls "
+                                   f"vs {previous['dbus_calls_per_run']:.1f}")
+            if current["peak_bytes"] > previous["peak_bytes"] * (1 + tolerance):
+                regressions.append(f"{size} devices, {name}: peak {current['peak_bytes']} B "
+                                   f"vs {previous['peak_bytes']} B")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark device-manager queries against the mock BlueZ service.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma separated device counts")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file receiving the results")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock reply delay in seconds")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = {}
+    with MockBluezProcess(devices=0, latency=args.latency) as mock:
+        for size in sizes:
+            results[str(size)] = run_size(mock, size)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"[Benchmark] Results written to {args.output}")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"[Benchmark] Baseline written to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"[Benchmark] REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print("[Benchmark] No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
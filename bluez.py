@@ -3,11 +3,14 @@ import dbus.service
 import dbus.mainloop.glib
 import os
 import subprocess
-import time
 from gi.repository import GObject
 import mimetypes
 from dbus.mainloop.glib import DBusGMainLoop
 
+from Backend_lib.Linux.bluez_session import BluezSession
+from Backend_lib.Linux.discovery import DeviceDiscovery
+from Backend_lib.Linux.retry_policy import NOT_CONNECTED
+
 # Set the D-Bus main loop
 dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
 
@@ -20,14 +23,18 @@ class BluetoothDeviceManager:
     streaming audio (A2DP), media control (AVRCP), and removing Bluetooth devices.
     """
 
-    def __init__(self):
+    def __init__(self, session=None):
         """
-        Initialize the BluetoothDeviceManager by setting up the system bus and adapter.
+        Initialize the BluetoothDeviceManager by borrowing the bus and object cache of
+        the shared hci0 BluezSession (or of the given session).
         """
-        self.bus = dbus.SystemBus()
-        self.adapter_path = '/org/bluez/hci0'
+        self.session = session or BluezSession.get('hci0')
+        self.bus = self.session.bus
+        self.adapter_path = self.session.adapter_path
         self.adapter_proxy = self.bus.get_object('org.bluez', self.adapter_path)
         self.adapter = dbus.Interface(self.adapter_proxy, 'org.bluez.Adapter1')
+        self.object_cache = self.session.object_cache
+        self.retry_policy = self.session.retry_policy
         self.stream_process = None
         self.device_path = None
         self.device_address = None
@@ -65,34 +72,42 @@ class BluetoothDeviceManager:
         :param timeout: Duration in seconds to scan for devices.
         :return: List of discovered devices in the format "Alias (Address)".
         """
+        return [f"{device.alias} ({device.address})"
+                for device in self.discover(timeout=timeout, include_cached=True)]
+
+    def discover(self, timeout=None, count=None, predicate=None, include_cached=False):
+        """
+        Scan for devices and yield each one as soon as BlueZ reports it.
+
+        :param timeout: Stop after this many seconds, None to run until count is reached.
+        :param count: Stop after this many devices were yielded.
+        :param predicate: Only yield devices for which predicate(record) is true.
+        :param include_cached: Also yield devices BlueZ already knew about.
+        :return: Generator of DiscoveredDevice records.
+        """
+        discovery = DeviceDiscovery(self.object_cache, self.adapter_path)
         self.start_discovery()
-        time.sleep(timeout)
-        self.stop_discovery()
-
-        discovered = []
-        om = dbus.Interface(self.bus.get_object("org.bluez", "/"), "org.freedesktop.DBus.ObjectManager")
-        objects = om.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                device_props = dbus.Interface(self.bus.get_object("org.bluez", path),
-                                              dbus_interface="org.freedesktop.DBus.Properties")
-                try:
-                    address = device_props.Get("org.bluez.Device1", "Address")
-                    alias = device_props.Get("org.bluez.Device1", "Alias")
-                    discovered.append(f"{alias} ({address})")
-                except:
-                    continue
-        return discovered
+        try:
+            yield from discovery.stream(timeout=timeout, count=count, predicate=predicate,
+                                        include_cached=include_cached)
+        finally:
+            self.stop_discovery()
 
     def _get_device_path(self, address):
         """
-        Format the Bluetooth address to get the BlueZ D-Bus object path.
+        Get the BlueZ D-Bus object path of a device on this adapter.
+
+        The (adapter, address) index is consulted first; the path is only derived
+        from the address when BlueZ does not know the device yet.
 
         :param address: Bluetooth device MAC address.
         :return: D-Bus object path.
         """
+        device_path = self.object_cache.find_device_path(address, self.adapter_path)
+        if device_path:
+            return device_path
         formatted_address = address.replace(":", "_")
-        return f"/org/bluez/hci0/dev_{formatted_address}"
+        return f"{self.adapter_path}/dev_{formatted_address}"
 
     def find_device_path(self, address):
         """
@@ -101,14 +116,7 @@ class BluetoothDeviceManager:
         :param address: Bluetooth device MAC address.
         :return: D-Bus object path or None if not found.
         """
-        om = dbus.Interface(self.bus.get_object("org.bluez", "/"), "org.freedesktop.DBus.ObjectManager")
-        objects = om.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                props = interfaces["org.bluez.Device1"]
-                if props.get("Address") == address:
-                    return path
-        return None
+        return self.object_cache.find_device_path(address, self.adapter_path)
 
     def _get_device_interface(self, device_path):
         """
@@ -134,23 +142,15 @@ class BluetoothDeviceManager:
             device = self._get_device_interface(device_path)
 
             print(f"Initiating pairing with {device_path}")
-            device.Pair()
+            # A missing reply is retried (BlueZ then answers AlreadyExists or InProgress),
+            # pairing that completed despite an error is caught by the Paired check
+            self.retry_policy.run(lambda timeout: device.Pair(timeout=timeout), f"Pair {address}",
+                                  check=lambda: self.object_cache.get_property(device_path, "org.bluez.Device1",
+                                                                               "Paired", False),
+                                  deadline=45, call_timeout=20)
             return True
 
         except dbus.exceptions.DBusException as e:
-            if "Did not receive a reply" in str(e) or "Timeout" in str(e):
-                print("[BluetoothDeviceManager] Pair() timeout, checking status...")
-                time.sleep(2)
-
-                device_props = dbus.Interface(
-                    self.bus.get_object("org.bluez", device_path),
-                    "org.freedesktop.DBus.Properties"
-                )
-                paired = device_props.Get("org.bluez.Device1", "Paired")
-                if paired:
-                    print("[BluetoothDeviceManager] Device is actually paired.")
-                    return True
-
             print(f"[BluetoothDeviceManager] Pairing failed: {e}")
             return False
 
@@ -166,11 +166,12 @@ class BluetoothDeviceManager:
             try:
                 device = dbus.Interface(self.bus.get_object("org.bluez", device_path),
                                         dbus_interface="org.bluez.Device1")
-                device.Connect()
+                self.retry_policy.run(lambda timeout: device.Connect(timeout=timeout), f"Connect {address}",
+                                      check=lambda: self.object_cache.get_property(device_path, "org.bluez.Device1",
+                                                                                   "Connected", False))
 
-                props = dbus.Interface(self.bus.get_object("org.bluez", device_path),
-                                       "org.freedesktop.DBus.Properties")
-                connected = props.Get("org.bluez.Device1", "Connected")
+                connected = self.object_cache.wait_for_property(device_path, "org.bluez.Device1", "Connected",
+                                                                bool, timeout=2)
                 if connected:
                     print("Connection is successful")
                     return True
@@ -206,10 +207,15 @@ class BluetoothDeviceManager:
 
             # Perform disconnect
             print(f"[BluetoothDeviceManager] Disconnecting device {address}...")
-            device.Disconnect()
-            time.sleep(1)  # Optional: allow async operations to complete
-
-            print(f"[BluetoothDeviceManager] Device {address} disconnected successfully.")
+            self.retry_policy.run(lambda timeout: device.Disconnect(timeout=timeout), f"Disconnect {address}",
+                                  check=lambda: not self.object_cache.get_property(device_path, "org.bluez.Device1",
+                                                                                   "Connected", False),
+                                  already_done=(NOT_CONNECTED,))
+            if self.object_cache.wait_for_property(device_path, "org.bluez.Device1", "Connected",
+                                                   lambda connected: not connected, timeout=1):
+                print(f"[BluetoothDeviceManager] Device {address} disconnected successfully.")
+            else:
+                print(f"[BluetoothDeviceManager] Disconnect of {address} requested but not yet confirmed.")
             return True
 
         except dbus.exceptions.DBusException as e:
@@ -223,28 +229,23 @@ class BluetoothDeviceManager:
         :param address: Bluetooth device MAC address.
         :return: True if removed or already gone, False otherwise.
         """
-        obj = self.bus.get_object("org.bluez", "/")
-        manager = dbus.Interface(obj, "org.freedesktop.DBus.ObjectManager")
-        objects = manager.GetManagedObjects()
-
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                if interfaces["org.bluez.Device1"].get("Address") == address:
-                    print(f"[BluetoothDeviceManager] Removing device {path}")
-                    try:
-                        adapter = dbus.Interface(
-                            self.bus.get_object("org.bluez", self.adapter_path),
-                            "org.bluez.Adapter1"
-                        )
-                        adapter.RemoveDevice(path)
-                        return True
-                    except dbus.exceptions.DBusException as e:
-                        if "org.freedesktop.DBus.Error.UnknownObject" in str(e):
-                            print(f"[BluetoothDeviceManager] Device {address} already removed")
-                            return True  # Still a success
-                        else:
-                            print(f"[BluetoothDeviceManager] Failed to remove {address}: {e}")
-                            return False
+        path = self.object_cache.find_device_path(address, self.adapter_path)
+        if path:
+            print(f"[BluetoothDeviceManager] Removing device {path}")
+            try:
+                adapter = dbus.Interface(
+                    self.bus.get_object("org.bluez", self.adapter_path),
+                    "org.bluez.Adapter1"
+                )
+                adapter.RemoveDevice(path)
+                return True
+            except dbus.exceptions.DBusException as e:
+                if "org.freedesktop.DBus.Error.UnknownObject" in str(e):
+                    print(f"[BluetoothDeviceManager] Device {address} already removed")
+                    return True  # Still a success
+                else:
+                    print(f"[BluetoothDeviceManager] Failed to remove {address}: {e}")
+                    return False
 
         print(f"[BluetoothDeviceManager] Device with address {address} not found")
         return True  # Treat as success since it's already not present
@@ -306,12 +307,11 @@ class BluetoothDeviceManager:
         if not device_path:
             return "Device not found"
         try:
-            device = dbus.Interface(self.bus.get_object("org.bluez", device_path), "org.bluez.Device1")
-            props = dbus.Interface(self.bus.get_object("org.bluez", device_path), "org.freedesktop.DBus.Properties")
-            connected = props.Get("org.bluez.Device1", "Connected")
+            connected = self.object_cache.get_property(device_path, "org.bluez.Device1", "Connected", False)
             if not connected:
+                device = dbus.Interface(self.bus.get_object("org.bluez", device_path), "org.bluez.Device1")
                 device.Connect()
-                time.sleep(1.5)
+                self.object_cache.wait_for_property(device_path, "org.bluez.Device1", "Connected", bool, timeout=5)
             print(f"[A2DP] Connected to {address}")
             if not filepath:
                 return "No audio file specified for streaming"
@@ -350,21 +350,17 @@ class BluetoothDeviceManager:
             "pause": "Pause",
             "next": "Next",
             "previous": "Previous",
-            "rewind": "FastRewind"
+            "rewind": "Rewind"
         }
 
         if command not in valid:
             return f"Invalid command: {command}"
 
-        om = dbus.Interface(self.bus.get_object("org.bluez", "/"), "org.freedesktop.DBus.ObjectManager")
-        objects = om.GetManagedObjects()
-
-        for path, interfaces in objects.items():
-            if "org.bluez.MediaControl1" in interfaces:
-                try:
-                    control_iface = dbus.Interface(self.bus.get_object("org.bluez", path), "org.bluez.MediaControl1")
-                    getattr(control_iface, valid[command])()
-                    return f"AVRCP {command} sent to {path}"
-                except Exception as e:
-                    return f"Error sending AVRCP {command}: {str(e)}"
+        for path, props in self.object_cache.get_objects_with_interface("org.bluez.MediaControl1"):
+            try:
+                control_iface = dbus.Interface(self.bus.get_object("org.bluez", path), "org.bluez.MediaControl1")
+                getattr(control_iface, valid[command])()
+                return f"AVRCP {command} sent to {path}"
+            except Exception as e:
+                return f"Error sending AVRCP {command}: {str(e)}"
         return "No MediaControl1 interface found (is device connected as A2DP Source with AVRCP?)"
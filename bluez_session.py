@@ -0,0 +1,205 @@
+import threading
+
+import dbus
+
+from Backend_lib.Linux.a2dp_telemetry import A2DPTelemetry
+from Backend_lib.Linux.async_bluez import AsyncBluezServices
+from Backend_lib.Linux.gatt_client import GattClient
+from Backend_lib.Linux.latency import ConnectionLatencyTracker
+from Backend_lib.Linux.notification_sink import NotificationSink
+from Backend_lib.Linux.object_cache import BluezObjectCache
+from Backend_lib.Linux.proxy_pool import ProxyPool
+from Backend_lib.Linux.retry_policy import RetryPolicy
+
+# Control interface mock_bluez exports on "/", serving its per-method call counters.
+MOCK_CONTROL_IFACE = "org.bluez.mock.Control1"
+
+
+class BluezSession:
+    """
+    Process-wide BlueZ connection state for one adapter.
+
+    A session owns the system bus connection, the BluezObjectCache and the ProxyPool.
+    Managers (BluezServices, BluetoothDeviceManager, A2DPManager, OPPManager) borrow
+    them instead of building their own, so opening another screen or switching
+    controllers neither re-dumps the object tree nor re-creates proxies. The cache
+    mirrors every adapter, so sessions of different adapters share the same bus,
+    cache, pool and connection latency tracker; only adapter-specific state
+    (adapter proxy, discovery filter, retry policy, async client) is kept per session.
+    """
+
+    sessions = {}
+    sessions_lock = threading.Lock()
+
+    def __init__(self, interface=None, bus=None, object_cache=None, proxies=None, latency_tracker=None):
+        """
+        Initializes the session; use BluezSession.get() to obtain the shared instance.
+
+        Args:
+            interface (str): Name of the Bluetooth interface (e.g., 'hci0').
+            bus (dbus.Bus): Bus to use, defaults to the system bus.
+            object_cache (BluezObjectCache): Cache to share, a new one is seeded if None.
+            proxies (ProxyPool): Pool to share, a new one is created if None.
+            latency_tracker (ConnectionLatencyTracker): Tracker to share, a new one is created if None.
+        returns:
+            None
+        """
+        self.interface = interface
+        self.adapter_path = f'/org/bluez/{self.interface}'
+        self.bus = bus or dbus.SystemBus()
+        self.object_cache = object_cache or BluezObjectCache(self.bus)
+        self.proxies = proxies or ProxyPool(self.bus, object_cache=self.object_cache)
+        self.latency_tracker = latency_tracker or ConnectionLatencyTracker(self.object_cache)
+        self.discovery_filter = {}
+        self.retry_policy = RetryPolicy()
+        self.async_client = None
+        self.gatt_client = None
+        self.notification_sink = None
+        self.obex_proxies = None
+        self.a2dp_telemetry = None
+        self.call_counter = None
+        self.lock = threading.RLock()
+
+    @classmethod
+    def get(cls, interface=None):
+        """
+        Returns the session of an adapter, creating it on first use.
+
+        Args:
+            interface (str): Name of the Bluetooth interface (e.g., 'hci0').
+
+        Returns:
+            BluezSession: Shared session of the adapter.
+        """
+        with cls.sessions_lock:
+            session = cls.sessions.get(interface)
+            if session is None:
+                shared = next(iter(cls.sessions.values()), None)
+                if shared is None:
+                    session = cls(interface)
+                else:
+                    session = cls(interface, bus=shared.bus, object_cache=shared.object_cache,
+                                  proxies=shared.proxies, latency_tracker=shared.latency_tracker)
+                cls.sessions[interface] = session
+            return session
+
+    @classmethod
+    def close_all(cls):
+        """
+        Drops every session and stops the shared cache from listening to BlueZ.
+
+        args: None
+        returns: None
+        """
+        with cls.sessions_lock:
+            sessions, cls.sessions = list(cls.sessions.values()), {}
+        for tracker in {id(session.latency_tracker): session.latency_tracker for session in sessions}.values():
+            tracker.close()
+        for object_cache in {id(session.object_cache): session.object_cache for session in sessions}.values():
+            object_cache.close()
+        for session in sessions:
+            if session.a2dp_telemetry is not None:
+                session.a2dp_telemetry.close()
+            session.proxies.clear()
+
+    def get_adapter(self):
+        """
+        Returns the pooled org.bluez.Adapter1 interface of this adapter.
+
+        args: None
+        Returns:
+            dbus.Interface: Adapter1 interface wrapper.
+        """
+        return self.proxies.get_interface(self.adapter_path, 'org.bluez.Adapter1')
+
+    def get_async_client(self):
+        """
+        Returns the asyncio client of this adapter, creating it on first use.
+
+        args: None
+        Returns:
+            AsyncBluezServices: Client sharing the session's bus, cache and proxies.
+        """
+        with self.lock:
+            if self.async_client is None:
+                self.async_client = AsyncBluezServices(interface=self.interface, bus=self.bus,
+                                                       object_cache=self.object_cache, proxies=self.proxies,
+                                                       latency_tracker=self.latency_tracker)
+            return self.async_client
+
+    def get_gatt_client(self):
+        """
+        Returns the GATT client of this adapter, creating it on first use.
+
+        args: None
+        Returns:
+            GattClient: Client with the persistent per-device layout cache.
+        """
+        with self.lock:
+            if self.gatt_client is None:
+                self.gatt_client = GattClient(self)
+            return self.gatt_client
+
+    def get_notification_sink(self):
+        """
+        Returns the GATT notification capture sink of this adapter, creating it on first use.
+
+        args: None
+        Returns:
+            NotificationSink: Sink recording notifications into ring buffers.
+        """
+        with self.lock:
+            if self.notification_sink is None:
+                self.notification_sink = NotificationSink(self)
+            return self.notification_sink
+
+    def get_a2dp_telemetry(self):
+        """
+        Returns the A2DP transport telemetry of this adapter, creating it on first use.
+
+        args: None
+        Returns:
+            A2DPTelemetry: Telemetry recording this adapter's transports.
+        """
+        with self.lock:
+            if self.a2dp_telemetry is None:
+                self.a2dp_telemetry = A2DPTelemetry(self.object_cache, adapter=self.interface)
+            return self.a2dp_telemetry
+
+    def get_dbus_call_count(self):
+        """
+        Returns the number of D-Bus calls the BlueZ service has served, when it is mock_bluez.
+
+        Subtracting two readings gives the calls made in between, as benchmark.py does.
+        The real daemon has no such counter; the lookup then fails once and None is
+        returned from then on.
+
+        args: None
+        Returns:
+            int | None: Calls served since the mock's last reset, None if not countable.
+        """
+        with self.lock:
+            if self.call_counter is False:
+                return None
+            if self.call_counter is None:
+                self.call_counter = dbus.Interface(
+                    self.bus.get_object(self.object_cache.service, "/", introspect=False), MOCK_CONTROL_IFACE)
+        try:
+            return sum(int(count) for count in self.call_counter.GetCallCounts().values())
+        except dbus.exceptions.DBusException:
+            with self.lock:
+                self.call_counter = False
+            return None
+
+    def get_obex_proxies(self):
+        """
+        Returns the session bus proxy pool used for obexd, connecting on first use.
+
+        args: None
+        Returns:
+            ProxyPool: Pool of obexd proxies.
+        """
+        with self.lock:
+            if self.obex_proxies is None:
+                self.obex_proxies = ProxyPool(dbus.SessionBus())
+            return self.obex_proxies
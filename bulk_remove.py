@@ -0,0 +1,162 @@
+import asyncio
+import time
+
+import dbus
+
+from Backend_lib.Linux.object_cache import adapter_name
+
+
+class RemovalReport:
+    """
+    Outcome of a bulk removal.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty report.
+
+        args: None
+        returns: None
+        """
+        self.matched = 0
+        self.removed = []
+        self.failed = {}
+        self.elapsed = 0.0
+
+    def as_dict(self):
+        """
+        Returns the report as a plain dictionary.
+
+        args: None
+        Returns:
+            dict: matched/removed/failed counts, failures per address and elapsed seconds.
+        """
+        return {
+            "matched": self.matched,
+            "removed": len(self.removed),
+            "failed": len(self.failed),
+            "failures": dict(self.failed),
+            "elapsed": self.elapsed,
+        }
+
+    def __repr__(self):
+        return (f"RemovalReport(matched={self.matched}, removed={len(self.removed)}, "
+                f"failed={len(self.failed)}, elapsed={self.elapsed:.2f}s)")
+
+
+class BulkDeviceRemover:
+    """
+    Removes every device matching a set of criteria in one pass.
+
+    Candidates are selected from a single snapshot of the object cache (no
+    GetManagedObjects walk per device) and all RemoveDevice() calls are pipelined
+    as concurrent asynchronous D-Bus calls, bounded by max_in_flight. Pooled proxies
+    and GATT layouts of the removed devices are purged afterwards.
+    """
+
+    def __init__(self, session, max_in_flight=64, call_timeout=10.0):
+        """
+        Initializes the remover.
+
+        Args:
+            session (BluezSession): Session providing the cache, proxies and async client.
+            max_in_flight (int): Maximum number of RemoveDevice() calls awaiting a reply.
+            call_timeout (float): Timeout in seconds of one RemoveDevice() call.
+        returns:
+            None
+        """
+        self.session = session
+        self.object_cache = session.object_cache
+        self.max_in_flight = max_in_flight
+        self.call_timeout = call_timeout
+
+    def select(self, adapter=None, unpaired_only=False, older_than=None, addresses=None, predicate=None):
+        """
+        Picks the devices to remove from one snapshot of the cache. Criteria are combined with AND.
+
+        Args:
+            adapter (str): Interface name or adapter path, None for every adapter.
+            unpaired_only (bool): Keep paired devices.
+            older_than (float): Only devices not seen for at least this many minutes. Devices
+                not reported since the cache was seeded count as old enough, so a rig can
+                be reset right after the process started.
+            addresses (list): Only these Bluetooth MAC addresses.
+            predicate (callable): Extra filter called as predicate(path, props).
+
+        Returns:
+            list: (device path, Device1 properties) tuples.
+        """
+        wanted = {address.upper() for address in addresses} if addresses is not None else None
+        cutoff = time.time() - older_than * 60 if older_than is not None else None
+        selected = []
+        for path, props in self.object_cache.get_devices(adapter=adapter_name(adapter)):
+            if unpaired_only and props.get("Paired", False):
+                continue
+            if wanted is not None and str(props.get("Address", "")).upper() not in wanted:
+                continue
+            if cutoff is not None:
+                last_seen = self.object_cache.get_last_seen(path)
+                if last_seen is not None and last_seen > cutoff:
+                    continue
+            if predicate is not None and not predicate(path, props):
+                continue
+            selected.append((path, props))
+        return selected
+
+    async def _remove_one(self, client, semaphore, path, props, report):
+        address = str(props.get("Address", path))
+        adapter_path = path.rsplit("/", 1)[0]
+        async with semaphore:
+            try:
+                await client.call(adapter_path, "org.bluez.Adapter1", "RemoveDevice", dbus.ObjectPath(path),
+                                  timeout=self.call_timeout)
+                report.removed.append(address)
+            except dbus.exceptions.DBusException as e:
+                if e.get_dbus_name() in ("org.bluez.Error.DoesNotExist",
+                                         "org.freedesktop.DBus.Error.UnknownObject"):
+                    report.removed.append(address)  # already gone
+                else:
+                    report.failed[address] = e.get_dbus_message() or e.get_dbus_name()
+            except asyncio.TimeoutError:
+                report.failed[address] = "RemoveDevice timed out"
+
+    def _purge(self, removed):
+        for path, address in removed:
+            self.session.proxies.evict(path, recursive=True)
+        # One rewrite of the persisted GATT layouts for the whole batch.
+        if self.session.gatt_client is not None and removed:
+            self.session.gatt_client.invalidate([address for path, address in removed])
+
+    async def aremove(self, **criteria):
+        """
+        Selects devices (see select() for the criteria) and removes them concurrently.
+
+        Returns:
+            RemovalReport: Counts, failures per address and elapsed time.
+        """
+        start = time.monotonic()
+        report = RemovalReport()
+        selected = self.select(**criteria)
+        report.matched = len(selected)
+        if selected:
+            client = self.session.get_async_client()
+            semaphore = asyncio.Semaphore(self.max_in_flight)
+            await asyncio.gather(*(self._remove_one(client, semaphore, path, props, report)
+                                   for path, props in selected))
+            removed = set(report.removed)
+            self._purge([(path, str(props["Address"])) for path, props in selected
+                         if props.get("Address") and str(props["Address"]) in removed])
+        report.elapsed = time.monotonic() - start
+        print(f"[BulkDeviceRemover] {report}")
+        for address, error in report.failed.items():
+            print(f"[BulkDeviceRemover] Failed to remove {address}: {error}")
+        return report
+
+    def remove(self, **criteria):
+        """
+        Blocking wrapper around aremove().
+
+        Returns:
+            RemovalReport: Counts, failures per address and elapsed time.
+        """
+        return asyncio.run(self.aremove(**criteria))
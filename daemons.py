@@ -5,6 +5,12 @@ import os
 import subprocess
 import time
 
+from Backend_lib.Linux.bluez_session import BluezSession
+from Backend_lib.Linux.bulk_remove import BulkDeviceRemover
+from Backend_lib.Linux.discovery import DeviceDiscovery
+from Backend_lib.Linux.orchestrator import FleetOrchestrator
+from Backend_lib.Linux.retry_policy import NOT_CONNECTED
+
 
 class BluezServices:
     """
@@ -12,22 +18,29 @@ class BluezServices:
     such as pairing, discovery, connection, and audio streaming.
     """
 
-    def __init__(self, interface=None):
+    def __init__(self, interface=None, session=None):
         """
         Initializes the BluezServices class.
 
         Args:
             interface (str): Name of the Bluetooth interface (e.g., 'hci0').
+            session (BluezSession): Session to borrow the bus, object cache and proxies
+                from, defaults to the shared session of the interface.
         returns:
             None
         """
         self.interface = interface
-        self.bus = dbus.SystemBus()
-        self.object_manager_proxy = self.bus.get_object('org.bluez', '/')
-        self.object_manager = dbus.Interface(self.object_manager_proxy, 'org.freedesktop.DBus.ObjectManager')
+        self.session = session or BluezSession.get(interface)
+        self.bus = self.session.bus
+        self.object_cache = self.session.object_cache
+        self.proxies = self.session.proxies
+        self.latency_tracker = self.session.latency_tracker
+        self.retry_policy = self.session.retry_policy
+        self.object_manager_proxy = self.proxies.get_object('/')
+        self.object_manager = self.proxies.get_interface('/', 'org.freedesktop.DBus.ObjectManager')
         self.adapter_path = f'/org/bluez/{self.interface}'
-        self.adapter_proxy = self.bus.get_object('org.bluez', self.adapter_path)
-        self.adapter = dbus.Interface(self.adapter_proxy, 'org.bluez.Adapter1')
+        self.adapter_proxy = self.proxies.get_object(self.adapter_path)
+        self.adapter = self.proxies.get_interface(self.adapter_path, 'org.bluez.Adapter1')
         self.stream_process = None
         self.device_path = None
         self.device_address = None
@@ -36,14 +49,110 @@ class BluezServices:
         self.last_session_path = None
         self.opp_process = None
 
-    def start_discovery(self):
-        """Starts Bluetooth device discovery.
+    def get_async_client(self):
+        """
+        Returns an asyncio counterpart of this service sharing its bus, cache and proxies.
 
         args: None
-        returns: None
+        Returns:
+            AsyncBluezServices: Awaitable Pair/Connect/Disconnect/RemoveDevice API.
+        """
+        return self.session.get_async_client()
+
+    def get_gatt_client(self):
+        """
+        Returns the GATT client (read/write/notify) sharing this adapter's session.
+
+        args: None
+        Returns:
+            GattClient: Client resolving characteristic UUIDs through a persistent layout cache.
+        """
+        return self.session.get_gatt_client()
+
+    def bring_up_devices(self, addresses, max_concurrency=4, profile_uuid=None, trust=True, step_timeout=25.0):
+        """
+        Pairs, trusts and connects several devices concurrently (see FleetOrchestrator).
+
+        Args:
+            addresses (list): Bluetooth MAC addresses.
+            max_concurrency (int): Maximum number of devices brought up at the same time.
+            profile_uuid (str): Profile to connect with ConnectProfile() after Connect().
+            trust (bool): Mark devices as trusted.
+            step_timeout (float): Timeout in seconds of each D-Bus step.
+
+        Returns:
+            list: DeviceResult per address with success, failing step and per-step timings.
         """
+        orchestrator = FleetOrchestrator(interface=self.interface, session=self.session,
+                                         max_concurrency=max_concurrency, step_timeout=step_timeout,
+                                         profile_uuid=profile_uuid, trust=trust)
+        return orchestrator.run(addresses)
+
+    def start_discovery(self, transport=None, rssi=None, pathloss=None, uuids=None, duplicate_data=None,
+                        pattern=None):
+        """Starts Bluetooth device discovery, optionally filtered through Adapter1.SetDiscoveryFilter.
+
+        Without arguments an unfiltered dual-mode scan is run (any filter set earlier is
+        cleared). The filter is only sent to BlueZ when it differs from the one currently
+        applied on this adapter.
+
+        Args:
+            transport (str): 'auto', 'bredr' or 'le'.
+            rssi (int): Only report devices with an RSSI above this value (dBm).
+            pathloss (int): Only report devices with a pathloss below this value (dB).
+                Cannot be combined with rssi.
+            uuids (list): Only report devices advertising one of these service UUIDs.
+            duplicate_data (bool): Report every advertisement (True) or only changes (False).
+            pattern (str): Only report devices whose address or name starts with this prefix.
+        returns:
+            None
+        """
+        self.set_discovery_filter(transport=transport, rssi=rssi, pathloss=pathloss, uuids=uuids,
+                                  duplicate_data=duplicate_data, pattern=pattern)
         self.adapter.StartDiscovery()
 
+    def set_discovery_filter(self, transport=None, rssi=None, pathloss=None, uuids=None, duplicate_data=None,
+                             pattern=None):
+        """Applies a discovery filter to the adapter, see start_discovery() for the arguments.
+
+        returns: None
+        Raises:
+            ValueError: If the filter arguments are inconsistent.
+        """
+        if rssi is not None and pathloss is not None:
+            raise ValueError("RSSI and Pathloss discovery filters are mutually exclusive")
+        if transport is not None and transport not in ("auto", "bredr", "le"):
+            raise ValueError(f"Invalid discovery transport: {transport}")
+
+        discovery_filter = {}
+        if transport is not None:
+            discovery_filter["Transport"] = dbus.String(transport)
+        if rssi is not None:
+            discovery_filter["RSSI"] = dbus.Int16(rssi)
+        if pathloss is not None:
+            discovery_filter["Pathloss"] = dbus.UInt16(pathloss)
+        if uuids:
+            discovery_filter["UUIDs"] = dbus.Array([str(uuid).lower() for uuid in uuids], signature="s")
+        if duplicate_data is not None:
+            discovery_filter["DuplicateData"] = dbus.Boolean(duplicate_data)
+        if pattern:
+            discovery_filter["Pattern"] = dbus.String(pattern)
+
+        # The filter belongs to our bus connection, so it is tracked on the shared session
+        if discovery_filter == self.session.discovery_filter:
+            return
+        self.adapter.SetDiscoveryFilter(dbus.Dictionary(discovery_filter, signature="sv"))
+        self.session.discovery_filter = discovery_filter
+
+    def get_discovery_filter(self):
+        """Returns the discovery filter currently applied on this adapter.
+
+        args: None
+        Returns:
+            dict: Filter entries as sent to SetDiscoveryFilter, empty when unfiltered.
+        """
+        return dict(self.session.discovery_filter)
+
     def stop_discovery(self):
         """Stops Bluetooth device discovery.
 
@@ -61,25 +170,52 @@ class BluezServices:
         returns:
             None
         """
-        self.start_discovery()
-        time.sleep(timeout)
-        self.stop_discovery()
+        for device in self.discover(timeout=timeout, include_cached=True):
+            print("Device Address:", device.address)
+            print("Device Name:", device.alias)
 
-        devices = []
-        objects = self.object_manager.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                devices.append(path)
-
-        for device_path in devices:
-            device_props = dbus.Interface(
-                self.bus.get_object("org.bluez", device_path),
-                dbus_interface="org.freedesktop.DBus.Properties"
-            )
-            address = device_props.Get("org.bluez.Device1", "Address")
-            name = device_props.Get("org.bluez.Device1", "Alias")
-            print("Device Address:", address)
-            print("Device Name:", name)
+    def discover(self, timeout=None, count=None, predicate=None, include_cached=False, **discovery_filter):
+        """
+        Runs device discovery and yields each device as soon as BlueZ reports it.
+
+        Discovery is started when iteration begins and stopped when the stream ends,
+        whether on timeout, on count, or because the caller stopped iterating.
+
+        Args:
+            timeout (float): Stop after this many seconds, None to run until count is reached.
+            count (int): Stop after this many devices were yielded.
+            predicate (callable): Only yield records for which predicate(record) is true;
+                with count=1 this stops on the first matching device.
+            include_cached (bool): Also yield devices BlueZ already knew about.
+            **discovery_filter: Filter arguments passed to start_discovery().
+
+        Returns:
+            generator: DiscoveredDevice records (address, alias, RSSI, UUIDs,
+            address type, first/last seen).
+        """
+        discovery = DeviceDiscovery(self.object_cache, self.interface)
+        self.start_discovery(**discovery_filter)
+        try:
+            yield from discovery.stream(timeout=timeout, count=count, predicate=predicate,
+                                        include_cached=include_cached)
+        finally:
+            self.stop_discovery()
+
+    async def adiscover(self, timeout=None, count=None, predicate=None, include_cached=False, **discovery_filter):
+        """
+        Async-iterator flavour of discover(), with the same arguments.
+
+        Returns:
+            async generator: DiscoveredDevice records.
+        """
+        discovery = DeviceDiscovery(self.object_cache, self.interface)
+        self.start_discovery(**discovery_filter)
+        try:
+            async for device in discovery.astream(timeout=timeout, count=count, predicate=predicate,
+                                                  include_cached=include_cached):
+                yield device
+        finally:
+            self.stop_discovery()
 
     def pair(self, address):
         """
@@ -97,23 +233,16 @@ class BluezServices:
             return False
 
         try:
-            device = dbus.Interface(
-                self.bus.get_object("org.bluez", device_path),
-                dbus_interface="org.bluez.Device1"
-            )
+            device = self.proxies.get_interface(device_path, "org.bluez.Device1")
             print(f"Initiating pairing with {device_path}")
-            device.Pair()
+            # Pairing may wait for user confirmation, so single attempts get a longer timeout
+            self.retry_policy.run(lambda timeout: device.Pair(timeout=timeout), f"Pair {address}",
+                                  check=lambda: self.is_device_paired(address), deadline=45, call_timeout=20)
 
-            props = dbus.Interface(
-                self.bus.get_object("org.bluez", device_path),
-                "org.freedesktop.DBus.Properties"
-            )
-
-            for _ in range(20):  # Wait for up to 10 seconds
-                if props.Get("org.bluez.Device1", "Paired"):
-                    print("Pairing is successful")
-                    return True
-                time.sleep(0.5)
+            # Returns as soon as BlueZ reports Paired=True, waits for up to 10 seconds
+            if self.object_cache.wait_for_property(device_path, "org.bluez.Device1", "Paired", bool, timeout=10):
+                print("Pairing is successful")
+                return True
 
             print("Pairing attempted but not confirmed")
             return False
@@ -142,11 +271,14 @@ class BluezServices:
             return False
 
 
-        device = dbus.Interface(
-                self.bus.get_object("org.bluez", device_path),
-                dbus_interface="org.bluez.Device1"
-            )
-        device.Disconnect()
+        device = self.proxies.get_interface(device_path, "org.bluez.Device1")
+        try:
+            self.retry_policy.run(lambda timeout: device.Disconnect(timeout=timeout), f"Disconnect {address}",
+                                  check=lambda: not self.is_device_connected(address),
+                                  already_done=(NOT_CONNECTED,))
+        except dbus.exceptions.DBusException as e:
+            print(f"Disconnection failed: {e.get_dbus_message()}")
+            return False
         return True
 
 
@@ -165,15 +297,28 @@ class BluezServices:
             print("Device path not found for connection")
             return False
 
-
-
-        device = dbus.Interface(
-                self.bus.get_object("org.bluez", device_path),
-                dbus_interface="org.bluez.Device1"
-            )
         self.adapter.RemoveDevice(device_path)
         return True
 
+    def remove_devices(self, adapter=None, unpaired_only=False, older_than=None, addresses=None, predicate=None):
+        """
+        Removes every device matching the given criteria in one pass (see BulkDeviceRemover.select).
+
+        Args:
+            adapter (str): Interface name, defaults to this service's adapter.
+            unpaired_only (bool): Keep paired devices.
+            older_than (float): Only devices not seen for at least this many minutes.
+            addresses (list): Only these Bluetooth MAC addresses.
+            predicate (callable): Extra filter called as predicate(path, props).
+
+        Returns:
+            dict: matched/removed/failed counts, failures per address and elapsed seconds.
+        """
+        remover = BulkDeviceRemover(self.session)
+        report = remover.remove(adapter=adapter or self.interface, unpaired_only=unpaired_only,
+                                older_than=older_than, addresses=addresses, predicate=predicate)
+        return report.as_dict()
+
     def br_edr_connect(self, address):
         """
         Initiates BR/EDR (Classic Bluetooth) connection.
@@ -190,17 +335,12 @@ class BluezServices:
             return False
 
         try:
-            device = dbus.Interface(
-                self.bus.get_object("org.bluez", device_path),
-                dbus_interface="org.bluez.Device1"
-            )
-            device.Connect()
-
-            props = dbus.Interface(
-                self.bus.get_object("org.bluez", device_path),
-                "org.freedesktop.DBus.Properties"
-            )
-            if props.Get("org.bluez.Device1", "Connected"):
+            device = self.proxies.get_interface(device_path, "org.bluez.Device1")
+            self.latency_tracker.mark_connect_start(device_path)
+            self.retry_policy.run(lambda timeout: device.Connect(timeout=timeout), f"Connect {address}",
+                                  check=lambda: self.is_device_connected(address))
+
+            if self.object_cache.wait_for_property(device_path, "org.bluez.Device1", "Connected", bool, timeout=2):
                 print("Connection is successful")
                 return True
             else:
@@ -211,26 +351,60 @@ class BluezServices:
             print(f"Connection failed: {e}")
             return False
 
-    def le_connect(self, address):
+    def le_connect(self, address, uuid='0000110e-0000-1000-8000-00805f9b34fb'):
         """
         Initiates Low Energy (LE) connection using a specific profile.
 
         Args:
             address (str): Bluetooth MAC address.
+            uuid (str): Profile UUID to connect with ConnectProfile(), defaults to AVRCP
+                (A/V Remote Control, 0x110E); None connects with Device1.Connect() so that
+                GATT services can be used through get_gatt_client().
         returns:
             None
         """
         device_path = self.find_device_path(address)
         if device_path:
             try:
-                device = dbus.Interface(
-                    self.bus.get_object("org.bluez", device_path),
-                    dbus_interface="org.bluez.Device1"
-                )
-                device.ConnectProfile('0000110e-0000-1000-8000-00805f9b34fb')  # HID Profile
+                device = self.proxies.get_interface(device_path, "org.bluez.Device1")
+                self.latency_tracker.mark_connect_start(device_path)
+                if uuid is None:
+                    device.Connect()
+                    return
+                start = time.monotonic()
+                device.ConnectProfile(uuid)
+                self.latency_tracker.record_profile(device_path, uuid, time.monotonic() - start)
             except Exception as e:
                 print("LE Connection has failed:", e)
 
+    def get_connection_latencies(self, address=None):
+        """
+        Returns connection lifecycle latency statistics recorded on this adapter.
+
+        Args:
+            address (str): Only report this device, every device if None.
+
+        Returns:
+            dict: {address: {phase: {count, min, mean, p50, p90, p99, max, buckets}}}
+            in milliseconds, phases being connected, services_resolved, media_transport
+            and connect_profile:<uuid>.
+        """
+        return self.latency_tracker.summary(adapter=self.interface, address=address).get(self.interface, {})
+
+    def export_connection_latencies(self, file_path):
+        """
+        Exports the recorded latencies, as raw samples for .csv files and as statistics otherwise.
+
+        Args:
+            file_path (str): Destination file.
+        returns:
+            None
+        """
+        if file_path.endswith(".csv"):
+            self.latency_tracker.export_csv(file_path)
+        else:
+            self.latency_tracker.export_json(file_path)
+
     def set_discoverable_on(self):
         """
         Makes the Bluetooth device discoverable.
@@ -269,14 +443,7 @@ class BluezServices:
         if not device_path:
             return False
 
-        props = dbus.Interface(
-            self.bus.get_object("org.bluez", device_path),
-            "org.freedesktop.DBus.Properties"
-        )
-        try:
-            return props.Get("org.bluez.Device1", "Paired")
-        except dbus.exceptions.DBusException:
-            return False
+        return bool(self.object_cache.get_property(device_path, "org.bluez.Device1", "Paired", False))
 
     def is_device_connected(self, device_address):
         """
@@ -292,14 +459,7 @@ class BluezServices:
         if not device_path:
             return False
 
-        props = dbus.Interface(
-            self.bus.get_object("org.bluez", device_path),
-            "org.freedesktop.DBus.Properties"
-        )
-        try:
-            return props.Get("org.bluez.Device1", "Connected")
-        except dbus.exceptions.DBusException:
-            return False
+        return bool(self.object_cache.get_property(device_path, "org.bluez.Device1", "Connected", False))
 
     def set_device_address(self, address):
         """
@@ -360,13 +520,7 @@ class BluezServices:
         Returns:
             str | None: Object path if found, else None.
         """
-        objects = self.object_manager.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                props = interfaces["org.bluez.Device1"]
-                if props.get("Address") == address:
-                    return path
-        return None
+        return self.object_cache.find_device_path(address, self.interface)
 
     def refresh_device_list(self):
         """
@@ -376,20 +530,17 @@ class BluezServices:
         returns: None
         """
         self.devices.clear()
-        objects = self.object_manager.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                props = interfaces["org.bluez.Device1"]
-                address = props.get("Address")
-                name = props.get("Name", "Unknown")
-                uuids = props.get("UUIDs", [])
-                connected = props.get("Connected", False)
-                if address:
-                    self.devices[address] = {
-                        "Name": name,
-                        "UUIDs": uuids,
-                        "Connected": connected,
-                    }
+        for path, props in self.object_cache.get_objects_with_interface("org.bluez.Device1"):
+            address = props.get("Address")
+            name = props.get("Name", "Unknown")
+            uuids = props.get("UUIDs", [])
+            connected = props.get("Connected", False)
+            if address:
+                self.devices[address] = {
+                    "Name": name,
+                    "UUIDs": uuids,
+                    "Connected": connected,
+                }
     '''
     def get_paired_devices(self):
         """
@@ -441,14 +592,10 @@ class BluezServices:
             dict: Mapping of device addresses to names.
         """
         connected = {}
-        objects = self.object_manager.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                props = interfaces["org.bluez.Device1"]
-                if props.get("Paired", False):
-                    address = props.get("Address")
-                    name = props.get("Name", "Unknown")
-                    connected[address] = name
+        for path, props in self.object_cache.get_devices("Paired"):
+            address = props.get("Address")
+            name = props.get("Name", "Unknown")
+            connected[address] = name
         return connected
 
     def get_connected_devices(self):
@@ -460,12 +607,8 @@ class BluezServices:
             dict: Mapping of device addresses to names.
         """
         connected = {}
-        objects = self.object_manager.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if "org.bluez.Device1" in interfaces:
-                props = interfaces["org.bluez.Device1"]
-                if props.get("Connected", False):
-                    address = props.get("Address")
-                    name = props.get("Name", "Unknown")
-                    connected[address] = name
+        for path, props in self.object_cache.get_devices("Connected"):
+            address = props.get("Address")
+            name = props.get("Name", "Unknown")
+            connected[address] = name
         return connected
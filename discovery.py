@@ -0,0 +1,197 @@
+import asyncio
+import queue
+import time
+
+from Backend_lib.Linux.object_cache import DEVICE_IFACE, adapter_name
+
+# Device1 properties whose change means the device was (re)seen during a scan.
+DISCOVERY_PROPERTIES = frozenset(["RSSI", "TxPower", "Alias", "Name", "UUIDs", "ManufacturerData",
+                                  "ServiceData", "AddressType"])
+
+
+class DiscoveredDevice:
+    """
+    Snapshot of one device reported during discovery.
+    """
+
+    def __init__(self, path, props, first_seen, last_seen):
+        """
+        Builds the record from cached Device1 properties.
+
+        Args:
+            path (str): Device object path.
+            props (dict): Device1 properties.
+            first_seen (float): Epoch time the device was first reported in this scan.
+            last_seen (float): Epoch time of the latest report.
+        returns:
+            None
+        """
+        self.path = path
+        self.adapter = adapter_name(props.get("Adapter")) or path.split("/")[3]
+        self.address = str(props.get("Address", ""))
+        self.alias = str(props.get("Alias", self.address))
+        self.name = str(props["Name"]) if "Name" in props else None
+        self.rssi = int(props["RSSI"]) if "RSSI" in props else None
+        self.uuids = [str(uuid) for uuid in props.get("UUIDs", [])]
+        self.address_type = str(props.get("AddressType", "public"))
+        self.paired = bool(props.get("Paired", False))
+        self.connected = bool(props.get("Connected", False))
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+
+    def as_dict(self):
+        """
+        Returns the record as a plain dictionary.
+
+        args: None
+        Returns:
+            dict: Record fields.
+        """
+        return {
+            "path": self.path,
+            "adapter": self.adapter,
+            "address": self.address,
+            "alias": self.alias,
+            "name": self.name,
+            "rssi": self.rssi,
+            "uuids": self.uuids,
+            "address_type": self.address_type,
+            "paired": self.paired,
+            "connected": self.connected,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+        }
+
+    def __repr__(self):
+        return f"DiscoveredDevice(address={self.address!r}, alias={self.alias!r}, rssi={self.rssi!r})"
+
+
+class DeviceDiscovery:
+    """
+    Streams devices out of the object cache as InterfacesAdded/PropertiesChanged arrive.
+
+    Only consumes events; starting and stopping the adapter scan is left to the caller
+    (see BluezServices.discover()).
+    """
+
+    def __init__(self, object_cache, adapter=None):
+        """
+        Initializes the discovery stream.
+
+        Args:
+            object_cache (BluezObjectCache): Cache delivering device events.
+            adapter (str): Optional interface name to restrict the stream to.
+        returns:
+            None
+        """
+        self.object_cache = object_cache
+        self.adapter = adapter_name(adapter)
+        self.first_seen = {}
+        self.last_seen = {}
+
+    def _is_discovery_event(self, event, path, data):
+        if event == "added":
+            return DEVICE_IFACE in data
+        if event == "changed":
+            interface, changed, invalidated = data
+            return interface == DEVICE_IFACE and not DISCOVERY_PROPERTIES.isdisjoint(changed)
+        return False
+
+    def _record(self, path, seen_at):
+        props = self.object_cache.get_properties(path, DEVICE_IFACE)
+        if props is None:
+            return None
+        record = DiscoveredDevice(path, props, self.first_seen.setdefault(path, seen_at), seen_at)
+        if self.adapter and record.adapter != self.adapter:
+            return None
+        self.last_seen[path] = seen_at
+        return record
+
+    def _initial_paths(self, include_cached):
+        if not include_cached:
+            return []
+        return [path for path, props in self.object_cache.get_devices(adapter=self.adapter)]
+
+    def _select(self, path, predicate, unique, emitted):
+        if unique and path in emitted:
+            return None
+        record = self._record(path, time.time())
+        if record is None or (predicate and not predicate(record)):
+            return None
+        emitted.add(path)
+        return record
+
+    def stream(self, timeout=None, count=None, predicate=None, unique=True, include_cached=False):
+        """
+        Yields DiscoveredDevice records as soon as the matching events arrive.
+
+        Args:
+            timeout (float): Stop after this many seconds, None to run until count is reached.
+            count (int): Stop after this many records were yielded.
+            predicate (callable): Only yield records for which predicate(record) is true;
+                with count=1 this stops on the first matching device.
+            unique (bool): Yield each device at most once.
+            include_cached (bool): Also yield devices BlueZ already knew about.
+
+        Returns:
+            generator: DiscoveredDevice records.
+        """
+        events = queue.Queue()
+
+        def listener(event, path, data):
+            if self._is_discovery_event(event, path, data):
+                events.put(path)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        emitted = set()
+        self.object_cache.add_listener(listener)
+        try:
+            for path in self._initial_paths(include_cached):
+                events.put(path)
+            while count is None or len(emitted) < count:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return
+                try:
+                    path = events.get(timeout=remaining)
+                except queue.Empty:
+                    return
+                record = self._select(path, predicate, unique, emitted)
+                if record is not None:
+                    yield record
+        finally:
+            self.object_cache.remove_listener(listener)
+
+    async def astream(self, timeout=None, count=None, predicate=None, unique=True, include_cached=False):
+        """
+        Async-iterator flavour of stream(), with the same arguments.
+
+        Returns:
+            async generator: DiscoveredDevice records.
+        """
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def listener(event, path, data):
+            if self._is_discovery_event(event, path, data):
+                loop.call_soon_threadsafe(events.put_nowait, path)
+
+        deadline = None if timeout is None else loop.time() + timeout
+        emitted = set()
+        self.object_cache.add_listener(listener)
+        try:
+            for path in self._initial_paths(include_cached):
+                events.put_nowait(path)
+            while count is None or len(emitted) < count:
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    return
+                try:
+                    path = await asyncio.wait_for(events.get(), remaining)
+                except asyncio.TimeoutError:
+                    return
+                record = self._select(path, predicate, unique, emitted)
+                if record is not None:
+                    yield record
+        finally:
+            self.object_cache.remove_listener(listener)
@@ -0,0 +1,316 @@
+import threading
+
+from PyQt6.QtCore import QAbstractTableModel
+from PyQt6.QtCore import QEvent
+from PyQt6.QtCore import QModelIndex
+from PyQt6.QtCore import QRect
+from PyQt6.QtCore import QSortFilterProxyModel
+from PyQt6.QtCore import Qt
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtGui import QColor
+from PyQt6.QtGui import QFont
+from PyQt6.QtGui import QPalette
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtWidgets import QStyle
+from PyQt6.QtWidgets import QStyleOptionButton
+from PyQt6.QtWidgets import QStyledItemDelegate
+
+from Backend_lib.Linux.object_cache import DEVICE_IFACE, adapter_name
+
+NAME_COLUMN, ADDRESS_COLUMN, RSSI_COLUMN, PROCEDURES_COLUMN = range(4)
+HEADERS = ["DEVICE NAME", "BD_ADDR", "RSSI", "PROCEDURES"]
+
+# Role returning the raw value a column is sorted on (RSSI as int, text lower-cased).
+SORT_ROLE = Qt.ItemDataRole.UserRole
+# Role returning the device address of a row, whatever the column.
+ADDRESS_ROLE = Qt.ItemDataRole.UserRole + 1
+
+DEVICE_ACTIONS = [("pair", "PAIR"), ("br_edr_connect", "BR_EDR_CONNECT"), ("le_connect", "LE_CONNECT")]
+
+
+class DiscoveryTableModel(QAbstractTableModel):
+    """
+    Table model of the devices known to one adapter, kept current from object cache events.
+
+    Cache listeners run on the D-Bus main loop thread, so they only record the changed
+    paths; a queued signal then applies every pending change on the GUI thread in one
+    batch. Known rows are updated in place with dataChanged and new devices are appended
+    with a single beginInsertRows per batch, so the view never rebuilds.
+    """
+
+    changes_pending = pyqtSignal()
+
+    def __init__(self, object_cache, adapter=None, parent=None):
+        """
+        Initializes the model and loads the devices already in the cache.
+
+        Args:
+            object_cache (BluezObjectCache): Cache delivering device events.
+            adapter (str): Interface name (e.g., 'hci0') to restrict the rows to.
+            parent (QObject): Optional Qt parent.
+        returns:
+            None
+        """
+        super().__init__(parent)
+        self.object_cache = object_cache
+        self.adapter = adapter_name(adapter)
+        self.rows = []
+        self.row_index = {}
+        self.pending = set()
+        self.pending_lock = threading.Lock()
+        self.bold_font = QFont()
+        self.bold_font.setBold(True)
+        self.changes_pending.connect(self.apply_pending_changes, Qt.ConnectionType.QueuedConnection)
+        self.reload()
+        self.object_cache.add_listener(self._on_cache_event)
+
+    def detach(self):
+        """
+        Stops listening to the object cache.
+
+        args: None
+        returns: None
+        """
+        self.object_cache.remove_listener(self._on_cache_event)
+
+    def reload(self):
+        """
+        Resets the rows from a snapshot of the cache.
+
+        args: None
+        returns: None
+        """
+        self.beginResetModel()
+        self.rows = [self._make_row(path, props)
+                     for path, props in self.object_cache.get_devices(adapter=self.adapter)]
+        self.row_index = {row["path"]: i for i, row in enumerate(self.rows)}
+        self.endResetModel()
+
+    def _make_row(self, path, props):
+        address = str(props.get("Address", ""))
+        return {
+            "path": path,
+            "address": address,
+            "name": str(props.get("Alias", address)),
+            "rssi": int(props["RSSI"]) if "RSSI" in props else None,
+        }
+
+    def _on_cache_event(self, event, path, data):
+        if event == "changed" and data[0] != DEVICE_IFACE:
+            return
+        if event != "changed" and DEVICE_IFACE not in data:
+            return
+        with self.pending_lock:
+            schedule = not self.pending
+            self.pending.add(path)
+        if schedule:
+            self.changes_pending.emit()
+
+    def apply_pending_changes(self):
+        """
+        Applies every device change recorded since the last call (GUI thread only).
+
+        args: None
+        returns: None
+        """
+        with self.pending_lock:
+            paths, self.pending = self.pending, set()
+
+        new_rows = []
+        removed = []
+        for path in paths:
+            props = self.object_cache.get_properties(path, DEVICE_IFACE)
+            row = self.row_index.get(path)
+            if props is None:
+                if row is not None:
+                    removed.append(row)
+                continue
+            record = self._make_row(path, props)
+            if row is None:
+                key = self.object_cache.get_device_key(path)
+                if key and (self.adapter is None or key[0] == self.adapter):
+                    new_rows.append(record)
+            elif record != self.rows[row]:
+                self.rows[row] = record
+                self.dataChanged.emit(self.index(row, NAME_COLUMN), self.index(row, RSSI_COLUMN))
+
+        for row in sorted(removed, reverse=True):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.rows[row]
+            self.endRemoveRows()
+        if removed:
+            self.row_index = {record["path"]: i for i, record in enumerate(self.rows)}
+
+        if new_rows:
+            first = len(self.rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_rows) - 1)
+            for offset, record in enumerate(new_rows):
+                self.row_index[record["path"]] = first + offset
+                self.rows.append(record)
+            self.endInsertRows()
+
+    def device_at(self, row):
+        """
+        Returns the record shown in a source row.
+
+        Args:
+            row (int): Row number in this model.
+
+        Returns:
+            dict: Record with path, address, name and rssi keys.
+        """
+        return self.rows[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return HEADERS[section]
+            if role == Qt.ItemDataRole.FontRole:
+                return self.bold_font
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.rows[index.row()]
+        column = index.column()
+        if role == ADDRESS_ROLE:
+            return record["address"]
+        if role == Qt.ItemDataRole.FontRole:
+            return self.bold_font
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == NAME_COLUMN:
+                return record["name"]
+            if column == ADDRESS_COLUMN:
+                return record["address"]
+            if column == RSSI_COLUMN:
+                return "" if record["rssi"] is None else str(record["rssi"])
+        if role == SORT_ROLE:
+            if column == NAME_COLUMN:
+                return record["name"].lower()
+            if column == ADDRESS_COLUMN:
+                return record["address"]
+            if column == RSSI_COLUMN:
+                # Devices without an RSSI (not seen in this scan) sort as the weakest
+                return -1000 if record["rssi"] is None else record["rssi"]
+        return None
+
+
+class DiscoveryFilterProxyModel(QSortFilterProxyModel):
+    """
+    Sorts discovery rows by name, address or RSSI and filters them by text and signal strength.
+    """
+
+    def __init__(self, parent=None):
+        """
+        Initializes the proxy with an empty filter.
+
+        Args:
+            parent (QObject): Optional Qt parent.
+        returns:
+            None
+        """
+        super().__init__(parent)
+        self.filter_text = ""
+        self.min_rssi = None
+        self.setSortRole(SORT_ROLE)
+        self.setDynamicSortFilter(True)
+
+    def set_filter_text(self, text):
+        """
+        Shows only rows whose name or address contains text (case-insensitive).
+
+        Args:
+            text (str): Text to match, empty to show every row.
+        returns:
+            None
+        """
+        self.filter_text = text.strip().lower()
+        self.invalidateFilter()
+
+    def set_min_rssi(self, rssi):
+        """
+        Shows only rows whose RSSI is at least rssi dBm.
+
+        Args:
+            rssi (int): Threshold in dBm, None to disable the threshold.
+        returns:
+            None
+        """
+        self.min_rssi = rssi
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        record = self.sourceModel().device_at(source_row)
+        if self.filter_text and self.filter_text not in record["name"].lower() \
+                and self.filter_text not in record["address"].lower():
+            return False
+        if self.min_rssi is not None and (record["rssi"] is None or record["rssi"] < self.min_rssi):
+            return False
+        return True
+
+
+class DeviceActionDelegate(QStyledItemDelegate):
+    """
+    Paints the PAIR / BR_EDR_CONNECT / LE_CONNECT buttons of the procedures column.
+
+    Nothing is instantiated per row: the buttons are drawn with the current style and
+    clicks are hit-tested against the same rectangles, then reported through
+    action_clicked(action, address).
+    """
+
+    action_clicked = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        """
+        Initializes the delegate.
+
+        Args:
+            parent (QObject): Optional Qt parent.
+        returns:
+            None
+        """
+        super().__init__(parent)
+        self.bold_font = QFont()
+        self.bold_font.setBold(True)
+
+    def _button_rects(self, cell):
+        width = cell.width() // len(DEVICE_ACTIONS)
+        return [(action, label, QRect(cell.x() + i * width + 2, cell.y() + 2, width - 4, cell.height() - 4))
+                for i, (action, label) in enumerate(DEVICE_ACTIONS)]
+
+    def paint(self, painter, option, index):
+        style = option.widget.style() if option.widget else QApplication.style()
+        painter.save()
+        painter.setFont(self.bold_font)
+        for action, label, rect in self._button_rects(option.rect):
+            button = QStyleOptionButton()
+            button.rect = rect
+            button.text = label
+            button.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+            button.palette = QPalette(option.palette)
+            button.palette.setColor(QPalette.ColorRole.ButtonText, QColor("green"))
+            button.fontMetrics = painter.fontMetrics()
+            style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, option.widget)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        size.setWidth(len(DEVICE_ACTIONS) * 120)
+        return size
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() != QEvent.Type.MouseButtonRelease or event.button() != Qt.MouseButton.LeftButton:
+            return False
+        position = event.position().toPoint()
+        for action, label, rect in self._button_rects(option.rect):
+            if rect.contains(position):
+                self.action_clicked.emit(action, index.data(ADDRESS_ROLE))
+                return True
+        return False
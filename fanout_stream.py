@@ -0,0 +1,337 @@
+import queue
+import subprocess
+import threading
+import time
+
+from Backend_lib.Linux.audio_stream import ERROR, FINISHED, PLAYING, STARTING, STOPPED, AudioStream
+
+
+class SinkFeed:
+    """
+    Playback stream of one sink in a FanoutStream, with its own queue and counters.
+    """
+
+    def __init__(self, sink, capacity):
+        """
+        Initializes the feed.
+
+        Args:
+            sink (str): PulseAudio sink name.
+            capacity (int): Chunks the sink may have queued before its oldest is dropped.
+        returns:
+            None
+        """
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=capacity)
+        self.process = None
+        self.thread = None
+        self.state = STARTING
+        self.error = None
+        self.bytes_written = 0
+        self.dropped_bytes = 0
+        self.underruns = 0
+        self.taken = 0
+        self.started_at = None
+        self.finished_at = None
+        self.drift_baseline = None
+        self.drift_ms = 0.0
+        self.max_drift_ms = 0.0
+
+    def is_active(self):
+        return self.state in (STARTING, PLAYING)
+
+
+class FanoutStream(AudioStream):
+    """
+    Plays one audio file to several sinks from a single decode.
+
+    The decoder thread decodes each chunk once and hands the same buffer to every
+    sink's queue; each sink has its own pacat stream and writer thread, so a sink
+    that consumes slowly (or blocks) only delays itself. The decoder stays buffer_ms
+    ahead of the sink that has consumed the most. A sink falling more than max_lag_ms
+    behind it has its oldest chunks dropped and counted, so it skips ahead instead of
+    stalling the others. A sink whose stream fails is dropped from the fan-out.
+
+    Drift is tracked per sink as the change of (audio written - wall time) since the
+    sink settled, i.e. how far its clock has run from the host clock.
+    """
+
+    # Seconds of playback after which a sink's buffers are full and its drift baseline is taken.
+    DRIFT_SETTLE = 2.0
+
+    def __init__(self, path, sinks, spec=None, buffer_ms=500, latency_ms=100, chunk_ms=20, max_lag_ms=500):
+        """
+        Initializes the stream; start() begins playback.
+
+        Args:
+            path (str): Audio file (WAV is memory-mapped, other formats go through ffmpeg).
+            sinks (list): PulseAudio sink names.
+            spec (PcmSpec): Output spec of every sink; None plays WAV files in their own format.
+            buffer_ms (int): Decoded audio kept ahead of the leading sink, in milliseconds.
+            latency_ms (int): Latency target of each playback stream, in milliseconds.
+            chunk_ms (int): Duration of one chunk, in milliseconds.
+            max_lag_ms (int): Lag behind the leading sink at which a sink starts skipping audio.
+        returns:
+            None
+        """
+        if not sinks:
+            raise ValueError("At least one sink is required")
+        if len(set(sinks)) != len(sinks):
+            raise ValueError("Each sink may only be fed once")
+        AudioStream.__init__(self, path, None, spec, buffer_ms, latency_ms, chunk_ms)
+        self.window = max(2, buffer_ms // chunk_ms)
+        self.feeds = [SinkFeed(sink, self.window + max(1, max_lag_ms // chunk_ms)) for sink in sinks]
+        self.produced = 0
+        self.space = threading.Condition()
+        self.running_writers = 0
+
+    def stream_name(self):
+        return f"fanout {AudioStream.stream_name(self)}"
+
+    def start(self):
+        """
+        Opens the file and one playback stream per sink and starts the threads.
+
+        Sinks whose playback stream cannot be opened are marked failed; the stream
+        only fails if no sink could be opened.
+
+        args: None
+        returns: None
+        Raises:
+            ValueError | RuntimeError | OSError: If the file cannot be decoded or no sink can play.
+        """
+        self._open()
+        for feed in self.feeds:
+            try:
+                feed.process = self._open_playback(feed.sink)
+            except (RuntimeError, OSError) as e:
+                feed.state = ERROR
+                feed.error = str(e)
+                print(f"[FanoutStream] Cannot open {feed.sink}: {e}")
+        feeds = [feed for feed in self.feeds if feed.process]
+        if not feeds:
+            self._close_source()
+            raise RuntimeError(f"No sink could be opened: {self.feeds[0].error}")
+        self.running_writers = len(feeds)
+        self.threads = [threading.Thread(target=self._decode, name="FanoutStreamDecoder", daemon=True)]
+        for feed in feeds:
+            feed.thread = threading.Thread(target=self._write_feed, args=(feed,), name="FanoutStreamWriter",
+                                           daemon=True)
+            self.threads.append(feed.thread)
+        for thread in self.threads:
+            thread.start()
+
+    def _wait_for_space(self):
+        # Blocks until the decoder is less than window chunks ahead of the leading sink.
+        with self.space:
+            while not self.stop_event.is_set():
+                feeds = [feed for feed in self.feeds if feed.is_active()]
+                if not feeds:
+                    return False
+                if self.produced - max(feed.taken for feed in feeds) < self.window:
+                    return True
+                self.space.wait(0.1)
+        return False
+
+    def _offer(self, feed, item):
+        # Never blocks: a full queue loses its oldest chunk, so a lagging sink skips ahead
+        while True:
+            try:
+                feed.queue.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+            try:
+                dropped = feed.queue.get_nowait()
+            except queue.Empty:
+                continue
+            with self.lock:
+                feed.dropped_bytes += len(dropped)
+
+    def _decode(self):
+        chunk_bytes = self.spec.bytes_per_second * self.chunk_ms // 1000
+        if self.converter:
+            chunk_bytes = self.source.spec.bytes_per_second * self.chunk_ms // 1000
+        try:
+            for chunk in self.source.chunks(chunk_bytes):
+                # One copy shared by every sink; views would pin the memory map until the last sink wrote them
+                chunk = self.converter.convert(chunk) if self.converter else bytes(chunk)
+                if not self._wait_for_space():
+                    break
+                for feed in self.feeds:
+                    if feed.is_active():
+                        self._offer(feed, chunk)
+                self.produced += 1
+        except Exception as e:
+            if not self.stop_event.is_set():
+                self._fail(f"Decoding failed: {e}")
+        finally:
+            self.source.close()
+            self.decode_done = True
+            for feed in self.feeds:
+                if feed.is_active():
+                    self._offer(feed, None)
+
+    def _write_feed(self, feed):
+        stdin = feed.process.stdin
+        bytes_per_second = self.spec.bytes_per_second
+        starving = False
+        next_drift = 0.0
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    chunk = feed.queue.get_nowait()
+                except queue.Empty:
+                    if not self.decode_done and not starving and feed.started_at is not None:
+                        with self.lock:
+                            feed.underruns += 1
+                            self.underruns += 1
+                        starving = True
+                    try:
+                        chunk = feed.queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                with self.space:
+                    feed.taken += 1
+                    self.space.notify()
+                starving = False
+                if chunk is None:
+                    break
+                view = memoryview(chunk)
+                while view:
+                    written = stdin.write(view)
+                    view = view[written:]
+                now = time.monotonic()
+                with self.lock:
+                    if feed.started_at is None:
+                        feed.started_at = now
+                        feed.state = PLAYING
+                        if self.started_at is None:
+                            self.started_at = now
+                            self.state = PLAYING
+                    feed.bytes_written += len(chunk)
+                    self.bytes_written += len(chunk)
+                    if now >= next_drift:
+                        # Audio the sink accepted beyond real time; its pacing is the sink's clock
+                        offset = feed.bytes_written / bytes_per_second - (now - feed.started_at)
+                        if feed.drift_baseline is None:
+                            if now - feed.started_at >= self.DRIFT_SETTLE:
+                                feed.drift_baseline = offset
+                        else:
+                            feed.drift_ms = (offset - feed.drift_baseline) * 1000.0
+                            if abs(feed.drift_ms) > abs(feed.max_drift_ms):
+                                feed.max_drift_ms = feed.drift_ms
+                        next_drift = now + 1.0
+            stdin.close()
+            if not self.stop_event.is_set():
+                feed.process.wait()
+                with self.lock:
+                    if feed.state in (STARTING, PLAYING):
+                        feed.state = FINISHED if feed.process.returncode == 0 else ERROR
+                        if feed.state == ERROR:
+                            feed.error = f"pacat exited with code {feed.process.returncode}"
+        except (BrokenPipeError, ValueError, OSError) as e:
+            if not self.stop_event.is_set():
+                print(f"[FanoutStream] {feed.sink} dropped: {e}")
+                with self.lock:
+                    feed.state = ERROR
+                    feed.error = f"Playback stream closed: {e}"
+        finally:
+            feed.finished_at = time.monotonic()
+            # The decoder may wait for this sink's queue; wake it up
+            with self.space:
+                self.space.notify()
+            self._writer_done()
+
+    def _writer_done(self):
+        with self.lock:
+            self.running_writers -= 1
+            if self.running_writers:
+                return
+            self.finished_at = time.monotonic()
+            if self.state in (STARTING, PLAYING):
+                states = [feed.state for feed in self.feeds]
+                self.state = FINISHED if FINISHED in states else ERROR
+                if self.state == ERROR and not self.error:
+                    self.error = "Every sink failed"
+
+    def stop(self):
+        """
+        Stops playback on every sink and releases the file and the playback streams.
+
+        args: None
+        returns: None
+        """
+        with self.lock:
+            if self.state in (STARTING, PLAYING):
+                self.state = STOPPED
+            for feed in self.feeds:
+                if feed.is_active():
+                    feed.state = STOPPED
+        self.stop_event.set()
+        for feed in self.feeds:
+            process = feed.process
+            if process and process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        for thread in self.threads:
+            thread.join(timeout=2)
+
+    def feed_status(self, feed):
+        """
+        Returns the counters of one sink.
+
+        Args:
+            feed (SinkFeed): Feed of the sink.
+
+        Returns:
+            dict: state, error, position in seconds, bytes written, dropped seconds,
+                underruns, buffered seconds, drift and largest drift in milliseconds.
+        """
+        bytes_per_second = self.spec.bytes_per_second if self.spec else 0
+        with self.lock:
+            bytes_written = feed.bytes_written
+            dropped_bytes = feed.dropped_bytes
+            state = feed.state
+        # Position in the file: played audio plus what was skipped to catch up
+        position = (bytes_written + dropped_bytes) / bytes_per_second if bytes_per_second else 0.0
+        if state != FINISHED:
+            position = max(0.0, position - self.latency_ms / 1000.0)
+        return {
+            "state": state,
+            "error": feed.error,
+            "position": position,
+            "bytes_written": bytes_written,
+            "dropped": dropped_bytes / bytes_per_second if bytes_per_second else 0.0,
+            "underruns": feed.underruns,
+            "buffered": feed.queue.qsize() * self.chunk_ms / 1000.0,
+            "drift_ms": feed.drift_ms,
+            "max_drift_ms": feed.max_drift_ms,
+        }
+
+    def status(self):
+        """
+        Returns the playback state and counters, overall and per sink.
+
+        args: None
+        Returns:
+            dict: AudioStream.status() fields (position of the leading sink, summed
+                underruns) plus 'sinks', sink name to feed_status(), and 'lag_ms', sink
+                name to milliseconds behind the leading sink (None for failed sinks).
+        """
+        status = AudioStream.status(self)
+        sinks = {feed.sink: self.feed_status(feed) for feed in self.feeds}
+        playing = [entry["position"] for entry in sinks.values() if entry["bytes_written"]]
+        leader = max(playing) if playing else 0.0
+        status.update({
+            "sink": ", ".join(feed.sink for feed in self.feeds),
+            "position": leader,
+            "buffered": max(entry["buffered"] for entry in sinks.values()),
+            "sinks": sinks,
+            "lag_ms": {sink: (leader - entry["position"]) * 1000.0 if entry["state"] != ERROR else None
+                       for sink, entry in sinks.items()},
+        })
+        return status
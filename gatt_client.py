@@ -0,0 +1,401 @@
+import json
+import os
+import threading
+
+import dbus
+
+from Backend_lib.Linux.object_cache import DEVICE_IFACE
+
+GATT_SERVICE_IFACE = "org.bluez.GattService1"
+GATT_CHARACTERISTIC_IFACE = "org.bluez.GattCharacteristic1"
+GATT_DESCRIPTOR_IFACE = "org.bluez.GattDescriptor1"
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "bluez_gatt_layout.json")
+
+
+def to_bytes(value):
+    """
+    Converts a D-Bus byte array (or any iterable of ints) to bytes.
+
+    Args:
+        value: dbus.Array of dbus.Byte, bytes or list of ints.
+
+    Returns:
+        bytes: Converted value.
+    """
+    return bytes(bytearray(value))
+
+
+class GattLayout:
+    """
+    Service/characteristic/descriptor layout of one remote device.
+
+    Paths are stored relative to the device object (e.g. 'service000c/char000d'),
+    which BlueZ keeps stable across reconnects as long as the remote database does
+    not change, so a layout stays valid on every adapter and every connection.
+    """
+
+    def __init__(self, services=None, characteristics=None, descriptors=None):
+        """
+        Builds the layout and its UUID indexes.
+
+        Args:
+            services (dict): Relative path -> service UUID.
+            characteristics (dict): Relative path -> {"uuid", "service", "flags"}.
+            descriptors (dict): Relative path -> {"uuid", "characteristic"}.
+        returns:
+            None
+        """
+        self.services = services or {}
+        self.characteristics = characteristics or {}
+        self.descriptors = descriptors or {}
+        self.characteristic_index = {}
+        self.service_characteristic_index = {}
+        self.descriptor_index = {}
+        for suffix, info in sorted(self.characteristics.items()):
+            service_uuid = self.services.get(info["service"])
+            self.characteristic_index.setdefault(info["uuid"], suffix)
+            self.service_characteristic_index.setdefault((service_uuid, info["uuid"]), suffix)
+        for suffix, info in sorted(self.descriptors.items()):
+            self.descriptor_index.setdefault((info["characteristic"], info["uuid"]), suffix)
+
+    @classmethod
+    def from_object_cache(cls, object_cache, device_path):
+        """
+        Walks the cached object tree below a device once.
+
+        Args:
+            object_cache (BluezObjectCache): Cache holding the GATT objects.
+            device_path (str): Device object path.
+
+        Returns:
+            GattLayout: Layout of the device, empty if services are not resolved yet.
+        """
+        prefix = device_path.rstrip("/") + "/"
+
+        def relative(path):
+            return str(path)[len(prefix):]
+
+        services = {relative(path): str(props.get("UUID", "")).lower()
+                    for path, props in object_cache.get_objects_with_interface(GATT_SERVICE_IFACE, prefix)}
+        characteristics = {
+            relative(path): {"uuid": str(props.get("UUID", "")).lower(),
+                             "service": relative(props.get("Service", "")),
+                             "flags": [str(flag) for flag in props.get("Flags", [])]}
+            for path, props in object_cache.get_objects_with_interface(GATT_CHARACTERISTIC_IFACE, prefix)
+        }
+        descriptors = {
+            relative(path): {"uuid": str(props.get("UUID", "")).lower(),
+                             "characteristic": relative(props.get("Characteristic", ""))}
+            for path, props in object_cache.get_objects_with_interface(GATT_DESCRIPTOR_IFACE, prefix)
+        }
+        return cls(services, characteristics, descriptors)
+
+    def as_dict(self):
+        """
+        Returns the layout in its persisted form.
+
+        args: None
+        Returns:
+            dict: services, characteristics and descriptors maps.
+        """
+        return {"services": self.services, "characteristics": self.characteristics,
+                "descriptors": self.descriptors}
+
+    def find_characteristic(self, uuid, service_uuid=None):
+        """
+        Resolves a characteristic UUID to its relative path.
+
+        Args:
+            uuid (str): Characteristic UUID.
+            service_uuid (str): Service UUID, to disambiguate characteristics present
+                in several services.
+
+        Returns:
+            str | None: Relative path, None if unknown.
+        """
+        if service_uuid:
+            return self.service_characteristic_index.get((service_uuid.lower(), uuid.lower()))
+        return self.characteristic_index.get(uuid.lower())
+
+    def find_descriptor(self, characteristic_suffix, uuid):
+        """
+        Resolves a descriptor UUID of a characteristic to its relative path.
+
+        Args:
+            characteristic_suffix (str): Relative path of the characteristic.
+            uuid (str): Descriptor UUID.
+
+        Returns:
+            str | None: Relative path, None if unknown.
+        """
+        return self.descriptor_index.get((characteristic_suffix, uuid.lower()))
+
+
+class GattClient:
+    """
+    GATT client API (read, write, write-without-response, notify) over BlueZ's
+    GattService1/GattCharacteristic1/GattDescriptor1 objects.
+
+    The layout of each device is walked once from the object cache, persisted to a
+    JSON file keyed by device address and reused on later connections, so that
+    UUID -> object path resolution is a dictionary lookup on every LE test cycle.
+    A persisted layout is re-walked only when its objects are missing after
+    ServicesResolved (the remote database changed).
+    """
+
+    def __init__(self, session, cache_file=DEFAULT_CACHE_FILE):
+        """
+        Initializes the client.
+
+        Args:
+            session (BluezSession): Session providing the object cache and proxies.
+            cache_file (str): JSON file persisting the layouts, None to keep them in memory only.
+        returns:
+            None
+        """
+        self.session = session
+        self.interface = session.interface
+        self.object_cache = session.object_cache
+        self.proxies = session.proxies
+        self.cache_file = cache_file
+        self.layouts = {}
+        self.persisted = None
+        self.notify_listeners = {}
+        self.lock = threading.Lock()
+
+    def _load_persisted(self):
+        if self.persisted is None:
+            self.persisted = {}
+            if self.cache_file and os.path.exists(self.cache_file):
+                try:
+                    with open(self.cache_file) as f:
+                        self.persisted = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"[GattClient] Ignoring unreadable layout cache {self.cache_file}: {e}")
+        return self.persisted
+
+    def _save_persisted(self):
+        if not self.cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temp_file = f"{self.cache_file}.tmp"
+            with open(temp_file, "w") as f:
+                json.dump(self.persisted, f, indent=1)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            print(f"[GattClient] Failed to persist layout cache: {e}")
+
+    def _device_path(self, address):
+        device_path = self.object_cache.find_device_path(address, self.interface)
+        if not device_path:
+            raise LookupError(f"Device {address} not found on {self.interface}")
+        return device_path
+
+    def _is_stale(self, layout, device_path):
+        if not self.object_cache.get_property(device_path, DEVICE_IFACE, "ServicesResolved", False):
+            return False  # nothing to compare against until services are resolved
+        if not layout.characteristics:
+            return True
+        suffix = next(iter(layout.characteristics))
+        return not self.object_cache.has_interface(f"{device_path}/{suffix}", GATT_CHARACTERISTIC_IFACE)
+
+    def get_layout(self, address, refresh=False):
+        """
+        Returns the GATT layout of a device, from memory, the persisted cache or a tree walk.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            refresh (bool): Re-walk the object tree even if a layout is cached.
+
+        Returns:
+            GattLayout: Layout of the device.
+        """
+        address = address.upper()
+        device_path = self._device_path(address)
+        with self.lock:
+            layout = None if refresh else self.layouts.get(address)
+            if layout is None and not refresh:
+                stored = self._load_persisted().get(address)
+                if stored:
+                    layout = GattLayout(stored.get("services"), stored.get("characteristics"),
+                                        stored.get("descriptors"))
+            if layout is None or self._is_stale(layout, device_path):
+                layout = GattLayout.from_object_cache(self.object_cache, device_path)
+                if layout.characteristics:
+                    self._load_persisted()[address] = layout.as_dict()
+                    self._save_persisted()
+            if layout.characteristics:
+                self.layouts[address] = layout
+            return layout
+
+    def invalidate(self, address=None):
+        """
+        Forgets the layout of one device, of several devices, or of every device.
+
+        Args:
+            address (str | list): Bluetooth MAC address or list of addresses, None for all devices.
+        returns:
+            None
+        """
+        with self.lock:
+            persisted = self._load_persisted()
+            if address is None:
+                self.layouts.clear()
+                persisted.clear()
+            else:
+                for item in ([address] if isinstance(address, str) else address):
+                    self.layouts.pop(item.upper(), None)
+                    persisted.pop(item.upper(), None)
+            self._save_persisted()
+
+    def get_characteristic_path(self, address, uuid, service_uuid=None):
+        """
+        Resolves a characteristic UUID of a device to its object path.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            uuid (str): Characteristic UUID.
+            service_uuid (str): Optional service UUID for characteristics present in several services.
+
+        Returns:
+            str: Characteristic object path.
+
+        Raises:
+            LookupError: If the device or characteristic is unknown.
+        """
+        suffix = self.get_layout(address).find_characteristic(uuid, service_uuid)
+        if suffix is None:
+            raise LookupError(f"Characteristic {uuid} not found on {address}")
+        return f"{self._device_path(address)}/{suffix}"
+
+    def _characteristic(self, address, uuid, service_uuid=None):
+        path = self.get_characteristic_path(address, uuid, service_uuid)
+        return path, self.proxies.get_interface(path, GATT_CHARACTERISTIC_IFACE)
+
+    def read(self, address, uuid, service_uuid=None, offset=0):
+        """
+        Reads a characteristic value.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            uuid (str): Characteristic UUID.
+            service_uuid (str): Optional service UUID.
+            offset (int): Offset to start reading at.
+
+        Returns:
+            bytes: Characteristic value.
+        """
+        path, characteristic = self._characteristic(address, uuid, service_uuid)
+        options = {"offset": dbus.UInt16(offset)} if offset else {}
+        return to_bytes(characteristic.ReadValue(dbus.Dictionary(options, signature="sv")))
+
+    def write(self, address, uuid, data, service_uuid=None, with_response=True, offset=0):
+        """
+        Writes a characteristic value.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            uuid (str): Characteristic UUID.
+            data (bytes): Value to write.
+            service_uuid (str): Optional service UUID.
+            with_response (bool): Write request (True) or write command without response (False).
+            offset (int): Offset to start writing at.
+        returns:
+            None
+        """
+        path, characteristic = self._characteristic(address, uuid, service_uuid)
+        options = {"type": dbus.String("request" if with_response else "command")}
+        if offset:
+            options["offset"] = dbus.UInt16(offset)
+        characteristic.WriteValue(dbus.Array(bytearray(data), signature="y"),
+                                  dbus.Dictionary(options, signature="sv"))
+
+    def write_without_response(self, address, uuid, data, service_uuid=None):
+        """
+        Writes a characteristic value with a write command (no response from the peer).
+
+        Args:
+            address (str): Bluetooth MAC address.
+            uuid (str): Characteristic UUID.
+            data (bytes): Value to write.
+            service_uuid (str): Optional service UUID.
+        returns:
+            None
+        """
+        self.write(address, uuid, data, service_uuid=service_uuid, with_response=False)
+
+    def read_descriptor(self, address, uuid, descriptor_uuid, service_uuid=None):
+        """
+        Reads a descriptor of a characteristic.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            uuid (str): Characteristic UUID.
+            descriptor_uuid (str): Descriptor UUID.
+            service_uuid (str): Optional service UUID.
+
+        Returns:
+            bytes: Descriptor value.
+        """
+        layout = self.get_layout(address)
+        suffix = layout.find_characteristic(uuid, service_uuid)
+        descriptor_suffix = layout.find_descriptor(suffix, descriptor_uuid) if suffix else None
+        if descriptor_suffix is None:
+            raise LookupError(f"Descriptor {descriptor_uuid} of {uuid} not found on {address}")
+        descriptor = self.proxies.get_interface(f"{self._device_path(address)}/{descriptor_suffix}",
+                                                GATT_DESCRIPTOR_IFACE)
+        return to_bytes(descriptor.ReadValue(dbus.Dictionary({}, signature="sv")))
+
+    def start_notify(self, address, uuid, callback, service_uuid=None):
+        """
+        Enables notifications/indications and forwards every new value to callback.
+
+        Values arrive as PropertiesChanged(Value) signals, delivered through the object
+        cache on the D-Bus main loop thread.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            uuid (str): Characteristic UUID.
+            callback (callable): Invoked as callback(value_bytes).
+            service_uuid (str): Optional service UUID.
+        returns:
+            None
+        """
+        path, characteristic = self._characteristic(address, uuid, service_uuid)
+
+        def listener(event, event_path, data):
+            if event == "changed" and event_path == path and data[0] == GATT_CHARACTERISTIC_IFACE \
+                    and "Value" in data[1]:
+                callback(to_bytes(data[1]["Value"]))
+
+        with self.lock:
+            previous = self.notify_listeners.pop(path, None)
+            self.notify_listeners[path] = listener
+        if previous:
+            self.object_cache.remove_listener(previous)
+        self.object_cache.add_listener(listener)
+        if not self.object_cache.get_property(path, GATT_CHARACTERISTIC_IFACE, "Notifying", False):
+            characteristic.StartNotify()
+
+    def stop_notify(self, address, uuid, service_uuid=None):
+        """
+        Disables notifications of a characteristic.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            uuid (str): Characteristic UUID.
+            service_uuid (str): Optional service UUID.
+        returns:
+            None
+        """
+        path, characteristic = self._characteristic(address, uuid, service_uuid)
+        with self.lock:
+            listener = self.notify_listeners.pop(path, None)
+        if listener:
+            self.object_cache.remove_listener(listener)
+        try:
+            characteristic.StopNotify()
+        except dbus.exceptions.DBusException as e:
+            print(f"[GattClient] StopNotify on {path} failed: {e.get_dbus_message()}")
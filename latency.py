@@ -0,0 +1,300 @@
+import array
+import bisect
+import csv
+import json
+import threading
+import time
+
+from Backend_lib.Linux.object_cache import DEVICE_IFACE
+
+MEDIA_TRANSPORT_IFACE = "org.bluez.MediaTransport1"
+
+CONNECTED = "connected"
+SERVICES_RESOLVED = "services_resolved"
+MEDIA_TRANSPORT = "media_transport"
+CONNECT_PROFILE = "connect_profile"
+
+# Upper bucket edges in milliseconds; the last bucket collects everything slower.
+BUCKET_EDGES_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LatencyHistogram:
+    """
+    Latency samples of one (adapter, device, phase) bucketed for quick comparison.
+
+    Raw samples are kept in an array('d') so percentiles stay exact.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty histogram.
+
+        args: None
+        returns: None
+        """
+        self.samples = array.array('d')
+        self.buckets = [0] * (len(BUCKET_EDGES_MS) + 1)
+
+    def add(self, latency_ms):
+        """
+        Records one sample.
+
+        Args:
+            latency_ms (float): Latency in milliseconds.
+        returns:
+            None
+        """
+        self.samples.append(latency_ms)
+        self.buckets[bisect.bisect_left(BUCKET_EDGES_MS, latency_ms)] += 1
+
+    def merge(self, other):
+        """
+        Adds the samples of another histogram to this one.
+
+        Args:
+            other (LatencyHistogram): Histogram to merge.
+        returns:
+            None
+        """
+        self.samples.extend(other.samples)
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, other.buckets)]
+
+    def percentile(self, percent):
+        """
+        Returns a percentile of the recorded samples.
+
+        Args:
+            percent (float): Percentile between 0 and 100.
+
+        Returns:
+            float | None: Latency in milliseconds, None without samples.
+        """
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))]
+
+    def summary(self):
+        """
+        Returns count, min, mean, p50, p90, p99, max and the bucket counts.
+
+        args: None
+        Returns:
+            dict: Statistics in milliseconds.
+        """
+        count = len(self.samples)
+        return {
+            "count": count,
+            "min": min(self.samples) if count else None,
+            "mean": sum(self.samples) / count if count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": max(self.samples) if count else None,
+            "buckets": {(f"<={edge}" if i < len(BUCKET_EDGES_MS) else f">{BUCKET_EDGES_MS[-1]}"): n
+                        for i, (edge, n) in enumerate(zip(BUCKET_EDGES_MS + (None,), self.buckets))},
+        }
+
+
+class ConnectionLatencyTracker:
+    """
+    Timestamps the connection lifecycle of every device from object cache events.
+
+    A connection attempt starts when mark_connect_start() is called right before
+    Device1.Connect() (or, for connections initiated elsewhere, when Connected turns
+    true). From that origin the tracker records the latency of Connected=True,
+    ServicesResolved=True and the appearance of the device's MediaTransport1;
+    ConnectProfile() callers report per-UUID completion with record_profile().
+    Samples are kept per adapter, device and phase.
+    """
+
+    def __init__(self, object_cache):
+        """
+        Initializes the tracker and subscribes to the cache.
+
+        Args:
+            object_cache (BluezObjectCache): Cache delivering device events.
+        returns:
+            None
+        """
+        self.object_cache = object_cache
+        self.lock = threading.Lock()
+        self.attempts = {}
+        self.histograms = {}
+        self.events = []
+        object_cache.add_listener(self._on_cache_event)
+
+    def close(self):
+        """
+        Stops listening to the object cache.
+
+        args: None
+        returns: None
+        """
+        self.object_cache.remove_listener(self._on_cache_event)
+
+    def mark_connect_start(self, device_path):
+        """
+        Marks the start of a connection attempt, call right before Connect() or ConnectProfile().
+
+        Args:
+            device_path (str): Device object path.
+        returns:
+            None
+        """
+        device_path = str(device_path)
+        if self.object_cache.get_property(device_path, DEVICE_IFACE, "Connected", False):
+            return  # nothing will transition, keep the attempt that brought the link up
+        with self.lock:
+            self.attempts[device_path] = {"start": time.monotonic(), "done": set()}
+
+    def record_profile(self, device_path, uuid, seconds):
+        """
+        Records how long ConnectProfile(uuid) took for a device.
+
+        Args:
+            device_path (str): Device object path.
+            uuid (str): Profile UUID.
+            seconds (float): Duration of the ConnectProfile() call.
+        returns:
+            None
+        """
+        self._record(str(device_path), f"{CONNECT_PROFILE}:{str(uuid).lower()}", seconds * 1000.0)
+
+    def _device_path_of(self, path):
+        # MediaTransport1 objects live below the device, e.g. .../dev_XX/sep1/fd0
+        return "/".join(path.split("/")[:5])
+
+    def _on_cache_event(self, event, path, data):
+        if event == "changed" and data[0] == DEVICE_IFACE:
+            changed = data[1]
+            if "Connected" in changed:
+                if changed["Connected"]:
+                    self._phase_reached(path, CONNECTED, start_if_missing=True)
+                else:
+                    with self.lock:
+                        self.attempts.pop(path, None)
+            if changed.get("ServicesResolved"):
+                self._phase_reached(path, SERVICES_RESOLVED)
+        elif event == "added" and MEDIA_TRANSPORT_IFACE in data:
+            self._phase_reached(self._device_path_of(path), MEDIA_TRANSPORT)
+
+    def _phase_reached(self, device_path, phase, start_if_missing=False):
+        now = time.monotonic()
+        with self.lock:
+            attempt = self.attempts.get(device_path)
+            if attempt is None:
+                if not start_if_missing:
+                    return
+                # Connection not initiated through us: later phases are measured from here
+                self.attempts[device_path] = {"start": now, "done": {phase}}
+                return
+            if phase in attempt["done"]:
+                return
+            attempt["done"].add(phase)
+            latency_ms = (now - attempt["start"]) * 1000.0
+        self._record(device_path, phase, latency_ms)
+
+    def _record(self, device_path, phase, latency_ms):
+        key = self.object_cache.get_device_key(device_path)
+        if key is None:
+            parts = device_path.split("/")
+            key = (parts[3] if len(parts) > 3 else None,
+                   parts[4][4:].replace("_", ":") if len(parts) > 4 else device_path)
+        adapter, address = key
+        with self.lock:
+            self.histograms.setdefault((adapter, address, phase), LatencyHistogram()).add(latency_ms)
+            self.events.append((time.time(), adapter, address, phase, latency_ms))
+
+    def get_histogram(self, phase, adapter=None, address=None):
+        """
+        Returns the merged histogram of a phase, optionally restricted to an adapter/device.
+
+        Args:
+            phase (str): 'connected', 'services_resolved', 'media_transport' or
+                'connect_profile:<uuid>'.
+            adapter (str): Interface name (e.g., 'hci0'), None for every adapter.
+            address (str): Bluetooth MAC address, None for every device.
+
+        Returns:
+            LatencyHistogram: Merged samples.
+        """
+        address = address.upper() if address else None
+        merged = LatencyHistogram()
+        with self.lock:
+            for (key_adapter, key_address, key_phase), histogram in self.histograms.items():
+                if key_phase == phase and adapter in (None, key_adapter) and address in (None, key_address):
+                    merged.merge(histogram)
+        return merged
+
+    def get_phases(self):
+        """
+        Returns every phase that has samples.
+
+        args: None
+        Returns:
+            list: Phase names, sorted.
+        """
+        with self.lock:
+            return sorted({key[2] for key in self.histograms})
+
+    def summary(self, adapter=None, address=None):
+        """
+        Returns statistics per adapter, device and phase.
+
+        Args:
+            adapter (str): Only include this interface name.
+            address (str): Only include this device.
+
+        Returns:
+            dict: {adapter: {address: {phase: statistics}}}.
+        """
+        address = address.upper() if address else None
+        report = {}
+        with self.lock:
+            items = list(self.histograms.items())
+        for (key_adapter, key_address, phase), histogram in items:
+            if adapter in (None, key_adapter) and address in (None, key_address):
+                report.setdefault(key_adapter, {}).setdefault(key_address, {})[phase] = histogram.summary()
+        return report
+
+    def reset(self):
+        """
+        Drops every recorded sample and pending attempt.
+
+        args: None
+        returns: None
+        """
+        with self.lock:
+            self.attempts.clear()
+            self.histograms.clear()
+            self.events = []
+
+    def export_json(self, file_path):
+        """
+        Writes the per-adapter/device/phase statistics to a JSON file.
+
+        Args:
+            file_path (str): Destination file.
+        returns:
+            None
+        """
+        with open(file_path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def export_csv(self, file_path):
+        """
+        Writes every raw sample to a CSV file.
+
+        Args:
+            file_path (str): Destination file.
+        returns:
+            None
+        """
+        with self.lock:
+            events = list(self.events)
+        with open(file_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["timestamp", "adapter", "address", "phase", "latency_ms"])
+            for timestamp, adapter, address, phase, latency_ms in events:
+                writer.writerow([f"{timestamp:.6f}", adapter, address, phase, f"{latency_ms:.3f}"])
@@ -0,0 +1,1194 @@
+import argparse
+import collections
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import dbus
+import dbus.bus
+import dbus.lowlevel
+import dbus.service
+import dbus.mainloop.glib
+from gi.repository import GLib
+
+BLUEZ_SERVICE = "org.bluez"
+OBEX_SERVICE = "org.bluez.obex"
+OBJECT_MANAGER_IFACE = "org.freedesktop.DBus.ObjectManager"
+PROPERTIES_IFACE = "org.freedesktop.DBus.Properties"
+INTROSPECTABLE_IFACE = "org.freedesktop.DBus.Introspectable"
+ADAPTER_IFACE = "org.bluez.Adapter1"
+DEVICE_IFACE = "org.bluez.Device1"
+AGENT_MANAGER_IFACE = "org.bluez.AgentManager1"
+MEDIA_CONTROL_IFACE = "org.bluez.MediaControl1"
+MEDIA_TRANSPORT_IFACE = "org.bluez.MediaTransport1"
+MEDIA_ENDPOINT_IFACE = "org.bluez.MediaEndpoint1"
+OBEX_CLIENT_IFACE = "org.bluez.obex.Client1"
+OBEX_SESSION_IFACE = "org.bluez.obex.Session1"
+OBEX_OBJECT_PUSH_IFACE = "org.bluez.obex.ObjectPush1"
+OBEX_TRANSFER_IFACE = "org.bluez.obex.Transfer1"
+
+# Control interface of the mock itself, exported on "/" of both services.
+CONTROL_IFACE = "org.bluez.mock.Control1"
+
+A2DP_SOURCE_UUID = "0000110a-0000-1000-8000-00805f9b34fb"
+A2DP_SINK_UUID = "0000110b-0000-1000-8000-00805f9b34fb"
+AVRCP_TARGET_UUID = "0000110c-0000-1000-8000-00805f9b34fb"
+AVRCP_CONTROLLER_UUID = "0000110e-0000-1000-8000-00805f9b34fb"
+OPP_UUID = "00001105-0000-1000-8000-00805f9b34fb"
+
+# Remote stream endpoints of a mock headset: (sep, codec, capabilities).
+REMOTE_ENDPOINTS = (
+    ("sep1", 0x00, (0xFF, 0xFF, 0x02, 0x35)),              # SBC, every mode, bitpool 2-53
+    ("sep2", 0x02, (0xC0, 0xFF, 0xFC, 0x83, 0xE8, 0x00)),  # AAC LC, VBR, 256 kbit/s
+)
+
+OBEX_CLIENT_PATH = "/org/bluez/obex"
+
+
+def device_address(index, prefix="00:11:22"):
+    """
+    Returns the deterministic MAC address of the index-th mock device.
+
+    Args:
+        index (int): Device number, below 2**24.
+        prefix (str): First three octets.
+
+    Returns:
+        str: Bluetooth MAC address.
+    """
+    return f"{prefix}:{(index >> 16) & 0xff:02X}:{(index >> 8) & 0xff:02X}:{index & 0xff:02X}"
+
+
+def call_key(interface, method):
+    """
+    Returns the key under which calls are counted, delayed and failed, e.g. 'Device1.Connect'.
+
+    Args:
+        interface (str): Full D-Bus interface name.
+        method (str): Method name.
+
+    Returns:
+        str: Short interface name and method joined by a dot.
+    """
+    return f"{interface.rsplit('.', 1)[-1]}.{method}"
+
+
+def bluez_error(name, message=""):
+    """
+    Builds a D-Bus error as BlueZ would return it.
+
+    Args:
+        name (str): Error name; a bare name like 'Failed' is expanded to org.bluez.Error.Failed.
+        message (str): Error message.
+
+    Returns:
+        dbus.exceptions.DBusException: Exception to raise or pass to an error callback.
+    """
+    if "." not in name:
+        name = f"org.bluez.Error.{name}"
+    return dbus.exceptions.DBusException(message or name.rsplit(".", 1)[-1], name=name)
+
+
+class CallScript:
+    """
+    Latencies, injected failures and call counters shared by the mock services.
+
+    Keys are 'Interface.Method' in short form (see call_key); '*' is the default
+    latency. A key may be narrowed to one object by appending '@<object path>'.
+    """
+
+    def __init__(self, default_latency=0.0, seed=0):
+        """
+        Initializes the script.
+
+        Args:
+            default_latency (float): Reply delay in seconds of calls without their own latency.
+            seed (int): Seed of the jitter and failure probability generator.
+        returns:
+            None
+        """
+        self.latencies = {"*": (default_latency, 0.0)}
+        self.failures = {}
+        self.call_counts = collections.Counter()
+        self.random = random.Random(seed)
+
+    def set_latency(self, key, seconds, jitter=0.0):
+        """
+        Sets the reply delay of a call.
+
+        Args:
+            key (str): Call key, '*' for the default.
+            seconds (float): Delay in seconds.
+            jitter (float): Random +/- seconds added to each delay.
+        returns:
+            None
+        """
+        self.latencies[key] = (seconds, jitter)
+
+    def inject_failure(self, key, error_name, message="", count=1, probability=1.0):
+        """
+        Makes a call fail with a D-Bus error.
+
+        Args:
+            key (str): Call key, optionally narrowed with '@<object path>'.
+            error_name (str): D-Bus error name, or a bare org.bluez.Error suffix.
+            message (str): Error message.
+            count (int): Number of failures to inject, -1 for every matching call.
+            probability (float): Chance of each matching call to fail.
+        returns:
+            None
+        """
+        self.failures[key] = [error_name, message, count, probability]
+
+    def clear_failures(self):
+        """
+        Removes every injected failure.
+
+        args: None
+        returns: None
+        """
+        self.failures.clear()
+
+    def latency(self, key, path):
+        seconds, jitter = self.latencies.get(f"{key}@{path}") or self.latencies.get(key) or self.latencies["*"]
+        if jitter:
+            seconds += self.random.uniform(-jitter, jitter)
+        return max(0.0, seconds)
+
+    def failure(self, key, path):
+        for name in (f"{key}@{path}", key):
+            entry = self.failures.get(name)
+            if entry is None:
+                continue
+            error_name, message, count, probability = entry
+            if probability < 1.0 and self.random.random() >= probability:
+                return None
+            if count > 0:
+                entry[2] -= 1
+                if entry[2] == 0:
+                    del self.failures[name]
+            return bluez_error(error_name, message)
+        return None
+
+    def dispatch(self, interface, method, path, reply, error, action):
+        """
+        Counts a call and answers it after its scripted latency.
+
+        The reply is deferred through the GLib main loop, so slow calls do not block
+        other callers, as with a real bluetoothd.
+
+        Args:
+            interface (str): Full D-Bus interface name.
+            method (str): Method name.
+            path (str): Object path the call was made on.
+            reply (callable): dbus-python reply callback.
+            error (callable): dbus-python error callback.
+            action (callable): Performs the call, returns the reply tuple or raises DBusException.
+        returns:
+            None
+        """
+        key = call_key(interface, method)
+        self.call_counts[key] += 1
+        injected = self.failure(key, path)
+
+        def answer():
+            if injected is not None:
+                error(injected)
+                return False
+            try:
+                result = action()
+            except dbus.exceptions.DBusException as e:
+                error(e)
+                return False
+            reply(*result)
+            return False
+
+        delay = self.latency(key, path)
+        if delay > 0:
+            GLib.timeout_add(int(delay * 1000), answer)
+        else:
+            answer()
+
+
+class MockObjectTree(dbus.service.FallbackObject):
+    """
+    Fallback object on '/' serving an in-memory tree of objects and their properties.
+
+    One FallbackObject answers for every path below it, so populations of tens of
+    thousands of devices cost a dictionary entry each instead of a registered
+    dbus.service.Object.
+    """
+
+    def __init__(self, conn, script):
+        """
+        Initializes the tree.
+
+        Args:
+            conn (dbus.bus.BusConnection): Connection the tree is exported on.
+            script (CallScript): Latencies, failures and counters.
+        returns:
+            None
+        """
+        dbus.service.FallbackObject.__init__(self, conn, "/")
+        self.script = script
+        self.objects = {}
+
+    def interface_props(self, path, interface):
+        """
+        Returns the property dictionary of one interface of an object.
+
+        Raises:
+            dbus.exceptions.DBusException: UnknownObject if the object does not implement it.
+        """
+        try:
+            return self.objects[path][interface]
+        except KeyError:
+            raise dbus.exceptions.DBusException(f"{path} has no {interface}",
+                                                name="org.freedesktop.DBus.Error.UnknownObject")
+
+    def add_interface(self, path, interface, props, emit=True):
+        """
+        Adds an interface to an object, creating the object if needed.
+
+        Args:
+            path (str): Object path.
+            interface (str): Interface name.
+            props (dict): D-Bus typed properties.
+            emit (bool): Send InterfacesAdded.
+        returns:
+            None
+        """
+        self.objects.setdefault(path, {})[interface] = props
+        if emit:
+            self.emit_signal("/", OBJECT_MANAGER_IFACE, "InterfacesAdded", "oa{sa{sv}}",
+                             dbus.ObjectPath(path), {interface: props})
+
+    def remove_interfaces(self, path, interfaces=None, emit=True):
+        """
+        Removes interfaces of an object, the whole object when interfaces is None.
+
+        Args:
+            path (str): Object path.
+            interfaces (list): Interface names, None for all of them.
+            emit (bool): Send InterfacesRemoved.
+        returns:
+            None
+        """
+        current = self.objects.get(path)
+        if not current:
+            return
+        removed = list(current) if interfaces is None else [name for name in interfaces if name in current]
+        for name in removed:
+            del current[name]
+        if not current:
+            del self.objects[path]
+        if emit and removed:
+            self.emit_signal("/", OBJECT_MANAGER_IFACE, "InterfacesRemoved", "oas",
+                             dbus.ObjectPath(path), dbus.Array(removed, signature="s"))
+
+    def remove_subtree(self, path):
+        """
+        Removes an object and every object below it.
+
+        Args:
+            path (str): Object path.
+        returns:
+            None
+        """
+        prefix = path + "/"
+        for child in sorted((p for p in self.objects if p.startswith(prefix)), reverse=True):
+            self.remove_interfaces(child)
+        self.remove_interfaces(path)
+
+    def set_props(self, path, interface, changed, emit=True):
+        """
+        Updates properties and sends one PropertiesChanged with the values that differ.
+
+        Args:
+            path (str): Object path.
+            interface (str): Interface name.
+            changed (dict): D-Bus typed new values.
+            emit (bool): Send PropertiesChanged.
+        returns:
+            None
+        """
+        props = self.interface_props(path, interface)
+        diff = {name: value for name, value in changed.items() if props.get(name) != value}
+        if not diff:
+            return
+        props.update(diff)
+        if emit:
+            self.emit_signal(path, PROPERTIES_IFACE, "PropertiesChanged", "sa{sv}as",
+                             interface, diff, dbus.Array([], signature="s"))
+
+    def emit_signal(self, path, interface, member, signature, *args):
+        """
+        Sends a signal from any path of the tree.
+
+        The signal decorator prefixes rel_path with the fallback's own path, which
+        yields '//org/...' for a fallback on '/', so messages are built directly.
+
+        Args:
+            path (str): Object path the signal is emitted from.
+            interface (str): Interface name.
+            member (str): Signal name.
+            signature (str): D-Bus signature of args.
+        returns:
+            None
+        """
+        message = dbus.lowlevel.SignalMessage(path, interface, member)
+        message.append(signature=signature, *args)
+        self.connection.send_message(message)
+
+    def managed_objects(self):
+        return {dbus.ObjectPath(path): interfaces for path, interfaces in self.objects.items()}
+
+    @dbus.service.method(INTROSPECTABLE_IFACE, in_signature="", out_signature="s",
+                         path_keyword="object_path", connection_keyword="connection")
+    def Introspect(self, object_path, connection):
+        self.script.call_counts[call_key(INTROSPECTABLE_IFACE, "Introspect")] += 1
+        return dbus.service.Object.Introspect(self, object_path, connection)
+
+    @dbus.service.method(OBJECT_MANAGER_IFACE, in_signature="", out_signature="a{oa{sa{sv}}}",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def GetManagedObjects(self, rel_path, reply, error):
+        self.script.dispatch(OBJECT_MANAGER_IFACE, "GetManagedObjects", rel_path, reply, error,
+                             lambda: (self.managed_objects(),))
+
+    @dbus.service.method(PROPERTIES_IFACE, in_signature="ss", out_signature="v",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Get(self, interface, name, rel_path, reply, error):
+        def action():
+            props = self.interface_props(rel_path, interface)
+            if name not in props:
+                raise dbus.exceptions.DBusException(f"No such property '{name}'",
+                                                    name="org.freedesktop.DBus.Error.InvalidArgs")
+            return (props[name],)
+        self.script.dispatch(PROPERTIES_IFACE, "Get", rel_path, reply, error, action)
+
+    @dbus.service.method(PROPERTIES_IFACE, in_signature="s", out_signature="a{sv}",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def GetAll(self, interface, rel_path, reply, error):
+        self.script.dispatch(PROPERTIES_IFACE, "GetAll", rel_path, reply, error,
+                             lambda: (dbus.Dictionary(self.interface_props(rel_path, interface), signature="sv"),))
+
+    @dbus.service.method(PROPERTIES_IFACE, in_signature="ssv", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Set(self, interface, name, value, rel_path, reply, error):
+        def action():
+            props = self.interface_props(rel_path, interface)
+            if name not in props:
+                raise dbus.exceptions.DBusException(f"No such property '{name}'",
+                                                    name="org.freedesktop.DBus.Error.InvalidArgs")
+            self.set_props(rel_path, interface, {name: value})
+            return ()
+        self.script.dispatch(PROPERTIES_IFACE, "Set", rel_path, reply, error, action)
+
+    @dbus.service.method(CONTROL_IFACE, in_signature="", out_signature="a{su}")
+    def GetCallCounts(self):
+        return dbus.Dictionary({key: dbus.UInt32(count) for key, count in self.script.call_counts.items()},
+                               signature="su")
+
+    @dbus.service.method(CONTROL_IFACE, in_signature="", out_signature="")
+    def ResetCallCounts(self):
+        self.script.call_counts.clear()
+
+    @dbus.service.method(CONTROL_IFACE, in_signature="sdd", out_signature="")
+    def SetLatency(self, key, seconds, jitter):
+        self.script.set_latency(str(key), float(seconds), float(jitter))
+
+    @dbus.service.method(CONTROL_IFACE, in_signature="sssid", out_signature="")
+    def InjectFailure(self, key, error_name, message, count, probability):
+        self.script.inject_failure(str(key), str(error_name), str(message), int(count), float(probability))
+
+    @dbus.service.method(CONTROL_IFACE, in_signature="", out_signature="")
+    def ClearFailures(self):
+        self.script.clear_failures()
+
+
+class MockBluez(MockObjectTree):
+    """
+    Stand-in for bluetoothd: Adapter1, Device1, AgentManager1, MediaControl1, MediaEndpoint1
+    and MediaTransport1.
+
+    Devices follow BlueZ's state rules and error names (AlreadyExists on a second Pair,
+    NotConnected on Disconnect, DoesNotExist on RemoveDevice...). A connected device
+    advertising the A2DP sink UUID gets a MediaControl1 interface, SBC and AAC remote
+    endpoints and a MediaTransport1 object, as with a real headset.
+    """
+
+    def __init__(self, conn, script, adapters=1):
+        """
+        Initializes the service and exports the adapters.
+
+        Args:
+            conn (dbus.bus.BusConnection): Connection owning org.bluez.
+            script (CallScript): Latencies, failures and counters.
+            adapters (int): Number of adapters, named hci0, hci1...
+        returns:
+            None
+        """
+        MockObjectTree.__init__(self, conn, script)
+        self.device_count = 0
+        self.hidden = {}
+        self.agents = {}
+        self.default_agent = None
+        self.transport_sockets = {}
+        self.add_interface("/org/bluez", AGENT_MANAGER_IFACE, dbus.Dictionary({}, signature="sv"), emit=False)
+        for index in range(adapters):
+            self.add_interface(f"/org/bluez/hci{index}", ADAPTER_IFACE, dbus.Dictionary({
+                "Address": dbus.String(f"00:AA:BB:CC:DD:{index:02X}"),
+                "AddressType": dbus.String("public"),
+                "Name": dbus.String(f"mock-hci{index}"),
+                "Alias": dbus.String(f"mock-hci{index}"),
+                "Class": dbus.UInt32(0x6c010c),
+                "Powered": dbus.Boolean(True),
+                "Discoverable": dbus.Boolean(False),
+                "DiscoverableTimeout": dbus.UInt32(180),
+                "Pairable": dbus.Boolean(True),
+                "PairableTimeout": dbus.UInt32(0),
+                "Discovering": dbus.Boolean(False),
+                "UUIDs": dbus.Array([A2DP_SOURCE_UUID, A2DP_SINK_UUID, AVRCP_TARGET_UUID,
+                                     AVRCP_CONTROLLER_UUID], signature="s"),
+            }, signature="sv"), emit=False)
+
+    def device_props(self, adapter_path, address, name, paired=False, connected=False, trusted=False,
+                     uuids=(), rssi=None):
+        props = {
+            "Address": dbus.String(address),
+            "AddressType": dbus.String("public"),
+            "Name": dbus.String(name),
+            "Alias": dbus.String(name),
+            "Class": dbus.UInt32(0x240404),
+            "Icon": dbus.String("audio-headset"),
+            "Paired": dbus.Boolean(paired),
+            "Bonded": dbus.Boolean(paired),
+            "Trusted": dbus.Boolean(trusted),
+            "Blocked": dbus.Boolean(False),
+            "LegacyPairing": dbus.Boolean(False),
+            "Connected": dbus.Boolean(connected),
+            "ServicesResolved": dbus.Boolean(connected),
+            "UUIDs": dbus.Array(list(uuids), signature="s"),
+            "Adapter": dbus.ObjectPath(adapter_path),
+        }
+        if rssi is not None:
+            props["RSSI"] = dbus.Int16(rssi)
+        return dbus.Dictionary(props, signature="sv")
+
+    def populate(self, count, adapter="hci0", paired=0.0, connected=0.0, sinks=0.5, sources=0.25,
+                 hidden=0, seed=0, emit=True):
+        """
+        Adds a population of devices.
+
+        Args:
+            count (int): Number of devices known to the adapter.
+            adapter (str): Adapter interface name.
+            paired (float): Fraction of devices that are paired (and trusted).
+            connected (float): Fraction of paired devices that are connected.
+            sinks (float): Fraction of devices advertising A2DP sink + AVRCP controller.
+            sources (float): Fraction of devices advertising A2DP source + AVRCP target.
+            hidden (int): Extra devices that only appear once discovery is started.
+            seed (int): Seed of the population generator.
+            emit (bool): Send InterfacesAdded for each device.
+
+        Returns:
+            int: Number of devices added.
+        """
+        rng = random.Random(seed)
+        adapter_path = f"/org/bluez/{adapter}"
+        self.interface_props(adapter_path, ADAPTER_IFACE)
+        for index in range(count + hidden):
+            number = self.device_count
+            self.device_count += 1
+            address = device_address(number)
+            uuids = []
+            if rng.random() < sinks:
+                uuids += [A2DP_SINK_UUID, AVRCP_CONTROLLER_UUID]
+            if rng.random() < sources:
+                uuids += [A2DP_SOURCE_UUID, AVRCP_TARGET_UUID]
+            uuids.append(OPP_UUID)
+            is_paired = rng.random() < paired
+            is_connected = is_paired and rng.random() < connected
+            path = f"{adapter_path}/dev_{address.replace(':', '_')}"
+            props = self.device_props(adapter_path, address, f"MockDevice-{number:05d}", is_paired,
+                                      is_connected, is_paired, uuids,
+                                      None if is_paired else rng.randint(-95, -30))
+            if index >= count:
+                self.hidden.setdefault(adapter_path, []).append((path, props))
+                continue
+            self.add_interface(path, DEVICE_IFACE, props, emit=emit)
+            if is_connected:
+                self.add_media_objects(path, emit=emit)
+        return count
+
+    def add_media_objects(self, device_path, emit=True):
+        uuids = [str(uuid).lower() for uuid in self.objects[device_path][DEVICE_IFACE]["UUIDs"]]
+        if A2DP_SINK_UUID not in uuids and A2DP_SOURCE_UUID not in uuids:
+            return
+        self.add_interface(device_path, MEDIA_CONTROL_IFACE, dbus.Dictionary({
+            "Connected": dbus.Boolean(True),
+        }, signature="sv"), emit=emit)
+        uuid = A2DP_SINK_UUID if A2DP_SINK_UUID in uuids else A2DP_SOURCE_UUID
+        for sep, codec, capabilities in REMOTE_ENDPOINTS:
+            self.add_interface(f"{device_path}/{sep}", MEDIA_ENDPOINT_IFACE, dbus.Dictionary({
+                "UUID": dbus.String(uuid),
+                "Codec": dbus.Byte(codec),
+                "Capabilities": dbus.Array([dbus.Byte(b) for b in capabilities], signature="y"),
+                "Device": dbus.ObjectPath(device_path),
+                "DelayReporting": dbus.Boolean(True),
+            }, signature="sv"), emit=emit)
+        self.add_interface(f"{device_path}/sep1/fd0", MEDIA_TRANSPORT_IFACE, dbus.Dictionary({
+            "Device": dbus.ObjectPath(device_path),
+            "UUID": dbus.String(uuid),
+            "Codec": dbus.Byte(0),
+            "Configuration": dbus.Array([dbus.Byte(b) for b in (0x21, 0x15, 0x02, 0x35)], signature="y"),
+            "Endpoint": dbus.ObjectPath("/MediaEndpoint/A2DPSource/sbc"),
+            "State": dbus.String("idle"),
+            "Delay": dbus.UInt16(1500),
+            "Volume": dbus.UInt16(127),
+        }, signature="sv"), emit=emit)
+
+    def remove_media_objects(self, device_path):
+        transport_path = f"{device_path}/sep1/fd0"
+        self.release_transport(transport_path)
+        self.remove_interfaces(transport_path)
+        for sep, codec, capabilities in REMOTE_ENDPOINTS:
+            self.remove_interfaces(f"{device_path}/{sep}")
+        self.remove_interfaces(device_path, [MEDIA_CONTROL_IFACE])
+
+    def release_transport(self, transport_path):
+        sockets = self.transport_sockets.pop(transport_path, None)
+        for sock in sockets or ():
+            sock.close()
+
+    def reveal_hidden(self, adapter_path, batch=50):
+        pending = self.hidden.get(adapter_path)
+        if not pending or not self.objects[adapter_path][ADAPTER_IFACE]["Discovering"]:
+            return False
+        for path, props in pending[:batch]:
+            self.add_interface(path, DEVICE_IFACE, props)
+        del pending[:batch]
+        return bool(pending)
+
+    # ---- org.bluez.Adapter1 ----
+
+    @dbus.service.method(ADAPTER_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def StartDiscovery(self, rel_path, reply, error):
+        def action():
+            props = self.interface_props(rel_path, ADAPTER_IFACE)
+            if props["Discovering"]:
+                raise bluez_error("InProgress", "Operation already in progress")
+            self.set_props(rel_path, ADAPTER_IFACE, {"Discovering": dbus.Boolean(True)})
+            if self.hidden.get(rel_path):
+                GLib.timeout_add(100, self.reveal_hidden, rel_path)
+            return ()
+        self.script.dispatch(ADAPTER_IFACE, "StartDiscovery", rel_path, reply, error, action)
+
+    @dbus.service.method(ADAPTER_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def StopDiscovery(self, rel_path, reply, error):
+        def action():
+            props = self.interface_props(rel_path, ADAPTER_IFACE)
+            if not props["Discovering"]:
+                raise bluez_error("Failed", "No discovery started")
+            self.set_props(rel_path, ADAPTER_IFACE, {"Discovering": dbus.Boolean(False)})
+            return ()
+        self.script.dispatch(ADAPTER_IFACE, "StopDiscovery", rel_path, reply, error, action)
+
+    @dbus.service.method(ADAPTER_IFACE, in_signature="a{sv}", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def SetDiscoveryFilter(self, properties, rel_path, reply, error):
+        def action():
+            self.interface_props(rel_path, ADAPTER_IFACE)
+            if "RSSI" in properties and "Pathloss" in properties:
+                raise bluez_error("InvalidArguments", "Invalid arguments in method call")
+            return ()
+        self.script.dispatch(ADAPTER_IFACE, "SetDiscoveryFilter", rel_path, reply, error, action)
+
+    @dbus.service.method(ADAPTER_IFACE, in_signature="", out_signature="as",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def GetDiscoveryFilters(self, rel_path, reply, error):
+        self.script.dispatch(ADAPTER_IFACE, "GetDiscoveryFilters", rel_path, reply, error,
+                             lambda: (dbus.Array(["UUIDs", "RSSI", "Pathloss", "Transport",
+                                                  "DuplicateData", "Discoverable", "Pattern"], signature="s"),))
+
+    @dbus.service.method(ADAPTER_IFACE, in_signature="o", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def RemoveDevice(self, device, rel_path, reply, error):
+        def action():
+            self.interface_props(rel_path, ADAPTER_IFACE)
+            device_path = str(device)
+            if DEVICE_IFACE not in self.objects.get(device_path, {}) or not device_path.startswith(rel_path + "/"):
+                raise bluez_error("DoesNotExist", "Does Not Exist")
+            self.release_transport(f"{device_path}/sep1/fd0")
+            self.remove_subtree(device_path)
+            return ()
+        self.script.dispatch(ADAPTER_IFACE, "RemoveDevice", rel_path, reply, error, action)
+
+    # ---- org.bluez.Device1 ----
+
+    def device(self, path):
+        return self.interface_props(path, DEVICE_IFACE)
+
+    @dbus.service.method(DEVICE_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Connect(self, rel_path, reply, error):
+        def action():
+            if self.device(rel_path)["Connected"]:
+                raise bluez_error("AlreadyConnected", "Already Connected")
+            self.set_props(rel_path, DEVICE_IFACE, {"Connected": dbus.Boolean(True)})
+            self.set_props(rel_path, DEVICE_IFACE, {"ServicesResolved": dbus.Boolean(True)})
+            self.add_media_objects(rel_path)
+            return ()
+        self.script.dispatch(DEVICE_IFACE, "Connect", rel_path, reply, error, action)
+
+    @dbus.service.method(DEVICE_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Disconnect(self, rel_path, reply, error):
+        def action():
+            if not self.device(rel_path)["Connected"]:
+                raise bluez_error("NotConnected", "Not Connected")
+            self.remove_media_objects(rel_path)
+            self.set_props(rel_path, DEVICE_IFACE, {"ServicesResolved": dbus.Boolean(False)})
+            self.set_props(rel_path, DEVICE_IFACE, {"Connected": dbus.Boolean(False)})
+            return ()
+        self.script.dispatch(DEVICE_IFACE, "Disconnect", rel_path, reply, error, action)
+
+    @dbus.service.method(DEVICE_IFACE, in_signature="s", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def ConnectProfile(self, uuid, rel_path, reply, error):
+        def action():
+            props = self.device(rel_path)
+            if str(uuid).lower() not in [str(item).lower() for item in props["UUIDs"]]:
+                raise bluez_error("NotAvailable", "Operation currently not available")
+            if not props["Connected"]:
+                self.set_props(rel_path, DEVICE_IFACE, {"Connected": dbus.Boolean(True)})
+                self.set_props(rel_path, DEVICE_IFACE, {"ServicesResolved": dbus.Boolean(True)})
+            if MEDIA_CONTROL_IFACE not in self.objects[rel_path]:
+                self.add_media_objects(rel_path)
+            return ()
+        self.script.dispatch(DEVICE_IFACE, "ConnectProfile", rel_path, reply, error, action)
+
+    @dbus.service.method(DEVICE_IFACE, in_signature="s", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def DisconnectProfile(self, uuid, rel_path, reply, error):
+        def action():
+            if not self.device(rel_path)["Connected"]:
+                raise bluez_error("NotConnected", "Not Connected")
+            self.remove_media_objects(rel_path)
+            return ()
+        self.script.dispatch(DEVICE_IFACE, "DisconnectProfile", rel_path, reply, error, action)
+
+    @dbus.service.method(DEVICE_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Pair(self, rel_path, reply, error):
+        def action():
+            if self.device(rel_path)["Paired"]:
+                raise bluez_error("AlreadyExists", "Already Exists")
+            self.set_props(rel_path, DEVICE_IFACE, {"Paired": dbus.Boolean(True), "Bonded": dbus.Boolean(True)})
+            self.set_props(rel_path, DEVICE_IFACE, {"Connected": dbus.Boolean(True)})
+            return ()
+        self.script.dispatch(DEVICE_IFACE, "Pair", rel_path, reply, error, action)
+
+    @dbus.service.method(DEVICE_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def CancelPairing(self, rel_path, reply, error):
+        def action():
+            self.device(rel_path)
+            raise bluez_error("DoesNotExist", "Does Not Exist")
+        self.script.dispatch(DEVICE_IFACE, "CancelPairing", rel_path, reply, error, action)
+
+    # ---- org.bluez.AgentManager1 ----
+
+    @dbus.service.method(AGENT_MANAGER_IFACE, in_signature="os", out_signature="",
+                         rel_path_keyword="rel_path", sender_keyword="sender", async_callbacks=("reply", "error"))
+    def RegisterAgent(self, agent, capability, rel_path, sender, reply, error):
+        def action():
+            self.interface_props(rel_path, AGENT_MANAGER_IFACE)
+            if sender in self.agents:
+                raise bluez_error("AlreadyExists", "Already Exists")
+            self.agents[sender] = (str(agent), str(capability))
+            return ()
+        self.script.dispatch(AGENT_MANAGER_IFACE, "RegisterAgent", rel_path, reply, error, action)
+
+    @dbus.service.method(AGENT_MANAGER_IFACE, in_signature="o", out_signature="",
+                         rel_path_keyword="rel_path", sender_keyword="sender", async_callbacks=("reply", "error"))
+    def UnregisterAgent(self, agent, rel_path, sender, reply, error):
+        def action():
+            self.interface_props(rel_path, AGENT_MANAGER_IFACE)
+            if self.agents.get(sender, (None,))[0] != str(agent):
+                raise bluez_error("DoesNotExist", "Does Not Exist")
+            del self.agents[sender]
+            if self.default_agent == sender:
+                self.default_agent = None
+            return ()
+        self.script.dispatch(AGENT_MANAGER_IFACE, "UnregisterAgent", rel_path, reply, error, action)
+
+    @dbus.service.method(AGENT_MANAGER_IFACE, in_signature="o", out_signature="",
+                         rel_path_keyword="rel_path", sender_keyword="sender", async_callbacks=("reply", "error"))
+    def RequestDefaultAgent(self, agent, rel_path, sender, reply, error):
+        def action():
+            self.interface_props(rel_path, AGENT_MANAGER_IFACE)
+            if self.agents.get(sender, (None,))[0] != str(agent):
+                raise bluez_error("DoesNotExist", "Does Not Exist")
+            self.default_agent = sender
+            return ()
+        self.script.dispatch(AGENT_MANAGER_IFACE, "RequestDefaultAgent", rel_path, reply, error, action)
+
+    # ---- org.bluez.MediaControl1 ----
+
+    def media_command(self, method, rel_path, reply, error):
+        def action():
+            self.interface_props(rel_path, MEDIA_CONTROL_IFACE)
+            return ()
+        self.script.dispatch(MEDIA_CONTROL_IFACE, method, rel_path, reply, error, action)
+
+    @dbus.service.method(MEDIA_CONTROL_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Play(self, rel_path, reply, error):
+        self.media_command("Play", rel_path, reply, error)
+
+    @dbus.service.method(MEDIA_CONTROL_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Pause(self, rel_path, reply, error):
+        self.media_command("Pause", rel_path, reply, error)
+
+    @dbus.service.method(MEDIA_CONTROL_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Stop(self, rel_path, reply, error):
+        self.media_command("Stop", rel_path, reply, error)
+
+    @dbus.service.method(MEDIA_CONTROL_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Next(self, rel_path, reply, error):
+        self.media_command("Next", rel_path, reply, error)
+
+    @dbus.service.method(MEDIA_CONTROL_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Previous(self, rel_path, reply, error):
+        self.media_command("Previous", rel_path, reply, error)
+
+    @dbus.service.method(MEDIA_CONTROL_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def FastForward(self, rel_path, reply, error):
+        self.media_command("FastForward", rel_path, reply, error)
+
+    @dbus.service.method(MEDIA_CONTROL_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Rewind(self, rel_path, reply, error):
+        self.media_command("Rewind", rel_path, reply, error)
+
+    # ---- org.bluez.MediaEndpoint1 ----
+
+    @dbus.service.method(MEDIA_ENDPOINT_IFACE, in_signature="oa{sv}", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def SetConfiguration(self, endpoint, properties, rel_path, reply, error):
+        def action():
+            props = self.interface_props(rel_path, MEDIA_ENDPOINT_IFACE)
+            capabilities = bytes(bytearray(props["Capabilities"]))
+            configuration = bytes(bytearray(properties.get("Capabilities", [])))
+            if len(configuration) != len(capabilities):
+                raise bluez_error("InvalidArguments", "Invalid arguments in method call")
+            if props["Codec"] == 0x00 and (any(c & ~cap for c, cap in zip(configuration[:2], capabilities[:2]))
+                                           or configuration[2] < capabilities[2]
+                                           or configuration[3] > capabilities[3]):
+                raise bluez_error("InvalidArguments", "Invalid arguments in method call")
+            # Reconfiguring suspends the stream; the transport keeps its path in the mock
+            device_path = str(props["Device"])
+            transport_path = f"{device_path}/sep1/fd0"
+            self.release_transport(transport_path)
+            self.set_props(transport_path, MEDIA_TRANSPORT_IFACE, {
+                "Codec": props["Codec"],
+                "Configuration": dbus.Array([dbus.Byte(b) for b in configuration], signature="y"),
+                "Endpoint": dbus.ObjectPath(endpoint),
+                "State": dbus.String("idle"),
+            })
+            return ()
+        self.script.dispatch(MEDIA_ENDPOINT_IFACE, "SetConfiguration", rel_path, reply, error, action)
+
+    # ---- org.bluez.MediaTransport1 ----
+
+    def acquire(self, method, rel_path, reply, error):
+        def action():
+            props = self.interface_props(rel_path, MEDIA_TRANSPORT_IFACE)
+            if rel_path in self.transport_sockets:
+                raise bluez_error("NotAuthorized", "Operation Not Authorized")
+            if method == "TryAcquire" and props["State"] == "idle":
+                raise bluez_error("NotAvailable", "Operation currently not available")
+            local, remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            self.transport_sockets[rel_path] = (local, remote)
+            self.set_props(rel_path, MEDIA_TRANSPORT_IFACE, {"State": dbus.String("active")})
+            return dbus.types.UnixFd(remote.fileno()), dbus.UInt16(672), dbus.UInt16(672)
+        self.script.dispatch(MEDIA_TRANSPORT_IFACE, method, rel_path, reply, error, action)
+
+    @dbus.service.method(MEDIA_TRANSPORT_IFACE, in_signature="", out_signature="hqq",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Acquire(self, rel_path, reply, error):
+        self.acquire("Acquire", rel_path, reply, error)
+
+    @dbus.service.method(MEDIA_TRANSPORT_IFACE, in_signature="", out_signature="hqq",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def TryAcquire(self, rel_path, reply, error):
+        self.acquire("TryAcquire", rel_path, reply, error)
+
+    @dbus.service.method(MEDIA_TRANSPORT_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Release(self, rel_path, reply, error):
+        def action():
+            self.interface_props(rel_path, MEDIA_TRANSPORT_IFACE)
+            self.release_transport(rel_path)
+            self.set_props(rel_path, MEDIA_TRANSPORT_IFACE, {"State": dbus.String("idle")})
+            return ()
+        self.script.dispatch(MEDIA_TRANSPORT_IFACE, "Release", rel_path, reply, error, action)
+
+    # ---- org.bluez.mock.Control1 ----
+
+    @dbus.service.method(CONTROL_IFACE, in_signature="sua{sv}", out_signature="u")
+    def AddDevices(self, adapter, count, options):
+        return dbus.UInt32(self.populate(int(count), str(adapter),
+                                         paired=float(options.get("paired", 0.0)),
+                                         connected=float(options.get("connected", 0.0)),
+                                         sinks=float(options.get("sinks", 0.5)),
+                                         sources=float(options.get("sources", 0.25)),
+                                         hidden=int(options.get("hidden", 0)),
+                                         seed=int(options.get("seed", self.device_count))))
+
+    @dbus.service.method(CONTROL_IFACE, in_signature="s", out_signature="u")
+    def RemoveAllDevices(self, adapter):
+        adapter_path = f"/org/bluez/{adapter}"
+        self.hidden.pop(adapter_path, None)
+        devices = [path for path, interfaces in self.objects.items()
+                   if DEVICE_IFACE in interfaces and path.startswith(adapter_path + "/")]
+        for path in devices:
+            self.release_transport(f"{path}/sep1/fd0")
+            self.remove_subtree(path)
+        return dbus.UInt32(len(devices))
+
+    @dbus.service.method(CONTROL_IFACE, in_signature="ossv", out_signature="")
+    def SetProperty(self, path, interface, name, value):
+        self.set_props(str(path), str(interface), {str(name): value})
+
+
+class MockObex(MockObjectTree):
+    """
+    Stand-in for obexd's client side: Client1, Session1, ObjectPush1 and Transfer1.
+
+    A transfer goes queued -> active -> complete, its duration being the file size
+    divided by the scripted throughput. Injecting a failure on 'Transfer1.Status'
+    ends the next transfers in the 'error' state instead.
+    """
+
+    def __init__(self, conn, script, throughput=200000):
+        """
+        Initializes the service.
+
+        Args:
+            conn (dbus.bus.BusConnection): Connection owning org.bluez.obex.
+            script (CallScript): Latencies, failures and counters.
+            throughput (int): Simulated transfer speed in bytes per second.
+        returns:
+            None
+        """
+        MockObjectTree.__init__(self, conn, script)
+        self.throughput = throughput
+        self.session_count = 0
+        self.transfer_count = 0
+        self.add_interface(OBEX_CLIENT_PATH, OBEX_CLIENT_IFACE, dbus.Dictionary({}, signature="sv"), emit=False)
+
+    @dbus.service.method(OBEX_CLIENT_IFACE, in_signature="sa{sv}", out_signature="o",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def CreateSession(self, destination, args, rel_path, reply, error):
+        def action():
+            self.interface_props(rel_path, OBEX_CLIENT_IFACE)
+            target = str(args.get("Target", "")).lower()
+            if target != "opp":
+                raise bluez_error("org.bluez.obex.Error.InvalidArguments", "Invalid target")
+            path = f"{OBEX_CLIENT_PATH}/client/session{self.session_count}"
+            self.session_count += 1
+            self.add_interface(path, OBEX_SESSION_IFACE, dbus.Dictionary({
+                "Source": dbus.String("00:AA:BB:CC:DD:00"),
+                "Destination": dbus.String(str(destination)),
+                "Channel": dbus.Byte(12),
+                "Target": dbus.String(OPP_UUID),
+            }, signature="sv"))
+            self.add_interface(path, OBEX_OBJECT_PUSH_IFACE, dbus.Dictionary({}, signature="sv"))
+            return (dbus.ObjectPath(path),)
+        self.script.dispatch(OBEX_CLIENT_IFACE, "CreateSession", rel_path, reply, error, action)
+
+    @dbus.service.method(OBEX_CLIENT_IFACE, in_signature="o", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def RemoveSession(self, session, rel_path, reply, error):
+        def action():
+            self.interface_props(rel_path, OBEX_CLIENT_IFACE)
+            if OBEX_SESSION_IFACE not in self.objects.get(str(session), {}):
+                raise bluez_error("org.bluez.obex.Error.NotAuthorized", "Not Authorized")
+            self.remove_subtree(str(session))
+            return ()
+        self.script.dispatch(OBEX_CLIENT_IFACE, "RemoveSession", rel_path, reply, error, action)
+
+    @dbus.service.method(OBEX_OBJECT_PUSH_IFACE, in_signature="s", out_signature="oa{sv}",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def SendFile(self, sourcefile, rel_path, reply, error):
+        def action():
+            self.interface_props(rel_path, OBEX_OBJECT_PUSH_IFACE)
+            try:
+                size = os.path.getsize(str(sourcefile))
+            except OSError:
+                raise bluez_error("org.bluez.obex.Error.Failed", "Unable to open file")
+            path = f"{rel_path}/transfer{self.transfer_count}"
+            self.transfer_count += 1
+            props = dbus.Dictionary({
+                "Status": dbus.String("queued"),
+                "Session": dbus.ObjectPath(rel_path),
+                "Name": dbus.String(os.path.basename(str(sourcefile))),
+                "Type": dbus.String(""),
+                "Size": dbus.UInt64(size),
+                "Transferred": dbus.UInt64(0),
+                "Filename": dbus.String(str(sourcefile)),
+            }, signature="sv")
+            self.add_interface(path, OBEX_TRANSFER_IFACE, props)
+            failed = self.script.failure(call_key(OBEX_TRANSFER_IFACE, "Status"), path) is not None
+            GLib.timeout_add(50, self.progress_transfer, path, size, failed)
+            return dbus.ObjectPath(path), dbus.Dictionary(props, signature="sv")
+        self.script.dispatch(OBEX_OBJECT_PUSH_IFACE, "SendFile", rel_path, reply, error, action)
+
+    def progress_transfer(self, path, size, failed):
+        if OBEX_TRANSFER_IFACE not in self.objects.get(path, {}):
+            return False
+        self.set_props(path, OBEX_TRANSFER_IFACE, {"Status": dbus.String("active")})
+        duration = size / self.throughput if self.throughput else 0.0
+        GLib.timeout_add(max(1, int(duration * 1000)), self.finish_transfer, path, size, failed)
+        return False
+
+    def finish_transfer(self, path, size, failed):
+        if OBEX_TRANSFER_IFACE not in self.objects.get(path, {}):
+            return False
+        if failed:
+            self.set_props(path, OBEX_TRANSFER_IFACE, {"Status": dbus.String("error")})
+        else:
+            self.set_props(path, OBEX_TRANSFER_IFACE, {"Transferred": dbus.UInt64(size),
+                                                       "Status": dbus.String("complete")})
+        return False
+
+    @dbus.service.method(OBEX_TRANSFER_IFACE, in_signature="", out_signature="",
+                         rel_path_keyword="rel_path", async_callbacks=("reply", "error"))
+    def Cancel(self, rel_path, reply, error):
+        def action():
+            props = self.interface_props(rel_path, OBEX_TRANSFER_IFACE)
+            if props["Status"] in ("complete", "error"):
+                raise bluez_error("org.bluez.obex.Error.NotAuthorized", "Not Authorized")
+            self.set_props(rel_path, OBEX_TRANSFER_IFACE, {"Status": dbus.String("error")})
+            return ()
+        self.script.dispatch(OBEX_TRANSFER_IFACE, "Cancel", rel_path, reply, error, action)
+
+
+class PrivateBus:
+    """
+    Private dbus-daemon used as both system and session bus by the mock and its clients.
+    """
+
+    def __init__(self):
+        """
+        Initializes the bus wrapper.
+
+        args: None
+        returns: None
+        """
+        self.process = None
+        self.address = None
+
+    def start(self):
+        """
+        Starts the daemon and reads its address.
+
+        args: None
+        Returns:
+            str: D-Bus address of the private bus.
+        """
+        self.process = subprocess.Popen(["dbus-daemon", "--session", "--nofork", "--nopidfile",
+                                         "--print-address=1"],
+                                        stdout=subprocess.PIPE, text=True)
+        self.address = self.process.stdout.readline().strip()
+        if not self.address:
+            self.stop()
+            raise RuntimeError("dbus-daemon did not report an address")
+        return self.address
+
+    def stop(self):
+        """
+        Terminates the daemon.
+
+        args: None
+        returns: None
+        """
+        if self.process:
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+
+
+class MockBluezProcess:
+    """
+    Runs the mock services in a child process on a private bus.
+
+    start() points DBUS_SYSTEM_BUS_ADDRESS and DBUS_SESSION_BUS_ADDRESS of this
+    process at the private bus, so it must be called before the first
+    dbus.SystemBus()/BluezSession is created. BluezServices, A2DPManager and
+    OPPManager then talk to the mock without any change.
+    """
+
+    def __init__(self, devices=0, adapters=1, paired=0.1, connected=0.5, hidden=0, latency=0.0,
+                 throughput=200000, seed=0):
+        """
+        Initializes the runner.
+
+        Args:
+            devices (int): Devices known to hci0 at start.
+            adapters (int): Number of adapters.
+            paired (float): Fraction of devices that are paired.
+            connected (float): Fraction of paired devices that are connected.
+            hidden (int): Devices that only appear once discovery is started.
+            latency (float): Default reply delay in seconds.
+            throughput (int): OBEX transfer speed in bytes per second.
+            seed (int): Seed of the population and failure generators.
+        returns:
+            None
+        """
+        self.args = ["--devices", str(devices), "--adapters", str(adapters), "--paired", str(paired),
+                     "--connected", str(connected), "--hidden", str(hidden), "--latency", str(latency),
+                     "--throughput", str(throughput), "--seed", str(seed)]
+        self.bus = PrivateBus()
+        self.process = None
+        self.connection = None
+
+    def start(self, timeout=30.0):
+        """
+        Starts the private bus and the mock, and waits until both services are owned.
+
+        Args:
+            timeout (float): Seconds to wait for the services.
+        returns:
+            None
+        """
+        address = self.bus.start()
+        os.environ["DBUS_SYSTEM_BUS_ADDRESS"] = address
+        os.environ["DBUS_SESSION_BUS_ADDRESS"] = address
+        self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--address", address]
+                                        + self.args)
+        self.connection = dbus.bus.BusConnection(address)
+        end = time.monotonic() + timeout
+        while not (self.connection.name_has_owner(BLUEZ_SERVICE) and self.connection.name_has_owner(OBEX_SERVICE)):
+            if self.process.poll() is not None:
+                self.stop()
+                raise RuntimeError("mock BlueZ service exited during start-up")
+            if time.monotonic() > end:
+                self.stop()
+                raise RuntimeError("mock BlueZ service did not start in time")
+            time.sleep(0.05)
+
+    def control(self, service=BLUEZ_SERVICE):
+        """
+        Returns the control interface of one of the mock services.
+
+        Args:
+            service (str): org.bluez or org.bluez.obex.
+
+        Returns:
+            dbus.Interface: org.bluez.mock.Control1 proxy.
+        """
+        return dbus.Interface(self.connection.get_object(service, "/", introspect=False), CONTROL_IFACE)
+
+    def get_call_counts(self):
+        """
+        Returns the calls served by both services since the last reset (they share one CallScript).
+
+        args: None
+        Returns:
+            dict: Call key to number of calls.
+        """
+        return {str(key): int(value) for key, value in self.control().GetCallCounts().items()}
+
+    def reset_call_counts(self):
+        """
+        Resets the call counters of both services.
+
+        args: None
+        returns: None
+        """
+        self.control().ResetCallCounts()
+
+    def stop(self):
+        """
+        Stops the mock and the private bus.
+
+        args: None
+        returns: None
+        """
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+        if self.process:
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+        self.bus.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock BlueZ and obexd D-Bus services on a private bus.")
+    parser.add_argument("--address", help="bus to export on; a private dbus-daemon is started if omitted")
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--adapters", type=int, default=1)
+    parser.add_argument("--paired", type=float, default=0.1)
+    parser.add_argument("--connected", type=float, default=0.5)
+    parser.add_argument("--hidden", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--throughput", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+    private_bus = None
+    address = args.address
+    if not address:
+        private_bus = PrivateBus()
+        address = private_bus.start()
+        print(f"export DBUS_SYSTEM_BUS_ADDRESS='{address}'")
+        print(f"export DBUS_SESSION_BUS_ADDRESS='{address}'", flush=True)
+
+    bluez_conn = dbus.bus.BusConnection(address)
+    obex_conn = dbus.bus.BusConnection(address)
+    script = CallScript(args.latency, args.seed)
+    bluez = MockBluez(bluez_conn, script, args.adapters)
+    bluez.populate(args.devices, paired=args.paired, connected=args.connected, hidden=args.hidden,
+                   seed=args.seed, emit=False)
+    obex = MockObex(obex_conn, script, args.throughput)
+    names = [dbus.service.BusName(BLUEZ_SERVICE, bluez_conn), dbus.service.BusName(OBEX_SERVICE, obex_conn)]
+
+    mainloop = GLib.MainLoop()
+    signal.signal(signal.SIGTERM, lambda *_: mainloop.quit())
+    print(f"[MockBluez] {len(bluez.objects)} objects exported on {address}", flush=True)
+    try:
+        mainloop.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        del names, obex
+        if private_bus:
+            private_bus.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+import array
+import os
+import selectors
+import socket
+import struct
+import threading
+import time
+
+import dbus
+
+from Backend_lib.Linux.gatt_client import GATT_CHARACTERISTIC_IFACE
+from Backend_lib.Linux.object_cache import PROPERTIES_IFACE
+
+# Drained chunk header: magic, record count, slot size.
+CHUNK_HEADER = struct.Struct("<4sII")
+CHUNK_MAGIC = b"NTF1"
+
+
+class NotificationRingBuffer:
+    """
+    Preallocated ring buffer of timestamped notification payloads.
+
+    Timestamps live in an array('d'), payload lengths in an array('H') and payloads
+    in one bytearray split into fixed-size slots whose memoryviews are created up
+    front. Recording a notification therefore copies bytes into existing storage
+    (or lets recv_into() write there directly) without creating a Python object per
+    record. When the buffer is full the oldest undrained records are overwritten and
+    counted as dropped.
+    """
+
+    def __init__(self, capacity=65536, slot_size=244):
+        """
+        Allocates the buffer.
+
+        Args:
+            capacity (int): Number of records kept.
+            slot_size (int): Maximum payload size of one record; longer payloads are truncated.
+        returns:
+            None
+        """
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.timestamps = array.array('d', bytes(8 * capacity))
+        self.lengths = array.array('H', bytes(2 * capacity))
+        self.data = bytearray(capacity * slot_size)
+        view = memoryview(self.data)
+        self.slots = [view[i * slot_size:(i + 1) * slot_size] for i in range(capacity)]
+        self.write_index = 0
+        self.unread = 0
+        self.total = 0
+        self.dropped = 0
+        self.truncated = 0
+        self.lock = threading.Lock()
+
+    def _commit(self, length, timestamp):
+        # Caller holds the lock and has written the payload into slots[write_index]
+        index = self.write_index
+        self.timestamps[index] = timestamp
+        self.lengths[index] = length
+        self.write_index = index + 1 if index + 1 < self.capacity else 0
+        self.total += 1
+        if self.unread < self.capacity:
+            self.unread += 1
+        else:
+            self.dropped += 1
+
+    def append(self, value, timestamp=None):
+        """
+        Records one payload (e.g. the Value of a PropertiesChanged signal).
+
+        Args:
+            value (bytes): Payload, any bytes-like object.
+            timestamp (float): time.monotonic() of reception, now if None.
+        returns:
+            None
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        length = len(value)
+        with self.lock:
+            if length > self.slot_size:
+                length = self.slot_size
+                self.truncated += 1
+                self.slots[self.write_index][:length] = memoryview(value)[:length]
+            else:
+                self.slots[self.write_index][:length] = value
+            self._commit(length, timestamp)
+
+    def receive(self, sock):
+        """
+        Reads one packet from an AcquireNotify socket straight into the next slot.
+
+        Args:
+            sock (socket.socket): Non-blocking SOCK_SEQPACKET socket.
+
+        Returns:
+            int: Payload length, 0 if the peer closed the socket.
+        """
+        with self.lock:
+            length = sock.recv_into(self.slots[self.write_index])
+            if length:
+                self._commit(length, time.monotonic())
+            return length
+
+    def drain(self, file_obj):
+        """
+        Writes every undrained record to a binary file as one chunk.
+
+        The chunk is CHUNK_HEADER followed by the records' float64 timestamps,
+        uint16 lengths and fixed-size payload slots; see read_capture().
+
+        Args:
+            file_obj: File opened in binary append/write mode.
+
+        Returns:
+            int: Number of records written.
+        """
+        with self.lock:
+            count = self.unread
+            if not count:
+                return 0
+            start = (self.write_index - count) % self.capacity
+            end = start + count
+            if end <= self.capacity:
+                timestamps = self.timestamps[start:end]
+                lengths = self.lengths[start:end]
+                data = self.data[start * self.slot_size:end * self.slot_size]
+            else:
+                wrap = end - self.capacity
+                timestamps = self.timestamps[start:] + self.timestamps[:wrap]
+                lengths = self.lengths[start:] + self.lengths[:wrap]
+                data = self.data[start * self.slot_size:] + self.data[:wrap * self.slot_size]
+            self.unread = 0
+        file_obj.write(CHUNK_HEADER.pack(CHUNK_MAGIC, count, self.slot_size))
+        timestamps.tofile(file_obj)
+        lengths.tofile(file_obj)
+        file_obj.write(data)
+        return count
+
+    def recent_timestamps(self):
+        """
+        Returns the timestamps still held in the buffer, oldest first.
+
+        args: None
+        Returns:
+            array.array: float64 timestamps.
+        """
+        with self.lock:
+            count = min(self.total, self.capacity)
+            start = (self.write_index - count) % self.capacity
+            if start + count <= self.capacity:
+                return self.timestamps[start:start + count]
+            return self.timestamps[start:] + self.timestamps[:self.write_index]
+
+    def stats(self, gap_threshold=None):
+        """
+        Returns rate and inter-arrival gap statistics over the records held in the buffer.
+
+        Args:
+            gap_threshold (float): Gaps longer than this many seconds are counted as
+                stalls; defaults to 10x the mean gap.
+
+        Returns:
+            dict: total, dropped, truncated, window, rate (per second) and gap statistics
+            (seconds).
+        """
+        timestamps = self.recent_timestamps()
+        report = {"total": self.total, "dropped": self.dropped, "truncated": self.truncated,
+                  "unread": self.unread, "window": len(timestamps), "rate": 0.0,
+                  "gap_min": None, "gap_mean": None, "gap_max": None, "stalls": 0}
+        if len(timestamps) < 2:
+            return report
+        gaps = [later - earlier for earlier, later in zip(timestamps, timestamps[1:])]
+        span = timestamps[-1] - timestamps[0]
+        mean = span / len(gaps)
+        threshold = gap_threshold if gap_threshold is not None else mean * 10
+        report.update({
+            "rate": len(gaps) / span if span > 0 else 0.0,
+            "gap_min": min(gaps),
+            "gap_mean": mean,
+            "gap_max": max(gaps),
+            "stalls": sum(1 for gap in gaps if gap > threshold),
+        })
+        return report
+
+
+def read_capture(file_path):
+    """
+    Iterates over the records of a file written by NotificationRingBuffer.drain().
+
+    Args:
+        file_path (str): Capture file.
+
+    Returns:
+        generator: (timestamp, payload bytes) tuples.
+    """
+    with open(file_path, "rb") as f:
+        while True:
+            header = f.read(CHUNK_HEADER.size)
+            if len(header) < CHUNK_HEADER.size:
+                return
+            magic, count, slot_size = CHUNK_HEADER.unpack(header)
+            if magic != CHUNK_MAGIC:
+                raise ValueError(f"Corrupt capture chunk in {file_path}")
+            timestamps = array.array('d')
+            timestamps.fromfile(f, count)
+            lengths = array.array('H')
+            lengths.fromfile(f, count)
+            data = f.read(count * slot_size)
+            for i in range(count):
+                offset = i * slot_size
+                yield timestamps[i], data[offset:offset + lengths[i]]
+
+
+class NotificationSink:
+    """
+    Captures GATT notifications of many characteristics into NotificationRingBuffers.
+
+    AcquireNotify() is preferred: BlueZ then writes every notification to a socket,
+    which a single selector thread reads with recv_into() straight into the ring
+    buffer, bypassing D-Bus entirely. Characteristics that cannot be acquired fall
+    back to StartNotify() with a PropertiesChanged receiver bound to their path.
+    """
+
+    def __init__(self, session, capacity=65536, slot_size=244):
+        """
+        Initializes the sink.
+
+        Args:
+            session (BluezSession): Session providing the bus, proxies and GATT client.
+            capacity (int): Records per ring buffer.
+            slot_size (int): Maximum payload size per record (raised to the ATT MTU if larger).
+        returns:
+            None
+        """
+        self.session = session
+        self.bus = session.bus
+        self.proxies = session.proxies
+        self.gatt = session.get_gatt_client()
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.captures = {}
+        self.selector = selectors.DefaultSelector()
+        self.reader_thread = None
+        self.running = False
+        self.lock = threading.Lock()
+
+    def _ensure_reader(self):
+        if self.reader_thread is None or not self.reader_thread.is_alive():
+            self.running = True
+            self.reader_thread = threading.Thread(target=self._read_loop, daemon=True)
+            self.reader_thread.start()
+
+    def _read_loop(self):
+        while self.running:
+            if not self.selector.get_map():
+                time.sleep(0.1)
+                continue
+            for key, events in self.selector.select(timeout=0.2):
+                sock, capture = key.fileobj, key.data
+                try:
+                    while capture["buffer"].receive(sock):
+                        pass
+                    # Zero-length read: BlueZ released the notification
+                    self._close_socket(sock)
+                    capture["socket"] = None
+                except BlockingIOError:
+                    pass
+                except OSError as e:
+                    print(f"[NotificationSink] Notify socket error: {e}")
+                    self._close_socket(sock)
+                    capture["socket"] = None
+
+    def _close_socket(self, sock):
+        try:
+            self.selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        sock.close()
+
+    def start(self, address, uuid, service_uuid=None, acquire=True):
+        """
+        Starts capturing notifications of a characteristic.
+
+        A stopped capture is re-armed and keeps appending to its existing buffer.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            uuid (str): Characteristic UUID.
+            service_uuid (str): Optional service UUID.
+            acquire (bool): Try AcquireNotify() before falling back to StartNotify().
+
+        Returns:
+            NotificationRingBuffer: Buffer receiving the notifications.
+        """
+        key = (address.upper(), uuid.lower())
+        with self.lock:
+            previous = self.captures.get(key)
+        if previous is not None:
+            if previous["socket"] is not None or previous["signal"] is not None:
+                return previous["buffer"]
+        path = self.gatt.get_characteristic_path(address, uuid, service_uuid)
+        characteristic = self.proxies.get_interface(path, GATT_CHARACTERISTIC_IFACE)
+        capture = {"path": path, "socket": None, "signal": None}
+
+        if acquire:
+            try:
+                fd, mtu = characteristic.AcquireNotify(dbus.Dictionary({}, signature="sv"))
+                sock = socket.socket(fileno=fd.take())
+                sock.setblocking(False)
+                capture["buffer"] = self._buffer_for(previous, max(self.slot_size, int(mtu)))
+                capture["socket"] = sock
+                self.selector.register(sock, selectors.EVENT_READ, capture)
+                self._ensure_reader()
+            except dbus.exceptions.DBusException as e:
+                print(f"[NotificationSink] AcquireNotify on {path} unavailable ({e.get_dbus_name()}), "
+                      f"using StartNotify")
+
+        if capture["socket"] is None:
+            buffer = self._buffer_for(previous, self.slot_size)
+            append = buffer.append
+
+            def on_properties_changed(interface, changed, invalidated):
+                value = changed.get("Value")
+                if value is not None:
+                    append(value)
+
+            capture["buffer"] = buffer
+            capture["signal"] = self.bus.add_signal_receiver(
+                on_properties_changed, signal_name="PropertiesChanged", dbus_interface=PROPERTIES_IFACE,
+                path=path, arg0=GATT_CHARACTERISTIC_IFACE, byte_arrays=True)
+            characteristic.StartNotify()
+
+        with self.lock:
+            self.captures[key] = capture
+        return capture["buffer"]
+
+    def _buffer_for(self, previous, slot_size):
+        # A restarted capture continues in its old buffer unless notifications no longer fit a slot
+        if previous is not None and previous["buffer"].slot_size >= slot_size:
+            return previous["buffer"]
+        return NotificationRingBuffer(self.capacity, slot_size)
+
+    def stop(self, address, uuid):
+        """
+        Stops capturing a characteristic; its buffer stays readable until removed.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            uuid (str): Characteristic UUID.
+        returns:
+            None
+        """
+        with self.lock:
+            capture = self.captures.get((address.upper(), uuid.lower()))
+        if capture is None:
+            return
+        if capture["socket"] is not None:
+            self._close_socket(capture["socket"])
+            capture["socket"] = None
+        if capture["signal"] is not None:
+            capture["signal"].remove()
+            capture["signal"] = None
+            try:
+                self.proxies.get_interface(capture["path"], GATT_CHARACTERISTIC_IFACE).StopNotify()
+            except dbus.exceptions.DBusException as e:
+                print(f"[NotificationSink] StopNotify on {capture['path']} failed: {e.get_dbus_message()}")
+
+    def stop_all(self):
+        """
+        Stops every capture and the reader thread.
+
+        args: None
+        returns: None
+        """
+        with self.lock:
+            keys = list(self.captures)
+        for address, uuid in keys:
+            self.stop(address, uuid)
+        self.running = False
+
+    def get_buffer(self, address, uuid):
+        """
+        Returns the ring buffer of a characteristic.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            uuid (str): Characteristic UUID.
+
+        Returns:
+            NotificationRingBuffer | None: Buffer, None if never captured.
+        """
+        with self.lock:
+            capture = self.captures.get((address.upper(), uuid.lower()))
+        return capture["buffer"] if capture else None
+
+    def drain_all(self, directory):
+        """
+        Appends the undrained records of every capture to <directory>/<address>_<uuid>.ntf.
+
+        Args:
+            directory (str): Output directory.
+
+        Returns:
+            dict: Records written per (address, uuid).
+        """
+        os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            captures = list(self.captures.items())
+        written = {}
+        for (address, uuid), capture in captures:
+            file_path = os.path.join(directory, f"{address.replace(':', '')}_{uuid}.ntf")
+            with open(file_path, "ab") as f:
+                written[(address, uuid)] = capture["buffer"].drain(f)
+        return written
+
+    def stats(self, gap_threshold=None):
+        """
+        Returns rate/gap statistics of every capture.
+
+        Args:
+            gap_threshold (float): Gap in seconds counted as a stall, see NotificationRingBuffer.stats().
+
+        Returns:
+            dict: Statistics per (address, uuid).
+        """
+        with self.lock:
+            captures = list(self.captures.items())
+        return {key: capture["buffer"].stats(gap_threshold) for key, capture in captures}
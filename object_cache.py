@@ -0,0 +1,525 @@
+import threading
+import time
+
+import dbus
+
+
+BLUEZ_SERVICE = "org.bluez"
+OBJECT_MANAGER_IFACE = "org.freedesktop.DBus.ObjectManager"
+PROPERTIES_IFACE = "org.freedesktop.DBus.Properties"
+ADAPTER_IFACE = "org.bluez.Adapter1"
+DEVICE_IFACE = "org.bluez.Device1"
+
+# Device1 properties that are indexed per adapter for O(k) state queries.
+INDEXED_STATES = ("Paired", "Connected", "Trusted")
+
+
+def adapter_name(adapter):
+    """
+    Normalizes an adapter reference to its interface name.
+
+    Args:
+        adapter (str): Interface name ('hci0') or adapter object path ('/org/bluez/hci0').
+
+    Returns:
+        str | None: Interface name, or None if adapter is empty.
+    """
+    if not adapter:
+        return None
+    return str(adapter).rstrip("/").rsplit("/", 1)[-1]
+
+
+class BluezObjectCache:
+    """
+    In-process mirror of the BlueZ D-Bus object tree.
+
+    The cache is seeded once with ObjectManager.GetManagedObjects() and kept current
+    from the InterfacesAdded, InterfacesRemoved and PropertiesChanged signals, so that
+    device and adapter queries are answered from memory instead of a D-Bus round trip.
+
+    Signals are dispatched by the GLib main loop (started by AgentRunner), so all
+    access to the mirrored tree is guarded by a lock.
+    """
+
+    def __init__(self, bus, service=BLUEZ_SERVICE):
+        """
+        Initializes the cache, subscribes to BlueZ signals and seeds the object tree.
+
+        Args:
+            bus (dbus.Bus): Bus on which the BlueZ service is exported.
+            service (str): Well-known name of the BlueZ service.
+        returns:
+            None
+        """
+        self.bus = bus
+        self.service = service
+        self.objects = {}
+        self.address_index = {}
+        self.path_index = {}
+        self.state_index = {state: {} for state in INDEXED_STATES}
+        self.last_seen = {}
+        self.lock = threading.RLock()
+        self.listeners = []
+        self.round_trips = 0
+        self.signal_matches = []
+        self.owner_watch = None
+        self.owner = None
+        self.subscribe()
+        self.refresh()
+
+    def subscribe(self):
+        """
+        Registers the signal receivers that keep the cache current.
+
+        Receivers are added before the tree is seeded so that no change can slip in
+        between the GetManagedObjects() reply and the first signal.
+
+        args: None
+        returns: None
+        """
+        self.signal_matches = [
+            self.bus.add_signal_receiver(self._interfaces_added, signal_name="InterfacesAdded",
+                                         dbus_interface=OBJECT_MANAGER_IFACE, bus_name=self.service),
+            self.bus.add_signal_receiver(self._interfaces_removed, signal_name="InterfacesRemoved",
+                                         dbus_interface=OBJECT_MANAGER_IFACE, bus_name=self.service),
+            self.bus.add_signal_receiver(self._properties_changed, signal_name="PropertiesChanged",
+                                         dbus_interface=PROPERTIES_IFACE, bus_name=self.service,
+                                         path_keyword="path"),
+        ]
+        self.owner_watch = self.bus.watch_name_owner(self.service, self._name_owner_changed)
+
+    def close(self):
+        """
+        Removes all signal receivers and drops the mirrored tree.
+
+        args: None
+        returns: None
+        """
+        for match in self.signal_matches:
+            match.remove()
+        self.signal_matches = []
+        if self.owner_watch:
+            self.owner_watch.cancel()
+            self.owner_watch = None
+        with self.lock:
+            self.objects.clear()
+            self.last_seen.clear()
+            self._clear_indexes()
+
+    def refresh(self):
+        """
+        Re-seeds the whole tree with a single GetManagedObjects() call.
+
+        args: None
+        returns: None
+        """
+        manager = dbus.Interface(self.bus.get_object(self.service, "/", introspect=False), OBJECT_MANAGER_IFACE)
+        objects = manager.GetManagedObjects()
+        self.round_trips += 1
+        with self.lock:
+            self.objects = {
+                str(path): {str(iface): dict(props) for iface, props in interfaces.items()}
+                for path, interfaces in objects.items()
+            }
+            self._clear_indexes()
+            last_seen = {}
+            for path, interfaces in self.objects.items():
+                if DEVICE_IFACE in interfaces:
+                    self._index_device(path)
+                    # Devices found by seeding have no known report time until they change
+                    last_seen[path] = self.last_seen.get(path)
+            self.last_seen = last_seen
+
+    def _clear_indexes(self):
+        """
+        Drops every device index entry. Caller must hold the lock.
+
+        args: None
+        returns: None
+        """
+        self.address_index.clear()
+        self.path_index.clear()
+        for adapters in self.state_index.values():
+            adapters.clear()
+
+    def _index_device(self, path):
+        """
+        (Re)indexes a device by (adapter, address) and by its indexed states.
+        Caller must hold the lock.
+
+        Args:
+            path (str): Device object path.
+        returns:
+            None
+        """
+        self._unindex_device(path)
+        props = self.objects.get(path, {}).get(DEVICE_IFACE)
+        if props is None or not props.get("Address"):
+            return
+        adapter = adapter_name(props.get("Adapter")) or path.split("/")[3]
+        key = (adapter, str(props["Address"]).upper())
+        self.address_index[key] = path
+        self.path_index[path] = key
+        for state in INDEXED_STATES:
+            if props.get(state, False):
+                self.state_index[state].setdefault(adapter, set()).add(path)
+
+    def _unindex_device(self, path):
+        """
+        Removes a device from every index. Caller must hold the lock.
+
+        Args:
+            path (str): Device object path.
+        returns:
+            None
+        """
+        key = self.path_index.pop(path, None)
+        if key is None:
+            return
+        if self.address_index.get(key) == path:
+            del self.address_index[key]
+        for adapters in self.state_index.values():
+            paths = adapters.get(key[0])
+            if paths:
+                paths.discard(path)
+
+    def add_listener(self, callback):
+        """
+        Registers a callback invoked after every change applied to the cache.
+
+        The callback receives (event, path, data) where event is 'added', 'removed' or
+        'changed'. For 'added' data maps interface names to properties, for 'removed'
+        it is the list of removed interfaces and for 'changed' it is a tuple of
+        (interface, changed_properties, invalidated_properties).
+
+        Args:
+            callback (callable): Listener to invoke.
+        returns:
+            None
+        """
+        with self.lock:
+            if callback not in self.listeners:
+                self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """
+        Unregisters a callback previously added with add_listener().
+
+        Args:
+            callback (callable): Listener to remove.
+        returns:
+            None
+        """
+        with self.lock:
+            if callback in self.listeners:
+                self.listeners.remove(callback)
+
+    def _notify(self, event, path, data):
+        """
+        Invokes every registered listener, isolating their failures from the cache.
+
+        Args:
+            event (str): 'added', 'removed' or 'changed'.
+            path (str): Object path the change applies to.
+            data: Event specific payload, see add_listener().
+        returns:
+            None
+        """
+        with self.lock:
+            listeners = list(self.listeners)
+        for listener in listeners:
+            try:
+                listener(event, path, data)
+            except Exception as e:
+                print(f"[BluezObjectCache] Listener error for {path}: {e}")
+
+    def _interfaces_added(self, path, interfaces):
+        path = str(path)
+        added = {str(iface): dict(props) for iface, props in interfaces.items()}
+        with self.lock:
+            self.objects.setdefault(path, {}).update(added)
+            if DEVICE_IFACE in added:
+                self._index_device(path)
+                self.last_seen[path] = time.time()
+        self._notify("added", path, added)
+
+    def _interfaces_removed(self, path, interfaces):
+        path = str(path)
+        removed = [str(iface) for iface in interfaces]
+        with self.lock:
+            entry = self.objects.get(path)
+            if entry is None:
+                return
+            for iface in removed:
+                entry.pop(iface, None)
+            if DEVICE_IFACE in removed:
+                self._unindex_device(path)
+                self.last_seen.pop(path, None)
+            if not entry:
+                del self.objects[path]
+        self._notify("removed", path, removed)
+
+    def _properties_changed(self, interface, changed, invalidated, path=None):
+        path = str(path)
+        interface = str(interface)
+        with self.lock:
+            props = self.objects.get(path, {}).get(interface)
+            if props is None:
+                return
+            props.update(changed)
+            for name in invalidated:
+                props.pop(name, None)
+            if interface == DEVICE_IFACE:
+                self._index_device(path)
+                self.last_seen[path] = time.time()
+        self._notify("changed", path, (interface, dict(changed), [str(name) for name in invalidated]))
+
+    def _name_owner_changed(self, owner):
+        """
+        Re-seeds the cache when bluetoothd (re)starts and empties it when it exits.
+
+        Args:
+            owner (str): New unique name of the service, empty if it vanished.
+        returns:
+            None
+        """
+        previous, self.owner = self.owner, owner
+        if previous is None:
+            return  # initial notification, the tree has just been seeded
+        if not owner:
+            with self.lock:
+                self.objects.clear()
+                self.last_seen.clear()
+                self._clear_indexes()
+            return
+        try:
+            self.refresh()
+        except dbus.exceptions.DBusException as e:
+            print(f"[BluezObjectCache] Failed to re-seed object tree: {e}")
+
+    def get_managed_objects(self):
+        """
+        Returns a snapshot of the cached tree in the GetManagedObjects() layout.
+
+        args: None
+        Returns:
+            dict: Mapping of object path to {interface: properties}.
+        """
+        with self.lock:
+            return {path: {iface: dict(props) for iface, props in interfaces.items()}
+                    for path, interfaces in self.objects.items()}
+
+    def get_objects_with_interface(self, interface, path_prefix=None):
+        """
+        Lists every cached object that implements the given interface.
+
+        Args:
+            interface (str): D-Bus interface name (e.g., 'org.bluez.Device1').
+            path_prefix (str): Optional object path prefix to restrict the search.
+
+        Returns:
+            list: (path, properties) tuples, properties being a copy.
+        """
+        with self.lock:
+            return [(path, dict(interfaces[interface])) for path, interfaces in self.objects.items()
+                    if interface in interfaces and (not path_prefix or path.startswith(path_prefix))]
+
+    def has_object(self, path):
+        """
+        Checks whether an object is currently exported at path.
+
+        Args:
+            path (str): D-Bus object path.
+
+        Returns:
+            bool: True if the object exists, False otherwise.
+        """
+        with self.lock:
+            return path in self.objects
+
+    def has_interface(self, path, interface):
+        """
+        Checks whether the object at path currently implements interface.
+
+        Args:
+            path (str): D-Bus object path.
+            interface (str): D-Bus interface name.
+
+        Returns:
+            bool: True if the interface is present, False otherwise.
+        """
+        with self.lock:
+            return interface in self.objects.get(path, {})
+
+    def get_properties(self, path, interface):
+        """
+        Returns a copy of the cached properties of one interface.
+
+        Args:
+            path (str): D-Bus object path.
+            interface (str): D-Bus interface name.
+
+        Returns:
+            dict | None: Properties if the object and interface exist, else None.
+        """
+        with self.lock:
+            props = self.objects.get(path, {}).get(interface)
+            return dict(props) if props is not None else None
+
+    def get_property(self, path, interface, name, default=None):
+        """
+        Returns one cached property value.
+
+        Args:
+            path (str): D-Bus object path.
+            interface (str): D-Bus interface name.
+            name (str): Property name.
+            default: Value returned when the property is unknown.
+
+        Returns:
+            Property value or default.
+        """
+        with self.lock:
+            return self.objects.get(path, {}).get(interface, {}).get(name, default)
+
+    def find_device_path(self, address, adapter=None):
+        """
+        Finds the object path of a device through the (adapter, address) index.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            adapter (str): Optional interface name or adapter object path. When omitted
+                the device is looked up on every known adapter.
+
+        Returns:
+            str | None: Object path if found, else None.
+        """
+        address = address.upper()
+        adapter = adapter_name(adapter)
+        with self.lock:
+            if adapter:
+                return self.address_index.get((adapter, address))
+            for (known_adapter, known_address), path in self.address_index.items():
+                if known_address == address:
+                    return path
+        return None
+
+    def get_device_key(self, path):
+        """
+        Reverse lookup of a device object path.
+
+        Args:
+            path (str): Device object path.
+
+        Returns:
+            tuple | None: (adapter, address) if the device is known, else None.
+        """
+        with self.lock:
+            return self.path_index.get(path)
+
+    def get_device_paths(self, state=None, adapter=None):
+        """
+        Returns the device paths matching an indexed state on one or all adapters.
+
+        Args:
+            state (str): One of INDEXED_STATES, or None for every device.
+            adapter (str): Optional interface name or adapter object path.
+
+        Returns:
+            set: Matching device object paths.
+        """
+        adapter = adapter_name(adapter)
+        with self.lock:
+            if state is None:
+                return {path for path, key in self.path_index.items() if not adapter or key[0] == adapter}
+            adapters = self.state_index[state]
+            if adapter:
+                return set(adapters.get(adapter, ()))
+            return set().union(*adapters.values())
+
+    def get_last_seen(self, path):
+        """
+        Returns when a device was last reported (added or any Device1 property change).
+
+        Devices already present when the cache was seeded have no last-seen time until
+        they are reported again; BlueZ does not tell when it last saw them.
+
+        Args:
+            path (str): Device object path.
+
+        Returns:
+            float | None: Epoch time, None if the device is unknown or was not reported
+                since the cache was seeded.
+        """
+        with self.lock:
+            return self.last_seen.get(path)
+
+    def get_devices(self, state=None, adapter=None):
+        """
+        Returns the Device1 properties of every device matching an indexed state.
+
+        Args:
+            state (str): One of INDEXED_STATES, or None for every device.
+            adapter (str): Optional interface name or adapter object path.
+
+        Returns:
+            list: (path, properties) tuples, properties being a copy.
+        """
+        with self.lock:
+            return [(path, dict(self.objects[path][DEVICE_IFACE]))
+                    for path in self.get_device_paths(state, adapter)]
+
+    def wait_for_property(self, path, interface, name, predicate=bool, timeout=10.0):
+        """
+        Blocks until a property satisfies predicate, woken by PropertiesChanged.
+
+        The current cached value is checked first; otherwise the call returns the moment
+        a matching PropertiesChanged (or InterfacesAdded) signal is applied to the cache.
+        Should the deadline pass, the property is read once over D-Bus so that a missed
+        signal (e.g. no main loop running) cannot turn a real state change into a failure.
+
+        Args:
+            path (str): D-Bus object path.
+            interface (str): D-Bus interface name.
+            name (str): Property name.
+            predicate (callable): Test applied to the property value.
+            timeout (float): Maximum time to wait in seconds.
+
+        Returns:
+            bool: True if the predicate was satisfied, False on timeout or if the
+            object was removed.
+        """
+        matched = threading.Event()
+        removed = threading.Event()
+
+        def listener(event, event_path, data):
+            if event_path != path:
+                return
+            if event == "changed":
+                changed_interface, changed, invalidated = data
+                if changed_interface == interface and name in changed and predicate(changed[name]):
+                    matched.set()
+            elif event == "added":
+                if name in data.get(interface, {}) and predicate(data[interface][name]):
+                    matched.set()
+            elif event == "removed" and interface in data:
+                removed.set()
+                matched.set()
+
+        # Listen before reading the cached value so that no change can be missed in between
+        self.add_listener(listener)
+        try:
+            value = self.get_property(path, interface, name)
+            if value is not None and predicate(value):
+                return True
+            if matched.wait(timeout):
+                return not removed.is_set()
+        finally:
+            self.remove_listener(listener)
+
+        try:
+            props = dbus.Interface(self.bus.get_object(self.service, path, introspect=False), PROPERTIES_IFACE)
+            self.round_trips += 1
+            return bool(predicate(props.Get(interface, name)))
+        except dbus.exceptions.DBusException:
+            return False
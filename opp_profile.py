@@ -5,6 +5,8 @@ import os
 import subprocess
 import time
 
+from Backend_lib.Linux.proxy_pool import OBEX_SERVICE, ProxyPool
+
 class OPPManager:
     """
     Manages Object Push Profile (OPP) operations over Bluetooth using BlueZ and OBEX.
@@ -13,12 +15,29 @@ class OPPManager:
     to receive incoming file transfers.
     """
 
-    def __init__(self):
+    def __init__(self, session=None):
         """
         Initialize the OPPManager with default values.
+
+        Args:
+            session (BluezSession): Optional session whose obexd proxy pool is shared.
         """
         self.last_session_path = None
         self.opp_process = None
+        self.session = session
+        self.proxies = None
+
+    def _get_proxies(self):
+        """
+        Returns the session bus proxy pool, connecting to the session bus on first use.
+
+        args: None
+        Returns:
+            ProxyPool: Pool of obexd proxies.
+        """
+        if self.proxies is None:
+            self.proxies = self.session.get_obex_proxies() if self.session else ProxyPool(dbus.SessionBus())
+        return self.proxies
 
     def send_file_via_obex(self, device_address, file_path):
         """
@@ -37,15 +56,14 @@ class OPPManager:
             return "error", msg
 
         try:
-            session_bus = dbus.SessionBus()
-            obex_service = "org.bluez.obex"
-            manager_obj = session_bus.get_object(obex_service, "/org/bluez/obex")
-            manager = dbus.Interface(manager_obj, "org.bluez.obex.Client1")
+            proxies = self._get_proxies()
+            manager = proxies.get_interface("/org/bluez/obex", "org.bluez.obex.Client1", OBEX_SERVICE)
 
             # Clean up old session if it exists
             if self.last_session_path:
                 try:
                     manager.RemoveSession(self.last_session_path)
+                    proxies.evict(self.last_session_path, recursive=True)
                     print(f"Removed previous session: {self.last_session_path}")
                     time.sleep(1.0)
                 except Exception as e:
@@ -58,15 +76,14 @@ class OPPManager:
             print(f"Created OBEX session: {session_path}")
 
             # Push the file
-            opp_obj = session_bus.get_object(obex_service, session_path)
-            opp = dbus.Interface(opp_obj, "org.bluez.obex.ObjectPush1")
-            transfer_path = opp.SendFile(file_path)
+            opp = proxies.get_interface(session_path, "org.bluez.obex.ObjectPush1", OBEX_SERVICE)
+            # SendFile returns the transfer object and its initial properties
+            transfer_path, _ = opp.SendFile(file_path)
             transfer_path = str(transfer_path)
             print(f"Transfer started: {transfer_path}")
 
             # Monitor transfer status
-            transfer_obj = session_bus.get_object(obex_service, transfer_path)
-            transfer_props = dbus.Interface(transfer_obj, "org.freedesktop.DBus.Properties")
+            transfer_props = proxies.get_properties(transfer_path, OBEX_SERVICE)
 
             status = "unknown"
             for _ in range(40):
@@ -79,6 +96,7 @@ class OPPManager:
             # Always remove session
             try:
                 manager.RemoveSession(session_path)
+                proxies.evict(session_path, recursive=True)
                 self.last_session_path = None
                 print("Session removed after transfer.")
             except Exception as e:
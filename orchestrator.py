@@ -0,0 +1,218 @@
+import asyncio
+import time
+
+import dbus
+
+from Backend_lib.Linux.bluez_session import BluezSession
+from Backend_lib.Linux.object_cache import DEVICE_IFACE
+
+# BlueZ errors meaning the requested state is already reached.
+ALREADY_DONE_ERRORS = ("org.bluez.Error.AlreadyExists", "org.bluez.Error.AlreadyConnected")
+
+
+class DeviceResult:
+    """
+    Outcome of one device's bring-up.
+    """
+
+    def __init__(self, address):
+        """
+        Initializes an empty result.
+
+        Args:
+            address (str): Bluetooth MAC address.
+        returns:
+            None
+        """
+        self.address = address
+        self.success = False
+        self.failed_step = None
+        self.error = None
+        self.timings = {}
+        self.total = 0.0
+
+    def as_dict(self):
+        """
+        Returns the result as a plain dictionary.
+
+        args: None
+        Returns:
+            dict: Result fields, timings in seconds per step.
+        """
+        return {
+            "address": self.address,
+            "success": self.success,
+            "failed_step": self.failed_step,
+            "error": self.error,
+            "timings": dict(self.timings),
+            "total": self.total,
+        }
+
+    def __repr__(self):
+        status = "ok" if self.success else f"failed at {self.failed_step}: {self.error}"
+        return f"DeviceResult({self.address}, {status}, {self.total:.2f}s)"
+
+
+class FleetOrchestrator:
+    """
+    Brings up many devices on one adapter concurrently: Pair -> Trust -> Connect -> profile ready.
+
+    Devices run as independent asyncio tasks, at most max_concurrency at a time. Only
+    paging is serialized: a controller pages one device at a time, so Pair() or
+    Connect() on a device without an ACL link holds the adapter's paging lock until
+    Connected turns true (or the call ends). Authentication, trust, profile
+    connection and service resolution of different devices overlap freely, which
+    keeps the fleet wall-clock time close to the slowest device instead of the sum.
+    """
+
+    def __init__(self, interface=None, session=None, max_concurrency=4, step_timeout=25.0,
+                 profile_uuid=None, trust=True, services_resolved_timeout=10.0):
+        """
+        Initializes the orchestrator.
+
+        Args:
+            interface (str): Name of the Bluetooth interface (e.g., 'hci0').
+            session (BluezSession): Session to use, defaults to the shared session of the interface.
+            max_concurrency (int): Maximum number of devices brought up at the same time.
+            step_timeout (float): Timeout in seconds of each D-Bus step.
+            profile_uuid (str): Profile connected with ConnectProfile() after Connect(), if given.
+            trust (bool): Mark devices as trusted.
+            services_resolved_timeout (float): Seconds to wait for ServicesResolved.
+        returns:
+            None
+        """
+        self.interface = interface
+        self.session = session or BluezSession.get(interface)
+        self.client = self.session.get_async_client()
+        self.object_cache = self.session.object_cache
+        self.max_concurrency = max_concurrency
+        self.step_timeout = step_timeout
+        self.profile_uuid = profile_uuid
+        self.trust = trust
+        self.services_resolved_timeout = services_resolved_timeout
+        self.paging_lock = None
+        self.semaphore = None
+
+    def _device_property(self, address, name):
+        device_path = self.client.find_device_path(address)
+        if not device_path:
+            return False
+        return bool(self.object_cache.get_property(device_path, DEVICE_IFACE, name, False))
+
+    async def _paged(self, address, call):
+        """
+        Runs a call that may page the device while holding the adapter's paging lock.
+
+        The lock is released as soon as the ACL link is up, the rest of the call
+        (e.g. authentication) runs concurrently with other devices.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            call (callable): Returns the coroutine to run.
+
+        Returns:
+            The coroutine's result.
+        """
+        if self._device_property(address, "Connected"):
+            return await call()
+        device_path = self.client.find_device_path(address)
+        async with self.paging_lock:
+            task = asyncio.ensure_future(call())
+            linked = asyncio.ensure_future(
+                self.client.wait_for_property(device_path, DEVICE_IFACE, "Connected", bool,
+                                              timeout=self.step_timeout))
+            try:
+                await asyncio.wait({task, linked}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                linked.cancel()
+        return await task
+
+    async def _step(self, result, name, call):
+        start = time.monotonic()
+        try:
+            await call()
+        except dbus.exceptions.DBusException as e:
+            if e.get_dbus_name() not in ALREADY_DONE_ERRORS:
+                raise
+        finally:
+            result.timings[name] = time.monotonic() - start
+
+    async def bring_up_device(self, address):
+        """
+        Runs Pair -> Trust -> Connect -> profile ready for one device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            DeviceResult: Per-step timings and the failing step, if any.
+        """
+        result = DeviceResult(address)
+        start = time.monotonic()
+        step = "lookup"
+        try:
+            async with self.semaphore:
+                if not self.client.find_device_path(address):
+                    raise LookupError(f"Device {address} not found on {self.interface}")
+                if not self._device_property(address, "Paired"):
+                    step = "pair"
+                    await self._step(result, step, lambda: self._paged(
+                        address, lambda: self.client.pair(address, timeout=self.step_timeout)))
+                if self.trust and not self._device_property(address, "Trusted"):
+                    step = "trust"
+                    await self._step(result, step, lambda: self.client.trust(address, timeout=self.step_timeout))
+                step = "connect"
+                await self._step(result, step, lambda: self._paged(
+                    address, lambda: self.client.connect(address, timeout=self.step_timeout)))
+                if self.profile_uuid:
+                    step = "connect_profile"
+                    await self._step(result, step, lambda: self.client.connect_profile(
+                        address, self.profile_uuid, timeout=self.step_timeout))
+                step = "services_resolved"
+                device_path = self.client.find_device_path(address)
+                ready_start = time.monotonic()
+                resolved = await self.client.wait_for_property(device_path, DEVICE_IFACE, "ServicesResolved",
+                                                               bool, timeout=self.services_resolved_timeout)
+                result.timings[step] = time.monotonic() - ready_start
+                if not resolved:
+                    raise asyncio.TimeoutError("ServicesResolved not reported")
+            result.success = True
+        except Exception as e:
+            result.failed_step = step
+            result.error = str(e) or type(e).__name__
+        result.total = time.monotonic() - start
+        return result
+
+    async def bring_up(self, addresses):
+        """
+        Brings up every device concurrently.
+
+        Args:
+            addresses (list): Bluetooth MAC addresses.
+
+        Returns:
+            list: DeviceResult per address, in the order given.
+        """
+        self.paging_lock = asyncio.Lock()
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        start = time.monotonic()
+        results = await asyncio.gather(*(self.bring_up_device(address) for address in addresses))
+        succeeded = sum(1 for result in results if result.success)
+        print(f"[FleetOrchestrator] {succeeded}/{len(results)} devices up on {self.interface} "
+              f"in {time.monotonic() - start:.2f}s")
+        for result in results:
+            if not result.success:
+                print(f"[FleetOrchestrator] {result}")
+        return results
+
+    def run(self, addresses):
+        """
+        Blocking wrapper around bring_up() for synchronous callers.
+
+        Args:
+            addresses (list): Bluetooth MAC addresses.
+
+        Returns:
+            list: DeviceResult per address, in the order given.
+        """
+        return asyncio.run(self.bring_up(addresses))
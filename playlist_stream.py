@@ -0,0 +1,313 @@
+import os
+import random
+import threading
+
+from Backend_lib.Linux.audio_stream import AudioStream, PcmSpec, audioop, open_track
+
+# Extensions picked up when a directory is enqueued.
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".flac")
+
+
+class Playlist:
+    """
+    Ordered queue of audio files with loop and shuffle.
+
+    Items may be enqueued while the playlist is playing. In shuffle mode every pass
+    over the items uses a new random order.
+    """
+
+    def __init__(self, items=None, loop=False, shuffle=False, seed=None):
+        """
+        Initializes the playlist.
+
+        Args:
+            items (str | list): Files or directories to enqueue.
+            loop (bool): Start over once every item was played.
+            shuffle (bool): Play the items in random order.
+            seed (int): Seed of the shuffle order, for reproducible soak runs.
+        returns:
+            None
+        """
+        self.items = []
+        self.order = []
+        self.position = 0
+        self.loop = loop
+        self.shuffle = shuffle
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        if items:
+            self.enqueue(items)
+
+    def enqueue(self, items):
+        """
+        Appends files, or every audio file of a directory tree in name order.
+
+        Args:
+            items (str | list): File or directory paths.
+
+        Returns:
+            int: Number of files added.
+        """
+        if isinstance(items, str):
+            items = [items]
+        paths = []
+        for item in items:
+            if os.path.isdir(item):
+                for root, dirs, files in os.walk(item):
+                    dirs.sort()
+                    paths.extend(os.path.join(root, name) for name in sorted(files)
+                                 if name.lower().endswith(AUDIO_EXTENSIONS))
+            elif os.path.isfile(item):
+                paths.append(item)
+            else:
+                print(f"[Playlist] Skipping missing file: {item}")
+        with self.lock:
+            for path in paths:
+                self.items.append(path)
+                index = len(self.items) - 1
+                if self.shuffle:
+                    self.order.insert(self.random.randint(self.position, len(self.order)), index)
+                else:
+                    self.order.append(index)
+        return len(paths)
+
+    def clear(self):
+        """
+        Removes every item.
+
+        args: None
+        returns: None
+        """
+        with self.lock:
+            self.items = []
+            self.order = []
+            self.position = 0
+
+    def next_item(self):
+        """
+        Returns the next file to play.
+
+        args: None
+        Returns:
+            str | None: File path, None when the playlist is exhausted.
+        """
+        with self.lock:
+            if self.position >= len(self.order):
+                if not self.loop or not self.items:
+                    return None
+                self.order = list(range(len(self.items)))
+                if self.shuffle:
+                    self.random.shuffle(self.order)
+                self.position = 0
+            path = self.items[self.order[self.position]]
+            self.position += 1
+            return path
+
+    def remaining(self):
+        """
+        Returns the number of items left in the current pass.
+
+        args: None
+        Returns:
+            int: Items not played yet.
+        """
+        with self.lock:
+            return len(self.order) - self.position
+
+    def __len__(self):
+        return len(self.items)
+
+
+class TrackMarker:
+    """
+    Queue item marking where a track starts in the PCM stream.
+    """
+
+    def __init__(self, path, duration):
+        self.path = path
+        self.duration = duration
+
+
+class PlaylistStream(AudioStream):
+    """
+    Plays a Playlist through one playback stream, gapless or with crossfades.
+
+    Every track is decoded to the same output spec and appended to the same pacat
+    stream, so the sink and the A2DP transport stay active between tracks. The
+    next track is opened (WAV read-ahead, ffmpeg started) as soon as the current
+    one starts decoding.
+    """
+
+    def __init__(self, playlist, sink=None, spec=None, crossfade_ms=0, buffer_ms=1000, latency_ms=100,
+                 chunk_ms=20):
+        """
+        Initializes the stream; start() begins playback.
+
+        Args:
+            playlist (Playlist): Tracks to play.
+            sink (str): PulseAudio sink name, the default sink if None.
+            spec (PcmSpec): Output spec of every track, 44.1 kHz stereo s16le if None.
+            crossfade_ms (int): Overlap between consecutive tracks, 0 for gapless.
+            buffer_ms (int): Decoded audio kept ahead of the sink, in milliseconds.
+            latency_ms (int): Latency target of the playback stream, in milliseconds.
+            chunk_ms (int): Duration of one chunk, in milliseconds.
+        returns:
+            None
+        """
+        AudioStream.__init__(self, None, sink, spec or PcmSpec(), buffer_ms, latency_ms, chunk_ms)
+        if crossfade_ms and (audioop is None or self.requested_spec.sample_format != "s16le"):
+            print("[PlaylistStream] Crossfade needs audioop and s16le output, playing gapless")
+            crossfade_ms = 0
+        self.playlist = playlist
+        self.crossfade_ms = crossfade_ms
+        self.skip_event = threading.Event()
+        self.current_track = None
+        self.track_started_bytes = 0
+        self.tracks_played = 0
+        self.failed_tracks = []
+
+    def _open(self):
+        # Tracks are opened by the decoder thread.
+        self.spec = self.requested_spec
+
+    def stream_name(self):
+        return "playlist"
+
+    def skip(self):
+        """
+        Stops decoding the current track and moves to the next one.
+
+        Audio already buffered (up to buffer_ms) is still played.
+
+        args: None
+        returns: None
+        """
+        self.skip_event.set()
+
+    def _open_next(self):
+        failures = 0
+        while not self.stop_event.is_set():
+            path = self.playlist.next_item()
+            if path is None:
+                return None
+            try:
+                source, converter = open_track(path, self.spec)
+                source.prefetch()
+                return path, source, converter
+            except (ValueError, RuntimeError, OSError) as e:
+                print(f"[PlaylistStream] Skipping {path}: {e}")
+                self.failed_tracks.append(path)
+                failures += 1
+                if failures >= max(1, len(self.playlist)):
+                    return None  # every track failed, do not spin on a looping playlist
+        return None
+
+    def _track_chunks(self, source, converter):
+        chunk_bytes = source.spec.bytes_per_second * self.chunk_ms // 1000
+        for chunk in source.chunks(chunk_bytes):
+            if self.stop_event.is_set() or self.skip_event.is_set():
+                break
+            yield converter.convert(chunk) if converter else chunk
+
+    def _read_head(self, chunks, size):
+        head = bytearray()
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= size:
+                break
+        return bytes(head[:size]), bytes(head[size:])
+
+    def _crossfade(self, tail, head):
+        head = head.ljust(len(tail), b"\0")
+        step = max(1, self.spec.rate // 100) * self.spec.frame_size  # 10 ms gain steps
+        mixed = bytearray()
+        for offset in range(0, len(tail), step):
+            gain = min(1.0, (offset + step / 2) / len(tail))
+            mixed += audioop.add(audioop.mul(tail[offset:offset + step], 2, 1.0 - gain),
+                                 audioop.mul(head[offset:offset + step], 2, gain), 2)
+        return bytes(mixed)
+
+    def _decode(self):
+        fade_bytes = self.spec.rate * self.crossfade_ms // 1000 * self.spec.frame_size
+        tail = b""
+        current = upcoming = None
+        try:
+            current = self._open_next()
+            while current is not None and not self.stop_event.is_set():
+                path, source, converter = current
+                self.skip_event.clear()
+                chunks = self._track_chunks(source, converter)
+                held = bytearray()
+                if not self._put(TrackMarker(path, source.duration)):
+                    break
+                if tail:
+                    head, held[:] = self._read_head(chunks, len(tail))
+                    if not self._put(self._crossfade(tail, head)):
+                        break
+                upcoming = None
+                looked_ahead = False
+                for chunk in chunks:
+                    if not looked_ahead:
+                        # Prefetch the next track while this one plays
+                        upcoming = self._open_next()
+                        looked_ahead = True
+                    if fade_bytes:
+                        # Hold back the last fade_bytes to mix them with the next track.
+                        held += chunk
+                        if len(held) > fade_bytes:
+                            chunk = bytes(held[:-fade_bytes])
+                            del held[:-fade_bytes]
+                        else:
+                            continue
+                    if not self._put(chunk):
+                        break
+                if upcoming is None:
+                    # Nothing was queued when the track started; pick up tracks enqueued since
+                    upcoming = self._open_next()
+                source.close()
+                tail = bytes(held)
+                current, upcoming = upcoming, None
+            if tail and not self.stop_event.is_set():
+                self._put(tail)
+        except Exception as e:
+            if not self.stop_event.is_set():
+                self._fail(f"Decoding failed: {e}")
+        finally:
+            for item in (current, upcoming):
+                if item:
+                    item[1].close()
+            self.decode_done = True
+            self._put(None)
+
+    def _on_marker(self, marker):
+        with self.lock:
+            if self.current_track is not None:
+                self.tracks_played += 1
+            self.current_track = marker
+            self.track_started_bytes = self.bytes_written
+
+    def status(self):
+        """
+        Returns the playback state and counters, with the current track.
+
+        args: None
+        Returns:
+            dict: AudioStream.status() plus track, track position and duration,
+                tracks played, tracks left in the current pass and failed tracks.
+        """
+        status = AudioStream.status(self)
+        with self.lock:
+            track = self.current_track
+            track_bytes = self.bytes_written - self.track_started_bytes
+        track_position = track_bytes / self.spec.bytes_per_second
+        if status["state"] != "finished":
+            track_position = max(0.0, track_position - self.latency_ms / 1000.0)
+        status.update({
+            "file": track.path if track else None,
+            "track_position": track_position,
+            "track_duration": track.duration if track else None,
+            "tracks_played": self.tracks_played,
+            "queued": self.playlist.remaining(),
+            "failed_tracks": list(self.failed_tracks),
+        })
+        return status
@@ -0,0 +1,182 @@
+import collections
+import threading
+
+import dbus
+
+
+BLUEZ_SERVICE = "org.bluez"
+OBEX_SERVICE = "org.bluez.obex"
+
+# Interfaces used by this project. Proxies are created with introspection disabled,
+# so every call goes through one of these explicitly named interfaces instead of
+# an Introspect() round trip per new proxy.
+KNOWN_INTERFACES = frozenset([
+    "org.freedesktop.DBus.ObjectManager",
+    "org.freedesktop.DBus.Properties",
+    "org.bluez.AgentManager1",
+    "org.bluez.Adapter1",
+    "org.bluez.Device1",
+    "org.bluez.GattService1",
+    "org.bluez.GattCharacteristic1",
+    "org.bluez.GattDescriptor1",
+    "org.bluez.Media1",
+    "org.bluez.MediaControl1",
+    "org.bluez.MediaEndpoint1",
+    "org.bluez.MediaPlayer1",
+    "org.bluez.MediaTransport1",
+    "org.bluez.obex.Client1",
+    "org.bluez.obex.ObjectPush1",
+    "org.bluez.obex.Session1",
+    "org.bluez.obex.Transfer1",
+])
+
+
+class ProxyPool:
+    """
+    Bounded pool of D-Bus proxies and interface wrappers.
+
+    Entries are keyed by (bus, service, path, interface) and kept in LRU order.
+    Proxies are created with introspect=False, which saves the hidden Introspect()
+    round trip dbus-python performs for every new proxy object. When attached to a
+    BluezObjectCache, entries are evicted as soon as InterfacesRemoved fires for
+    their object.
+    """
+
+    def __init__(self, bus, max_size=512, object_cache=None):
+        """
+        Initializes the pool.
+
+        Args:
+            bus (dbus.Bus): Default bus used when a call does not name one.
+            max_size (int): Maximum number of pooled entries before LRU eviction.
+            object_cache (BluezObjectCache): Optional cache whose removals evict entries.
+        returns:
+            None
+        """
+        self.bus = bus
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.object_cache = None
+        self.unknown_interfaces = set()
+        if object_cache is not None:
+            self.attach(object_cache)
+
+    def attach(self, object_cache):
+        """
+        Evicts pooled entries whenever the cache reports removed interfaces.
+
+        Args:
+            object_cache (BluezObjectCache): Cache to listen to.
+        returns:
+            None
+        """
+        self.object_cache = object_cache
+        object_cache.add_listener(self._on_cache_event)
+
+    def _on_cache_event(self, event, path, data):
+        if event != "removed":
+            return
+        gone = not self.object_cache.has_object(path)
+        self.evict(path, interfaces=None if gone else data)
+
+    def _lookup(self, key, factory):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = factory()
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return entry
+
+    def get_object(self, path, service=BLUEZ_SERVICE, bus=None):
+        """
+        Returns a pooled proxy object created without introspection.
+
+        Args:
+            path (str): D-Bus object path.
+            service (str): Bus name exporting the object.
+            bus (dbus.Bus): Bus to use, defaults to the pool's bus.
+
+        Returns:
+            dbus.proxies.ProxyObject: Proxy for the object.
+        """
+        bus = bus or self.bus
+        return self._lookup((bus, service, str(path), None),
+                            lambda: bus.get_object(service, path, introspect=False))
+
+    def get_interface(self, path, interface, service=BLUEZ_SERVICE, bus=None):
+        """
+        Returns a pooled dbus.Interface wrapper.
+
+        Args:
+            path (str): D-Bus object path.
+            interface (str): Interface name, normally one of KNOWN_INTERFACES.
+            service (str): Bus name exporting the object.
+            bus (dbus.Bus): Bus to use, defaults to the pool's bus.
+
+        Returns:
+            dbus.Interface: Interface wrapper bound to the pooled proxy.
+        """
+        bus = bus or self.bus
+        if interface not in KNOWN_INTERFACES and interface not in self.unknown_interfaces:
+            # Warn once per interface; hot paths may look the same one up repeatedly
+            self.unknown_interfaces.add(interface)
+            print(f"[ProxyPool] Interface {interface} is not declared in KNOWN_INTERFACES")
+        return self._lookup((bus, service, str(path), interface),
+                            lambda: dbus.Interface(self.get_object(path, service, bus), interface))
+
+    def get_properties(self, path, service=BLUEZ_SERVICE, bus=None):
+        """
+        Shortcut for the org.freedesktop.DBus.Properties interface of an object.
+
+        Args:
+            path (str): D-Bus object path.
+            service (str): Bus name exporting the object.
+            bus (dbus.Bus): Bus to use, defaults to the pool's bus.
+
+        Returns:
+            dbus.Interface: Properties interface wrapper.
+        """
+        return self.get_interface(path, "org.freedesktop.DBus.Properties", service, bus)
+
+    def evict(self, path, interfaces=None, recursive=False):
+        """
+        Drops pooled entries for an object.
+
+        Args:
+            path (str): D-Bus object path.
+            interfaces (list): Only evict these interface wrappers; evict the proxy and
+                every wrapper of the object when None.
+            recursive (bool): Also evict every object below path.
+        returns:
+            None
+        """
+        path = str(path)
+        prefix = path.rstrip("/") + "/"
+        with self.lock:
+            for key in list(self.entries):
+                key_path, key_interface = key[2], key[3]
+                if key_path != path and not (recursive and key_path.startswith(prefix)):
+                    continue
+                if interfaces is None or key_interface in interfaces:
+                    del self.entries[key]
+
+    def clear(self):
+        """
+        Drops every pooled entry.
+
+        args: None
+        returns: None
+        """
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,410 @@
+import re
+import threading
+
+# Optional dependency (pip install pulsectl). Without it PulseAudioMonitor does not
+# start, and sink/source lookups and telemetry fall back to polling pactl.
+try:
+    import pulsectl
+except ImportError:
+    pulsectl = None
+
+# Matches the address in PulseAudio/PipeWire Bluetooth object names,
+# e.g. bluez_sink.AA_BB_CC_DD_EE_FF.a2dp_sink or bluez_output.AA_BB_CC_DD_EE_FF.1
+ADDRESS_PATTERN = re.compile(r"([0-9A-Fa-f]{2}[_:]){5}[0-9A-Fa-f]{2}")
+
+# Proplist keys carrying the device address (PulseAudio, PipeWire).
+ADDRESS_PROPERTIES = ("device.string", "api.bluez5.address")
+
+
+def bluetooth_address(name, proplist=None):
+    """
+    Extracts the Bluetooth address of a PulseAudio card or sink.
+
+    Args:
+        name (str): Card or sink name.
+        proplist (dict): Object properties.
+
+    Returns:
+        str | None: Upper-case MAC address, None for non-Bluetooth objects.
+    """
+    proplist = proplist or {}
+    if proplist.get("device.api") not in ("bluez", "bluez5") and not str(name).startswith("bluez"):
+        return None
+    for key in ADDRESS_PROPERTIES:
+        value = proplist.get(key, "")
+        if ADDRESS_PATTERN.fullmatch(value):
+            return value.replace("_", ":").upper()
+    match = ADDRESS_PATTERN.search(str(name))
+    return match.group(0).replace("_", ":").upper() if match else None
+
+
+# Source index of a PulseAudio source that is not a sink monitor (PA_INVALID_INDEX).
+NO_SINK = 0xFFFFFFFF
+
+
+class PulseAudioMonitor:
+    """
+    Keeps an in-memory view of Bluetooth cards, sinks, sources and playing streams.
+
+    One native connection to the PulseAudio (or pipewire-pulse) server subscribes to
+    card, sink, source and sink-input events from a background thread; each event refreshes
+    only the object it names. Lookups are then dictionary reads instead of a pactl
+    subprocess each. The connection is re-established if the server restarts.
+    """
+
+    instance = None
+    instance_lock = threading.Lock()
+
+    def __init__(self, client_name="bluez-test-host", reconnect_delay=2.0):
+        """
+        Initializes the monitor; start() connects it.
+
+        Args:
+            client_name (str): Client name shown by the PulseAudio server.
+            reconnect_delay (float): Seconds to wait before reconnecting after an error.
+        returns:
+            None
+        """
+        self.client_name = client_name
+        self.reconnect_delay = reconnect_delay
+        self.cards = {}
+        self.sinks = {}
+        self.sources = {}
+        self.sink_inputs = {}
+        self.listeners = []
+        self.pending = {}
+        self.lock = threading.RLock()
+        self.ready = threading.Event()
+        self.stop_event = threading.Event()
+        self.pulse = None
+        self.thread = None
+
+    @classmethod
+    def get(cls, timeout=2.0):
+        """
+        Returns the shared monitor, starting it on first use.
+
+        Args:
+            timeout (float): Seconds to wait for the initial snapshot on first use.
+
+        Returns:
+            PulseAudioMonitor: Shared monitor; check is_ready() before relying on it.
+        """
+        with cls.instance_lock:
+            if cls.instance is None:
+                cls.instance = cls()
+                # Without pulsectl no snapshot will ever come; do not stall the pactl fallback
+                if cls.instance.start():
+                    cls.instance.ready.wait(timeout)
+            return cls.instance
+
+    @classmethod
+    def close(cls):
+        """
+        Stops the shared monitor.
+
+        args: None
+        returns: None
+        """
+        with cls.instance_lock:
+            monitor, cls.instance = cls.instance, None
+        if monitor:
+            monitor.stop()
+
+    def start(self):
+        """
+        Starts the event thread.
+
+        args: None
+        Returns:
+            bool: False if pulsectl is not installed.
+        """
+        if pulsectl is None:
+            print("[PulseAudioMonitor] pulsectl is not installed, falling back to pactl")
+            return False
+        if self.thread and self.thread.is_alive():
+            return True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="PulseAudioMonitor", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """
+        Stops the event thread and closes the connection.
+
+        args: None
+        returns: None
+        """
+        self.stop_event.set()
+        pulse = self.pulse
+        if pulse:
+            try:
+                pulse.event_listen_stop()
+            except Exception:
+                pass
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def is_ready(self):
+        """
+        Tells whether the monitor is connected and holds a current snapshot.
+
+        args: None
+        Returns:
+            bool: True if lookups reflect the server state.
+        """
+        return self.ready.is_set()
+
+    def add_listener(self, callback):
+        """
+        Registers a callback for changes of Bluetooth cards, sinks, sources and streams.
+
+        The callback runs on the monitor thread as callback(event, facility, info),
+        event being 'new', 'change' or 'remove', facility 'card', 'sink', 'source' or
+        'sink_input', and info the stored entry (None on removal).
+
+        Args:
+            callback (callable): Listener.
+        returns:
+            None
+        """
+        with self.lock:
+            self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """
+        Unregisters a callback added with add_listener.
+
+        Args:
+            callback (callable): Listener.
+        returns:
+            None
+        """
+        with self.lock:
+            if callback in self.listeners:
+                self.listeners.remove(callback)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                with pulsectl.Pulse(self.client_name) as pulse:
+                    pulse.event_mask_set("card", "sink", "source", "sink_input")
+                    pulse.event_callback_set(self._on_event)
+                    self._load_all(pulse)
+                    self.pulse = pulse
+                    self.ready.set()
+                    while not self.stop_event.is_set():
+                        pulse.event_listen(timeout=5.0)
+                        self._apply_pending(pulse)
+            except pulsectl.PulseError as e:
+                print(f"[PulseAudioMonitor] Connection to the sound server lost: {e}")
+            finally:
+                self.pulse = None
+                self.ready.clear()
+                with self.lock:
+                    self.cards.clear()
+                    self.sinks.clear()
+                    self.sources.clear()
+                    self.sink_inputs.clear()
+                    self.pending.clear()
+            self.stop_event.wait(self.reconnect_delay)
+
+    def _on_event(self, event):
+        # No requests may be made from the callback; queue the event and leave event_listen().
+        with self.lock:
+            self.pending[(str(event.facility), event.index)] = str(event.t)
+        raise pulsectl.PulseLoopStop
+
+    def _load_all(self, pulse):
+        cards = {card.index: self._card_entry(card) for card in pulse.card_list()}
+        sinks = {sink.index: self._sink_entry(sink) for sink in pulse.sink_list()}
+        sources = {source.index: self._source_entry(source) for source in pulse.source_list()}
+        sink_inputs = {stream.index: self._sink_input_entry(stream) for stream in pulse.sink_input_list()}
+        with self.lock:
+            self.cards = {index: entry for index, entry in cards.items() if entry["address"]}
+            self.sinks = {index: entry for index, entry in sinks.items() if entry["address"]}
+            self.sources = {index: entry for index, entry in sources.items() if entry["address"]}
+            self.sink_inputs = sink_inputs
+
+    def _apply_pending(self, pulse):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        loaders = {
+            "card": (pulse.card_info, self._card_entry, self.cards),
+            "sink": (pulse.sink_info, self._sink_entry, self.sinks),
+            "source": (pulse.source_info, self._source_entry, self.sources),
+            "sink_input": (pulse.sink_input_info, self._sink_input_entry, self.sink_inputs),
+        }
+        for (facility, index), event in pending.items():
+            if facility not in loaders:
+                continue
+            info, make_entry, table = loaders[facility]
+            entry = None
+            if event != "remove":
+                try:
+                    entry = make_entry(info(index))
+                except pulsectl.PulseIndexError:
+                    event = "remove"
+            with self.lock:
+                if event == "remove" or (facility != "sink_input" and not entry["address"]):
+                    if table.pop(index, None) is None:
+                        continue
+                    event, entry = "remove", None
+                else:
+                    table[index] = entry
+                listeners = list(self.listeners)
+            for callback in listeners:
+                try:
+                    callback(event, facility, entry)
+                except Exception as e:
+                    print(f"[PulseAudioMonitor] Listener error: {e}")
+
+    def _card_entry(self, card):
+        return {
+            "index": card.index,
+            "name": card.name,
+            "address": bluetooth_address(card.name, card.proplist),
+            "profile": card.profile_active.name if card.profile_active else None,
+            "profiles": [profile.name for profile in card.profile_list if profile.available],
+        }
+
+    def _sink_entry(self, sink):
+        return {
+            "index": sink.index,
+            "name": sink.name,
+            "address": bluetooth_address(sink.name, sink.proplist),
+            "card": sink.card,
+            "state": str(sink.state),
+            "latency": sink.latency,
+        }
+
+    def _source_entry(self, source):
+        # Monitors of Bluetooth sinks carry the device address too; only keep real inputs
+        monitor = source.monitor_of_sink not in (None, NO_SINK)
+        return {
+            "index": source.index,
+            "name": source.name,
+            "address": None if monitor else bluetooth_address(source.name, source.proplist),
+            "card": source.card,
+            "state": str(source.state),
+        }
+
+    def _sink_input_entry(self, stream):
+        return {
+            "index": stream.index,
+            "name": stream.name,
+            "sink": stream.sink,
+            "corked": bool(stream.corked),
+        }
+
+    def get_sink_for_device(self, address):
+        """
+        Returns the sink of a Bluetooth device.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            str | None: Sink name, None if the device has no sink.
+        """
+        address = address.upper()
+        with self.lock:
+            for sink in self.sinks.values():
+                if sink["address"] == address:
+                    return sink["name"]
+        return None
+
+    def wait_for_sink(self, address, timeout=5.0):
+        """
+        Waits for the sink of a Bluetooth device to appear.
+
+        The card and sink are created asynchronously once the device connected, so
+        a sink looked up right after Connect() is usually still missing.
+
+        Args:
+            address (str): Bluetooth MAC address.
+            timeout (float): Maximum time to wait in seconds.
+
+        Returns:
+            str | None: Sink name, None if none appeared in time.
+        """
+        address = address.upper()
+        found = threading.Event()
+
+        def listener(event, facility, info):
+            if event != "remove" and facility == "sink" and info["address"] == address:
+                found.set()
+
+        self.add_listener(listener)
+        try:
+            sink = self.get_sink_for_device(address)
+            if sink is None and found.wait(timeout):
+                sink = self.get_sink_for_device(address)
+            return sink
+        finally:
+            self.remove_listener(listener)
+
+    def get_source_for_device(self, address):
+        """
+        Returns the source carrying the audio a Bluetooth device streams to us.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            str | None: Source name, None if the device has no source.
+        """
+        address = address.upper()
+        with self.lock:
+            for source in self.sources.values():
+                if source["address"] == address:
+                    return source["name"]
+        return None
+
+    def get_card_for_device(self, address):
+        """
+        Returns the card of a Bluetooth device with its active and available profiles.
+
+        Args:
+            address (str): Bluetooth MAC address.
+
+        Returns:
+            dict | None: Card entry (name, profile, profiles...), None if unknown.
+        """
+        address = address.upper()
+        with self.lock:
+            for card in self.cards.values():
+                if card["address"] == address:
+                    return dict(card)
+        return None
+
+    def get_bluetooth_sinks(self):
+        """
+        Returns every Bluetooth sink.
+
+        args: None
+        Returns:
+            dict: Device address to sink name.
+        """
+        with self.lock:
+            return {sink["address"]: sink["name"] for sink in self.sinks.values()}
+
+    def is_streaming(self, address=None):
+        """
+        Tells whether an uncorked stream plays to a Bluetooth sink.
+
+        Args:
+            address (str): Only consider this device's sink; any Bluetooth sink if None.
+
+        Returns:
+            bool: True if audio is being streamed.
+        """
+        address = address.upper() if address else None
+        with self.lock:
+            for stream in self.sink_inputs.values():
+                sink = self.sinks.get(stream["sink"])
+                if sink and not stream["corked"] and (address is None or sink["address"] == address):
+                    return True
+        return False
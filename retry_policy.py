@@ -0,0 +1,218 @@
+import random
+import time
+
+import dbus
+
+# Error classes returned by classify_error().
+IN_PROGRESS = "in_progress"
+ALREADY_DONE = "already_done"
+NOT_CONNECTED = "not_connected"
+AUTHENTICATION_FAILED = "authentication_failed"
+PAGE_TIMEOUT = "page_timeout"
+CONNECTION_ABORTED = "connection_aborted"
+NO_REPLY = "no_reply"
+NOT_READY = "not_ready"
+NOT_FOUND = "not_found"
+UNKNOWN = "unknown"
+
+# D-Bus error names mapped to their class.
+ERROR_NAMES = {
+    "org.bluez.Error.InProgress": IN_PROGRESS,
+    "org.bluez.Error.AlreadyConnected": ALREADY_DONE,
+    "org.bluez.Error.AlreadyExists": ALREADY_DONE,
+    "org.bluez.Error.NotConnected": NOT_CONNECTED,
+    "org.bluez.Error.AuthenticationFailed": AUTHENTICATION_FAILED,
+    "org.bluez.Error.AuthenticationCanceled": AUTHENTICATION_FAILED,
+    "org.bluez.Error.AuthenticationRejected": AUTHENTICATION_FAILED,
+    "org.bluez.Error.AuthenticationTimeout": AUTHENTICATION_FAILED,
+    "org.bluez.Error.ConnectionAttemptFailed": CONNECTION_ABORTED,
+    "org.bluez.Error.NotReady": NOT_READY,
+    "org.bluez.Error.DoesNotExist": NOT_FOUND,
+    "org.freedesktop.DBus.Error.UnknownObject": NOT_FOUND,
+    "org.freedesktop.DBus.Error.UnknownMethod": NOT_FOUND,
+    "org.freedesktop.DBus.Error.NoReply": NO_REPLY,
+    "org.freedesktop.DBus.Error.Timeout": NO_REPLY,
+    "org.freedesktop.DBus.Error.TimedOut": NO_REPLY,
+}
+
+# Substrings of org.bluez.Error.Failed messages (BlueZ reason strings and HCI status texts).
+ERROR_MESSAGES = [
+    ("page-timeout", PAGE_TIMEOUT),
+    ("page timeout", PAGE_TIMEOUT),
+    ("host is down", PAGE_TIMEOUT),
+    ("connection timed out", PAGE_TIMEOUT),
+    ("le-connection-abort-by-local", CONNECTION_ABORTED),
+    ("aborted-by-remote", CONNECTION_ABORTED),
+    ("connection refused", CONNECTION_ABORTED),
+    ("connection reset", CONNECTION_ABORTED),
+    ("software caused connection abort", CONNECTION_ABORTED),
+    ("in progress", IN_PROGRESS),
+    ("busy", IN_PROGRESS),
+    ("already connected", ALREADY_DONE),
+    ("already exists", ALREADY_DONE),
+    ("authentication", AUTHENTICATION_FAILED),
+    ("did not receive a reply", NO_REPLY),
+    ("resource temporarily unavailable", NOT_READY),
+]
+
+
+def classify_error(error):
+    """
+    Maps an exception raised by a BlueZ call to one of the error classes.
+
+    Args:
+        error (Exception): Exception raised by the call.
+
+    Returns:
+        str: Error class, UNKNOWN if nothing matched.
+    """
+    if isinstance(error, dbus.exceptions.DBusException):
+        error_class = ERROR_NAMES.get(error.get_dbus_name())
+        if error_class:
+            return error_class
+        message = (error.get_dbus_message() or str(error)).lower()
+    else:
+        message = str(error).lower()
+    for text, error_class in ERROR_MESSAGES:
+        if text in message:
+            return error_class
+    return UNKNOWN
+
+
+class RetryStrategy:
+    """
+    Exponential backoff with jitter for one error class.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=5.0, multiplier=2.0, jitter=0.25):
+        """
+        Initializes the strategy.
+
+        Args:
+            max_attempts (int): Total number of attempts, 1 disables retrying.
+            base_delay (float): Delay in seconds before the first retry.
+            max_delay (float): Upper bound of a single delay in seconds.
+            multiplier (float): Growth factor of the delay per retry.
+            jitter (float): Random +/- fraction applied to each delay.
+        returns:
+            None
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def delay(self, attempt):
+        """
+        Returns the delay to wait after a failed attempt.
+
+        Args:
+            attempt (int): Number of the failed attempt, starting at 1.
+
+        Returns:
+            float: Delay in seconds.
+        """
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return max(0.0, delay * (1.0 + random.uniform(-self.jitter, self.jitter)))
+
+
+def default_strategies():
+    """
+    Returns the default strategy of each retryable error class.
+
+    Flaky RF (page timeouts, aborted connections) and a busy adapter get quick
+    retries; authentication failures and missing objects are not retried since
+    repeating the call cannot change the outcome.
+
+    args: None
+    Returns:
+        dict: Error class to RetryStrategy.
+    """
+    return {
+        IN_PROGRESS: RetryStrategy(max_attempts=5, base_delay=0.5, max_delay=2.0),
+        PAGE_TIMEOUT: RetryStrategy(max_attempts=3, base_delay=1.0, max_delay=4.0),
+        CONNECTION_ABORTED: RetryStrategy(max_attempts=3, base_delay=0.5, max_delay=2.0),
+        NO_REPLY: RetryStrategy(max_attempts=2, base_delay=0.2, max_delay=1.0),
+        NOT_READY: RetryStrategy(max_attempts=4, base_delay=0.5, max_delay=2.0),
+        UNKNOWN: RetryStrategy(max_attempts=2, base_delay=0.5, max_delay=1.0),
+    }
+
+
+class RetryPolicy:
+    """
+    Runs a BlueZ D-Bus operation with per-error-class retries inside a total deadline.
+
+    Each attempt gets a D-Bus timeout capped by the remaining budget, so a missing
+    reply costs at most call_timeout instead of dbus-python's 25 s default. Errors
+    meaning the goal is already reached end the operation successfully; which ones
+    do depends on the operation (AlreadyConnected by default, NotConnected only for
+    a disconnect).
+    """
+
+    def __init__(self, strategies=None, deadline=30.0, call_timeout=10.0):
+        """
+        Initializes the policy.
+
+        Args:
+            strategies (dict): Error class to RetryStrategy, merged over default_strategies().
+            deadline (float): Total time budget of one operation in seconds.
+            call_timeout (float): D-Bus timeout of a single attempt in seconds.
+        returns:
+            None
+        """
+        self.strategies = default_strategies()
+        self.strategies.update(strategies or {})
+        self.deadline = deadline
+        self.call_timeout = call_timeout
+
+    def run(self, operation, description="operation", check=None, deadline=None, call_timeout=None,
+            already_done=(ALREADY_DONE,)):
+        """
+        Calls operation(timeout) until it succeeds, a non-retryable error occurs or the deadline passes.
+
+        Args:
+            operation (callable): Receives the D-Bus timeout in seconds for this attempt.
+            description (str): Name used in log messages.
+            check (callable): Optional predicate telling whether the goal was reached
+                despite the error (e.g. Paired is already true); checked after each failure.
+            deadline (float): Overrides the policy's total time budget.
+            call_timeout (float): Overrides the D-Bus timeout of a single attempt.
+            already_done (tuple): Error classes meaning the goal is already reached, e.g.
+                (NOT_CONNECTED,) for a disconnect; confirmed with check when one is given.
+
+        Returns:
+            The operation's return value, None if it ended through an "already done" error
+            or a successful check.
+
+        Raises:
+            Exception: The last error once retries are exhausted or not allowed.
+        """
+        budget = self.deadline if deadline is None else deadline
+        call_timeout = self.call_timeout if call_timeout is None else call_timeout
+        end = time.monotonic() + budget
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = end - time.monotonic()
+            try:
+                return operation(max(0.1, min(call_timeout, remaining)))
+            except Exception as e:
+                error_class = classify_error(e)
+                reached = bool(check()) if check is not None else None
+                if error_class in already_done and reached is not False:
+                    print(f"[RetryPolicy] {description}: already done ({e})")
+                    return None
+                if reached:
+                    print(f"[RetryPolicy] {description}: goal reached despite {error_class} error")
+                    return None
+                strategy = self.strategies.get(error_class)
+                if strategy is None or attempt >= strategy.max_attempts:
+                    raise
+                delay = strategy.delay(attempt)
+                remaining = end - time.monotonic()
+                if delay >= remaining:
+                    raise
+                print(f"[RetryPolicy] {description}: {error_class} error on attempt {attempt}, "
+                      f"retrying in {delay:.2f}s")
+                time.sleep(delay)
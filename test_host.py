@@ -1,6 +1,6 @@
 import os
-import dbus
 import re
+import time
 
 from PyQt6.QtCore import QTimer
 from PyQt6.QtGui import QFont
@@ -12,8 +12,8 @@ from PyQt6.QtWidgets import QListWidget
 from PyQt6.QtWidgets import QLabel
 from PyQt6.QtWidgets import QLineEdit
 from PyQt6.QtWidgets import QPushButton
-from PyQt6.QtWidgets import QTableWidget
-from PyQt6.QtWidgets import QTableWidgetItem
+from PyQt6.QtWidgets import QSpinBox
+from PyQt6.QtWidgets import QTableView
 from PyQt6.QtWidgets import QTextBrowser
 from PyQt6.QtWidgets import QVBoxLayout
 from PyQt6.QtWidgets import QWidget
@@ -29,6 +29,8 @@ from logger import Logger
 from Backend_lib.Linux.a2dp_profile import A2DPManager
 from Backend_lib.Linux.opp_profile import OPPManager
 from Backend_lib.Linux.daemons import BluezServices
+from UI_lib.discovery_model import DeviceActionDelegate, DiscoveryFilterProxyModel, DiscoveryTableModel
+from UI_lib.discovery_model import ADDRESS_COLUMN, NAME_COLUMN, PROCEDURES_COLUMN, RSSI_COLUMN
 
 
 class Controller:
@@ -143,6 +145,7 @@ class TestApplication(QWidget):
             self.set_discovery_on_button.setEnabled(False)
             self.set_discovery_off_button.setEnabled(True)
             self.bluetooth_device_manager.start_discovery()
+        self.build_discovery_table()
 
     def show_discovery_table_timeout(self):
         """Function to show the discovery table when timeout is over
@@ -176,62 +179,88 @@ class TestApplication(QWidget):
     def show_discovery_table(self):
         """
         Display discovered devices in a table with options to pair or connect (BR/EDR, LE).
+
+        The table is only built once; afterwards it follows the object cache, so rows
+        are inserted and updated in place instead of being recreated.
         """
         self.timer.stop()
+        session = self.bluetooth_device_manager.session
+        calls_before = session.get_dbus_call_count()
+        render_start = time.perf_counter()
+        self.build_discovery_table()
+        render_ms = (time.perf_counter() - render_start) * 1000
+        calls_after = session.get_dbus_call_count()
+        self.set_discovery_off_button.setEnabled(False)
+        # D-Bus calls can only be counted against mock_bluez
+        dbus_calls = calls_after - calls_before if None not in (calls_before, calls_after) else "uncounted"
+        print(f"Discovery table shows {self.discovery_proxy_model.rowCount()} of "
+              f"{self.discovery_model.rowCount()} devices ({render_ms:.1f} ms, {dbus_calls} D-Bus calls)")
+
+    def build_discovery_table(self):
+        """
+        Create the discovery table view and its filter inputs unless they already exist.
+
+        args: None
+        returns: None
+        """
+        if getattr(self, 'discovery_widget', None):
+            return
         bold_font = QFont()
         bold_font.setBold(True)
-        bus = dbus.SystemBus()
-        om = dbus.Interface(bus.get_object("org.bluez", "/"), "org.freedesktop.DBus.ObjectManager")
-        objects = om.GetManagedObjects()
-        devices = [path for path, interfaces in objects.items() if "org.bluez.Device1" in interfaces]
-        self.table_widget = QTableWidget(len(devices), 3)
-        self.table_widget.setHorizontalHeaderLabels(["DEVICE NAME", "BD_ADDR", "PROCEDURES"])
-        self.table_widget.setFont(bold_font)
-        self.table_widget.setFixedSize(475, 180)
-
-        for i, device_path in enumerate(devices):
-            device = dbus.Interface(bus.get_object("org.bluez", device_path), dbus_interface="org.bluez.Device1")
-            device_props = dbus.Interface(bus.get_object("org.bluez", device_path),
-                                          dbus_interface="org.freedesktop.DBus.Properties")
-            device_address = device_props.Get("org.bluez.Device1", "Address")
-            device_name = device_props.Get("org.bluez.Device1", "Alias")
-            self.table_widget.setItem(i, 0, QTableWidgetItem(device_name))
-            self.table_widget.setItem(i, 1, QTableWidgetItem(device_address))
-            self.table_widget.horizontalHeader().setStretchLastSection(True)
-            button_widget = QWidget()
-            button_layout = QHBoxLayout()
-            pair_button = QPushButton("PAIR")
-            pair_button.setFont(bold_font)
-            pair_button.setStyleSheet("color:green")
-            pair_button.setMinimumSize(30, 20)
-            # pair_button.setFixedHeight(30)
-            button_layout.addWidget(pair_button)
-
-            br_edr_connect_button = QPushButton("BR_EDR_CONNECT")
-            br_edr_connect_button.setFont(bold_font)
-            br_edr_connect_button.setStyleSheet("color:green")
-            br_edr_connect_button.setMinimumSize(30, 20)
-            # br_edr_connect_button.setFixedHeight(30)
-            button_layout.addWidget(br_edr_connect_button)
-
-            le_connect_button = QPushButton("LE_CONNECT")
-            le_connect_button.setFont(bold_font)
-            le_connect_button.setStyleSheet("color:green")
-            le_connect_button.setMinimumSize(30, 20)
-            # le_connect_button.setFixedHeight(30)
-            button_layout.addWidget(le_connect_button)
-
-            button_widget.setLayout(button_layout)
-            self.table_widget.setCellWidget(i, 2, button_widget)
-            self.gap_methods_layout.addWidget(self.table_widget)
-            pair_button.clicked.connect(
-                lambda checked, address=device_address: self.handle_device_action('pair', address))
-            br_edr_connect_button.clicked.connect(
-                lambda checked, address=device_address: self.handle_device_action('br_edr_connect', address))
-            le_connect_button.clicked.connect(
-                lambda checked, address=device_address: self.handle_device_action('le_connect', address))
-        self.table_widget.show()
-        self.set_discovery_off_button.setEnabled(False)
+        self.discovery_model = DiscoveryTableModel(self.bluetooth_device_manager.object_cache, self.interface)
+        self.discovery_proxy_model = DiscoveryFilterProxyModel()
+        self.discovery_proxy_model.setSourceModel(self.discovery_model)
+        self.discovery_delegate = DeviceActionDelegate()
+        self.discovery_delegate.action_clicked.connect(self.handle_device_action)
+
+        filter_layout = QHBoxLayout()
+        self.discovery_filter_input = QLineEdit()
+        self.discovery_filter_input.setPlaceholderText("Filter by name or address")
+        self.discovery_filter_input.textChanged.connect(self.discovery_proxy_model.set_filter_text)
+        filter_layout.addWidget(self.discovery_filter_input)
+        min_rssi_label = QLabel("MIN RSSI:")
+        min_rssi_label.setFont(bold_font)
+        filter_layout.addWidget(min_rssi_label)
+        self.discovery_rssi_input = QSpinBox()
+        self.discovery_rssi_input.setRange(-128, 20)
+        self.discovery_rssi_input.setSpecialValueText("ANY")
+        self.discovery_rssi_input.setValue(-128)
+        self.discovery_rssi_input.valueChanged.connect(
+            lambda value: self.discovery_proxy_model.set_min_rssi(None if value == -128 else value))
+        filter_layout.addWidget(self.discovery_rssi_input)
+
+        self.table_view = QTableView()
+        self.table_view.setModel(self.discovery_proxy_model)
+        self.table_view.setItemDelegateForColumn(PROCEDURES_COLUMN, self.discovery_delegate)
+        self.table_view.setFont(bold_font)
+        self.table_view.setMinimumSize(475, 180)
+        self.table_view.setSortingEnabled(True)
+        self.table_view.sortByColumn(RSSI_COLUMN, Qt.SortOrder.DescendingOrder)
+        self.table_view.verticalHeader().setDefaultSectionSize(30)
+        self.table_view.setColumnWidth(NAME_COLUMN, 140)
+        self.table_view.setColumnWidth(ADDRESS_COLUMN, 130)
+        self.table_view.setColumnWidth(RSSI_COLUMN, 50)
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+
+        discovery_layout = QVBoxLayout()
+        discovery_layout.addLayout(filter_layout)
+        discovery_layout.addWidget(self.table_view)
+        self.discovery_widget = QWidget()
+        self.discovery_widget.setLayout(discovery_layout)
+        self.gap_methods_layout.addWidget(self.discovery_widget)
+
+    def close_discovery_table(self):
+        """
+        Stop feeding the discovery table from the object cache and drop its references.
+
+        args: None
+        returns: None
+        """
+        if getattr(self, 'discovery_model', None):
+            self.discovery_model.detach()
+        self.discovery_model = None
+        self.discovery_widget = None
+        self.table_view = None
 
     def handle_device_action(self, action, address):
         """
@@ -265,10 +294,10 @@ class TestApplication(QWidget):
         """
 
         print("Refresh Button is pressed")
-        if hasattr(self, 'table_widget') and self.table_widget:
-            self.gap_methods_layout.removeWidget(self.table_widget)
-            self.table_widget.deleteLater()
-            self.table_widget = None
+        if getattr(self, 'discovery_widget', None):
+            self.gap_methods_layout.removeWidget(self.discovery_widget)
+            self.discovery_widget.deleteLater()
+            self.close_discovery_table()
             self.inquiry_timeout_input.setText("0")
             self.refresh_button.setEnabled(False)
             self.set_discovery_on_button.setEnabled(True)
@@ -391,6 +420,9 @@ class TestApplication(QWidget):
             streaming_buttons_layout.addWidget(self.stop_streaming_button)
             streaming_layout.addLayout(streaming_buttons_layout)
 
+            self.streaming_status_label = QLabel("Not streaming")
+            streaming_layout.addWidget(self.streaming_status_label)
+
             layout.addWidget(streaming_group)
 
         if role in ["source", "both"]:
@@ -427,6 +459,31 @@ class TestApplication(QWidget):
             control_buttons.addWidget(self.rewind_button)
 
             media_control_layout.addLayout(control_buttons)
+
+            capture_layout = QHBoxLayout()
+            capture_layout.addWidget(QLabel("Capture Folder:"))
+            self.capture_directory_input = QLineEdit("/tmp/a2dp_captures")
+            capture_layout.addWidget(self.capture_directory_input)
+            self.browse_capture_button = QPushButton("Browse...")
+            self.browse_capture_button.clicked.connect(self.browse_capture_directory)
+            capture_layout.addWidget(self.browse_capture_button)
+            media_control_layout.addLayout(capture_layout)
+
+            recording_buttons_layout = QHBoxLayout()
+            self.start_recording_button = QPushButton("Start Recording")
+            self.start_recording_button.setObjectName("startButton")
+            self.start_recording_button.clicked.connect(self.start_recording)
+            recording_buttons_layout.addWidget(self.start_recording_button)
+
+            self.stop_recording_button = QPushButton("Stop Recording")
+            self.stop_recording_button.setObjectName("stopButton")
+            self.stop_recording_button.clicked.connect(self.stop_recording)
+            self.stop_recording_button.setEnabled(False)
+            recording_buttons_layout.addWidget(self.stop_recording_button)
+            media_control_layout.addLayout(recording_buttons_layout)
+
+            self.recording_status_label = QLabel("Not recording")
+            media_control_layout.addWidget(self.recording_status_label)
             layout.addWidget(media_control_group)
 
         widget = QWidget()
@@ -470,6 +527,11 @@ class TestApplication(QWidget):
             QMessageBox.critical(self, "Streaming Failed", "Failed to start streaming.")
             self.start_streaming_button.setEnabled(True)
             self.stop_streaming_button.setEnabled(False)
+            return
+
+        self.streaming_timer = QTimer()
+        self.streaming_timer.timeout.connect(self.update_streaming_status)
+        self.streaming_timer.start(500)
 
     def stop_streaming(self):
         """
@@ -486,6 +548,111 @@ class TestApplication(QWidget):
 
         if hasattr(self, 'streaming_timer'):
             self.streaming_timer.stop()
+        self.streaming_status_label.setText("Not streaming")
+
+    def update_streaming_status(self):
+        """
+        Refresh the streaming status line from the playback engine and reset the
+        buttons once the stream has ended.
+
+        args: None
+        returns: None
+        """
+        status = self.a2dp_manager.get_stream_status()
+        if not status:
+            self.streaming_timer.stop()
+            return
+        try:
+            position, duration = status["position"], status["duration"]
+            progress = f"{position:.1f}s / {duration:.1f}s" if duration else f"{position:.1f}s"
+            self.streaming_status_label.setText(f"{status['state'].capitalize()}: {progress}, "
+                                                f"underruns: {status['underruns']}, "
+                                                f"{status['throughput'] / 1024:.0f} KiB/s")
+            if status["state"] not in ("starting", "playing"):
+                self.streaming_timer.stop()
+                self.start_streaming_button.setEnabled(True)
+                self.stop_streaming_button.setEnabled(False)
+                if status["error"]:
+                    QMessageBox.warning(self, "Streaming Error", status["error"])
+        except RuntimeError:
+            # The A2DP panel was rebuilt and its widgets deleted
+            self.streaming_timer.stop()
+
+    def browse_capture_directory(self):
+        """Open a dialog for selecting the folder receiving audio captures.
+
+        args: None
+        returns: None
+        """
+        directory = QFileDialog.getExistingDirectory(None, "Select Capture Folder",
+                                                     self.capture_directory_input.text())
+        if directory:
+            self.capture_directory_input.setText(directory)
+
+    def start_recording(self):
+        """
+        Record the audio streamed by the selected A2DP source device into rotating
+        one-minute WAV files.
+
+        args: None
+        returns: None
+        """
+        directory = self.capture_directory_input.text().strip()
+        if not directory:
+            QMessageBox.warning(self, "No Folder", "Please select a folder for the audio captures.")
+            return
+        if not self.device_address_sink:
+            QMessageBox.warning(self, "No Device", "Please select a source device to record.")
+            return
+        if not self.a2dp_manager.start_recording(self.device_address_sink, directory):
+            QMessageBox.critical(self, "Recording Failed",
+                                 "Failed to start recording. Is the device streaming audio to this host?")
+            return
+        self.start_recording_button.setEnabled(False)
+        self.stop_recording_button.setEnabled(True)
+        self.recording_timer = QTimer()
+        self.recording_timer.timeout.connect(self.update_recording_status)
+        self.recording_timer.start(500)
+
+    def stop_recording(self):
+        """
+        Stop the current recording.
+
+        args: None
+        returns: None
+        """
+        chunks = self.a2dp_manager.stop_recording()
+        if hasattr(self, 'recording_timer'):
+            self.recording_timer.stop()
+        self.start_recording_button.setEnabled(True)
+        self.stop_recording_button.setEnabled(False)
+        self.recording_status_label.setText(f"Not recording ({len(chunks)} files saved)")
+
+    def update_recording_status(self):
+        """
+        Refresh the recording status line and reset the buttons once the capture has ended.
+
+        args: None
+        returns: None
+        """
+        status = self.a2dp_manager.get_recording_status()
+        if not status:
+            self.recording_timer.stop()
+            return
+        try:
+            current = os.path.basename(status["file"]) if status["file"] else "-"
+            self.recording_status_label.setText(f"{status['state'].capitalize()}: {status['duration']:.1f}s, "
+                                                f"{len(status['chunks'])} files done, writing {current}, "
+                                                f"peak {status['peak']}")
+            if status["state"] not in ("starting", "recording"):
+                self.recording_timer.stop()
+                self.start_recording_button.setEnabled(True)
+                self.stop_recording_button.setEnabled(False)
+                if status["error"]:
+                    QMessageBox.warning(self, "Recording Error", status["error"])
+        except RuntimeError:
+            # The A2DP panel was rebuilt and its widgets deleted
+            self.recording_timer.stop()
 
     def play(self):
         """
@@ -579,16 +746,7 @@ class TestApplication(QWidget):
 
 
     def get_a2dp_role_for_device(self, device_address):
-        sinks = self.a2dp_manager.get_connected_a2dp_sink_devices()
-        sources = self.a2dp_manager.get_connected_a2dp_source_devices()
-
-        if device_address in sinks and device_address in sources:
-            return "both"
-        elif device_address in sinks:
-            return "sink"
-        elif device_address in sources:
-            return "source"
-        return None
+        return self.a2dp_manager.get_a2dp_role(device_address)
 
 
 #------------------OPP METHODS------------------------
@@ -850,6 +1008,7 @@ class TestApplication(QWidget):
             self.profile_description_text_browser.append("Use the below methods as required:")
 
             # Creating discoverable timeout input window along with SetDiscoverable ON/OFF
+            self.close_discovery_table()
             self.gap_methods_layout = QVBoxLayout()
             set_discoverable_label = QLabel("SetDiscoverable:")
             set_discoverable_label.setFont(bold_font)
@@ -159,7 +159,7 @@ def check_command_running(log, process):
     process_list = []
     for line in output:
         item = line.strip().split(' ')
-        if "btmon" in process or "arecord" in process or "l2test" in process:
+        if "btmon" in process or "arecord" in process or "parec" in process or "l2test" in process:
             process_list.append((item[0]))
         elif item[3] == process.split(" ")[-1].rstrip('"'):
             process_list.append((item[0]))